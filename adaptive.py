@@ -0,0 +1,210 @@
+"""Adaptive delays: learn when the screen is really ready instead of padding for the worst case.
+
+After each click, a small region around the next click target is watched
+with cheap frame differencing, and the seconds until it changes are
+recorded on the step whose delay was being waited out (`Step.ready`, saved
+with the config). Once a step has enough observations its delay window
+moves to just after the slowest typical readiness plus a human reaction
+time, clamped to the step's `adapt_min`..`adapt_max` safety bounds.
+Clicks that beat the screen widen the window again.
+"""
+import threading
+import time
+from typing import Callable, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from models import Step
+from screen_capture import CaptureSource, Region
+from template_match import to_gray
+
+READY_HISTORY = 64  # observations kept per step, newest last
+MIN_OBSERVATIONS = 8  # before a step's delays are adapted at all
+WATCH_INTERVAL = 0.05  # seconds between looks at the watched region
+WATCH_MARGIN = 8  # pixels watched around a step's click circle
+CHANGE_LEVEL = 24  # gray levels a pixel has to move by to count as changed
+CHANGE_SHARE = 0.02  # share of the region's pixels that must change
+REACTION = (0.15, 0.45)  # seconds after readiness a person clicks, quickest to slowest
+EARLY_PENALTY = 0.5  # added to a too-early click's wait, since readiness came some time later
+
+
+def ready_window(step: Step) -> Optional[Tuple[float, float]]:
+    """Delay range learned for `step`, within its safety bounds, or None while still learning"""
+    ready = step.ready
+    if not ready:
+        return None
+    values = ready["samples"] + [seconds + EARLY_PENALTY for seconds in ready["early"]]
+    if len(values) < MIN_OBSERVATIONS:
+        return None
+    p90, p99 = np.quantile(values, (0.9, 0.99))
+    ceiling = step.adapt_max or step.delay_max
+    low = min(max(p90 + REACTION[0], step.adapt_min), ceiling)
+    high = min(max(p99 + REACTION[1], low), ceiling)
+    return float(low), float(high)
+
+
+def watch_region(x: int, y: int, radius: int) -> Region:
+    half = radius + WATCH_MARGIN
+    return max(x - half, 0), max(y - half, 0), 2 * half, 2 * half
+
+
+def store_learned(store, program) -> int:
+    """Copy what a run learned onto the stored configs' steps; returns how many steps changed"""
+    changed = 0
+    for step, (name, index) in zip(program.slots, program.slot_sources):
+        if not step.ready or name not in store:
+            continue
+        steps = store.get(name).steps
+        if index < len(steps) and steps[index].kind == step.kind and steps[index].ready != step.ready:
+            steps[index].ready = {key: list(values) for key, values in step.ready.items()}
+            changed += 1
+    return changed
+
+
+class AdaptiveStats(NamedTuple):
+    observed: int  # waits where the target was seen to change
+    early: int  # clicks that went out before it did
+    configured: float  # seconds of delay the config asked for
+    effective: float  # seconds actually planned
+    cycle_seconds: float  # wall-clock time of the completed cycles
+
+    @property
+    def saved(self) -> float:
+        return self.configured - self.effective
+
+    @property
+    def cycle_reduction(self) -> float:
+        """Share of cycle time saved compared to running the configured delays"""
+        total = self.cycle_seconds + self.saved
+        return self.saved / total if total > 0 else 0.0
+
+
+class AdaptiveDelays:
+    """Watches for readiness and rescales delays into each step's learned window.
+
+    The engine calls `delay()` with the delay drawn from a step's configured
+    range; its position in that range is kept within the learned window,
+    so delays stay random and seeded runs stay reproducible. `watch()`
+    starts looking at the next target on a background thread and
+    `finish()` records the outcome when the click goes out.
+    """
+
+    def __init__(self, source: Optional[CaptureSource] = None, clock: Callable[[], float] = time.perf_counter,
+                 interval: float = WATCH_INTERVAL):
+        self.source = source
+        self.clock = clock
+        self.interval = interval
+        self.observed = 0
+        self.early = 0
+        self.configured = 0.0
+        self.effective = 0.0
+        self.cycle_seconds = 0.0
+        self._cond = threading.Condition()
+        self._watch: Optional[Tuple[Step, Region, float]] = None
+        self._generation = 0  # bumped whenever the watch changes, so a stale look is ignored
+        self._ready_at: Optional[float] = None
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+    def delay(self, step: Step, drawn: float) -> float:
+        """Seconds to wait after `step` in place of `drawn`, a delay from its configured range"""
+        window = ready_window(step)
+        effective = drawn
+        if window is not None:
+            low, high = window
+            span = step.delay_max - step.delay_min
+            position = (drawn - step.delay_min) / span if span > 0 else 0.5
+            effective = low + position * (high - low)
+        self.configured += drawn
+        self.effective += effective
+        return effective
+
+    def record_cycle(self, seconds: float):
+        self.cycle_seconds += seconds
+
+    def stats(self) -> AdaptiveStats:
+        return AdaptiveStats(self.observed, self.early, self.configured, self.effective, self.cycle_seconds)
+
+    def watch(self, step: Step, region: Region, started: float):
+        """Look for `region` to change from now on; the outcome is learned by `step`"""
+        with self._cond:
+            self._watch = (step, region, started)
+            self._generation += 1
+            self._ready_at = None
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._watch_loop, name="adaptive-watch", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def cancel(self):
+        with self._cond:
+            self._watch = None
+            self._generation += 1
+
+    def finish(self, clicked_at: float, discard: bool = False):
+        """End the watch as its click goes out and learn from it, unless `discard` (e.g. the run was paused)"""
+        with self._cond:
+            watch, ready_at = self._watch, self._ready_at
+            self._watch = None
+            self._generation += 1
+        if watch is None or discard:
+            return
+        step, _, started = watch
+        if ready_at is not None:
+            key, seconds = "samples", ready_at - started
+            self.observed += 1
+        elif clicked_at - started < step.delay_min:
+            # Still unchanged although we went in sooner than configured: we were early
+            key, seconds = "early", clicked_at - started
+            self.early += 1
+        else:
+            return  # a target that doesn't change within the configured delay tells us nothing
+        if not step.ready:
+            step.ready = {"samples": [], "early": []}
+        history = step.ready[key]
+        history.append(round(seconds, 3))
+        del history[:-READY_HISTORY]
+
+    def _watch_loop(self):
+        generation = None
+        while True:
+            with self._cond:
+                # Wait for a watch this loop hasn't settled yet
+                handled = generation
+                self._cond.wait_for(lambda: self._closed or (self._watch and self._generation != handled))
+                if self._closed:
+                    return
+                generation = self._generation
+                region = self._watch[1]
+            baseline = self._look(region)
+            while baseline is not None:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._closed or self._generation != generation, self.interval)
+                    if self._closed or self._generation != generation:
+                        break
+                frame = self._look(region)
+                if frame is None:
+                    break
+                if frame.shape == baseline.shape:
+                    moved = np.count_nonzero(np.abs(frame - baseline) > CHANGE_LEVEL)
+                    if moved < max(1, CHANGE_SHARE * frame.size):
+                        continue
+                with self._cond:
+                    if self._generation == generation:
+                        self._ready_at = self.clock()
+                break
+
+    def _look(self, region: Region) -> Optional[np.ndarray]:
+        try:
+            return to_gray(self.source.grab(region))
+        except Exception:
+            return None  # e.g. the region is off screen; this wait just goes unobserved
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self._closed = False  # the next watch starts a new thread
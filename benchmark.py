@@ -0,0 +1,363 @@
+"""Headless benchmarks for the engine, config I/O and rendering.
+
+Runs on a plain Linux box: Qt uses the offscreen platform and clicks go
+to a RecordingInputBackend. Results are written as a JSON report and
+compared against THRESHOLDS; the exit status is 1 if any benchmark
+regressed past its limit.
+
+    python benchmark.py [--quick] [--only NAME ...] [--report bench.json] [--thresholds limits.json]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np
+
+from checkpoint import CheckpointWriter
+from config_store import JsonConfigStore
+from input_backend import RecordingInputBackend
+from models import Config, Step
+from run_engine import RunEngine
+from scheduler import DeadlineScheduler, PrecisionWaiter
+from simulator import simulate
+
+STEP_COUNTS = (10, 1_000, 100_000)
+QUICK_STEP_COUNTS = (10, 1_000)
+
+# name -> (limit, "max" if the value must stay at or below the limit, "min" if at or above)
+THRESHOLDS = {
+    "scheduler.jitter_p99_ms": (1.0, "max"),
+    "scheduler.jitter_max_ms": (5.0, "max"),
+    "engine.steps_per_second": (5_000, "min"),
+    "engine.flow_steps_per_second": (5_000, "min"),
+    "engine.checkpointed_steps_per_second": (5_000, "min"),
+    "simulator.steps_per_second": (10_000, "min"),  # with real multi-second delays, on the virtual clock
+    "config.roundtrip_ms[10]": (1.0, "max"),
+    "config.roundtrip_ms[1000]": (50.0, "max"),
+    "config.roundtrip_ms[100000]": (5_000.0, "max"),
+    "config.save_ms[10]": (20.0, "max"),
+    "config.save_ms[1000]": (100.0, "max"),
+    "config.save_ms[100000]": (5_000.0, "max"),
+    "config.load_ms[10]": (20.0, "max"),
+    "config.load_ms[1000]": (100.0, "max"),
+    "config.load_ms[100000]": (5_000.0, "max"),
+    "step_list.reset_ms[10]": (50.0, "max"),
+    "step_list.reset_ms[1000]": (50.0, "max"),
+    "step_list.reset_ms[100000]": (200.0, "max"),
+    "step_list.move_ms[10]": (5.0, "max"),
+    "step_list.move_ms[1000]": (5.0, "max"),
+    "step_list.move_ms[100000]": (10.0, "max"),
+    "overlay.layer_ms[10]": (50.0, "max"),
+    "overlay.layer_ms[1000]": (200.0, "max"),
+    "overlay.layer_ms[100000]": (10_000.0, "max"),
+    "overlay.live_frame_ms[10]": (2.0, "max"),
+    "overlay.live_frame_ms[1000]": (2.0, "max"),
+    "overlay.live_frame_ms[100000]": (2.0, "max"),
+    "trajectories.path_us": (50.0, "max"),
+    "trajectories.cpu_us_per_event": (1_000.0, "max"),
+    "trajectories.jitter_p99_ms": (2.0, "max"),  # a quarter of the 8 ms event period
+    "hotkeys.idle_cpu_percent": (1.0, "max"),
+    "cli.startup_ms": (300.0, "max"),
+    "cli.imports_qt": (0, "max"),
+}
+
+
+class _BenchWindow:
+    """Always-focused stand-in for a pywinctl window"""
+    left, top, width, height = 0, 0, 1920, 1080
+    isActive = True
+
+    def activate(self):
+        pass
+
+
+def make_config(steps: int) -> Config:
+    config = Config(f"bench-{steps}")
+    rng = np.random.default_rng(0)
+    xs = rng.integers(0, 1900, steps).tolist()
+    ys = rng.integers(0, 1060, steps).tolist()
+    config.steps = [Step(x, y, 10, 0.5, 1.0, name=f"Step {i + 1}") for i, (x, y) in enumerate(zip(xs, ys))]
+    return config
+
+
+def best_of(fn: Callable[[], None], runs: int = 3) -> float:
+    """Fastest of `runs` calls, in milliseconds"""
+    best = float("inf")
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def bench_scheduler(results: Dict[str, float]):
+    waiter = PrecisionWaiter()
+    waiter.calibrate()
+    errors = []
+    deadline = waiter.clock()
+    for _ in range(300):
+        deadline += 0.002
+        waiter.wait_until(deadline)
+        errors.append(abs(waiter.clock() - deadline))
+    errors_ms = np.array(errors) * 1000
+    results["scheduler.jitter_p99_ms"] = float(np.percentile(errors_ms, 99))
+    results["scheduler.jitter_max_ms"] = float(errors_ms.max())
+
+
+def _steps_per_second(config: Config, repeat: int, steps: int, configs=None, checkpoint=None) -> float:
+    waiter = PrecisionWaiter()
+    scheduler = DeadlineScheduler(waiter.clock, focus_settle=0.0, cycle_gap=0.0)
+    engine = RunEngine(config, _BenchWindow(), repeat, RecordingInputBackend(sleep=lambda seconds: None),
+                       waiter=waiter, scheduler=scheduler, seed=0, configs=configs, checkpoint=checkpoint)
+    engine.program.hold_range = (0.0, 0.0)
+    waiter.calibrate()
+    started = time.perf_counter()
+    engine.run()
+    return steps / (time.perf_counter() - started)
+
+
+def bench_engine(results: Dict[str, float]):
+    config = Config("engine")
+    config.steps = [Step(10 * i, 10, 3, 0.0, 0.0) for i in range(20)]
+    results["engine.steps_per_second"] = _steps_per_second(config, 250, 250 * 20)
+    with tempfile.TemporaryDirectory() as directory:
+        # Saving after every step; the file write itself happens on the writer thread
+        writer = CheckpointWriter(os.path.join(directory, "checkpoint.json"))
+        results["engine.checkpointed_steps_per_second"] = _steps_per_second(config, 250, 250 * 20,
+                                                                            checkpoint=writer)
+
+    # The same 5000 clicks as a loop around a call, each of whose steps sits in an inner loop
+    inner = Config("inner")
+    inner.steps = [Step(0, 0, 0, 0, 0, kind="loop", count=4), Step(10, 10, 3, 0.0, 0.0),
+                   Step(0, 0, 0, 0, 0, kind="end_loop")]
+    flow = Config("flow")
+    flow.steps = [Step(0, 0, 0, 0, 0, kind="loop", count=250), Step(0, 0, 0, 0, 0, kind="call", target="inner"),
+                  Step(20, 10, 3, 0.0, 0.0), Step(0, 0, 0, 0, 0, kind="end_loop")]
+    results["engine.flow_steps_per_second"] = _steps_per_second(flow, 4, 4 * 250 * 5, {"inner": inner}.__getitem__)
+
+    report = simulate(make_config(20), 1000, seed=0)
+    results["simulator.steps_per_second"] = report.steps / report.wall_seconds
+
+
+def bench_config(results: Dict[str, float], counts):
+    with tempfile.TemporaryDirectory() as directory:
+        for count in counts:
+            config = make_config(count)
+            data = config.to_dict()
+            results[f"config.roundtrip_ms[{count}]"] = best_of(lambda: Config.from_dict(data).to_dict())
+
+            path = os.path.join(directory, f"configs-{count}.json")
+
+            def save():
+                if os.path.exists(path):
+                    os.remove(path)
+                store = JsonConfigStore(path)
+                store.add(config)
+                store.save()
+            results[f"config.save_ms[{count}]"] = best_of(save)
+            results[f"config.load_ms[{count}]"] = best_of(lambda: JsonConfigStore(path).get(config.name))
+
+
+def bench_step_list(results: Dict[str, float], counts, app):
+    from step_list_model import StepItemDelegate, StepListModel, StepListView
+
+    model = StepListModel()
+    view = StepListView(model, StepItemDelegate())
+    view.resize(400, 600)
+    view.show()
+    app.processEvents()
+    for count in counts:
+        config = make_config(count)
+
+        def reset():
+            model.set_config(config)
+            view.repaint()
+            app.processEvents()
+        results[f"step_list.reset_ms[{count}]"] = best_of(reset)
+
+        def move():
+            model.move_rows([count - 1], 0)
+            app.processEvents()
+            view.repaint()
+        results[f"step_list.move_ms[{count}]"] = best_of(move, runs=10)
+    view.close()
+
+
+def bench_overlay(results: Dict[str, float], counts, app):
+    from PyQt5.QtCore import QRect
+    from overlay import TransparentOverlay
+
+    # grab() runs paintEvent into a pixmap, so timings don't depend on the
+    # platform having exposed the window yet
+    overlay = TransparentOverlay(0, 0, 1920, 1080, make_config(1))
+    for count in counts:
+        overlay.set_config(make_config(count))
+
+        def full():
+            overlay.invalidate()
+            overlay.grab()
+        results[f"overlay.layer_ms[{count}]"] = best_of(full)
+
+        overlay.live = True
+        overlay.highlight_step(0)
+
+        def frame():
+            overlay.show_click(100, 100)
+            overlay.grab(QRect(80, 80, 40, 40))
+        results[f"overlay.live_frame_ms[{count}]"] = best_of(frame, runs=20)
+        overlay.live = False
+    overlay.deleteLater()
+
+
+def bench_trajectories(results: Dict[str, float]):
+    from trajectories import TrajectoryCache, TrajectoryMover
+
+    cache = TrajectoryCache(seed=0)
+    rng = np.random.default_rng(0)
+    points = rng.integers(0, 1900, (10_000, 2)).tolist()
+    started = time.perf_counter()
+    for (x0, y0), (x1, y1) in zip(points, points[1:]):
+        cache.path(x0, y0, x1, y1)
+    results["trajectories.path_us"] = (time.perf_counter() - started) / (len(points) - 1) * 1e6
+
+    # Stream real paths to a recording backend at the default event rate
+    waiter = PrecisionWaiter()
+    waiter.calibrate()
+    mover = TrajectoryMover(cache)
+    mover.position = (0, 0)
+    backend = RecordingInputBackend(sleep=lambda seconds: None)
+    for x, y in points[:10]:
+        mover.stream(backend, mover.plan(x, y), waiter.clock(), waiter.wait_until, waiter.clock)
+    stats = mover.stats()
+    results["trajectories.cpu_us_per_event"] = stats.cpu_per_event * 1e6
+    results["trajectories.jitter_p99_ms"] = stats.jitter_p99 * 1000
+    results["trajectories.jitter_max_ms"] = stats.jitter_max * 1000
+
+
+def bench_hotkeys(results: Dict[str, float], skipped: Dict[str, str]):
+    from hotkeys import HotkeyManager
+    from settings import DEFAULT_SETTINGS
+
+    manager = HotkeyManager(DEFAULT_SETTINGS["hotkeys"], lambda action: None)
+    try:
+        manager.start()
+    except Exception as e:  # no keyboard module, or no permission to hook input
+        skipped["hotkeys.idle_cpu_percent"] = f"hotkeys unavailable: {e}"
+        return
+    try:
+        wall, cpu = time.perf_counter(), time.process_time()
+        time.sleep(2.0)
+        results["hotkeys.idle_cpu_percent"] = 100 * (time.process_time() - cpu) / (time.perf_counter() - wall)
+    finally:
+        manager.stop()
+
+
+def bench_cli(results: Dict[str, float]):
+    """Wall time of a whole `python -m cli --list` process, interpreter startup included"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "configs.json")
+        store = JsonConfigStore(path)
+        store.add(make_config(10))
+        store.save()
+
+        def start():
+            subprocess.run([sys.executable, "-m", "cli", "--list", "--config-file", path],
+                           cwd=here, check=True, stdout=subprocess.DEVNULL)
+        results["cli.startup_ms"] = best_of(start, runs=5)
+    probe = "import sys, cli; print(int(any(m.startswith('PyQt5') for m in sys.modules)))"
+    output = subprocess.run([sys.executable, "-c", probe], cwd=here, check=True, capture_output=True, text=True)
+    results["cli.imports_qt"] = int(output.stdout.strip())
+
+
+BENCHMARKS = ("scheduler", "engine", "config", "step_list", "overlay", "trajectories", "hotkeys", "cli")
+
+
+def run_benchmarks(only: Optional[List[str]] = None, quick: bool = False):
+    counts = QUICK_STEP_COUNTS if quick else STEP_COUNTS
+    results: Dict[str, float] = {}
+    skipped: Dict[str, str] = {}
+    selected = only or BENCHMARKS
+    app = None
+    if "step_list" in selected or "overlay" in selected:
+        from PyQt5.QtWidgets import QApplication
+        app = QApplication.instance() or QApplication(sys.argv[:1])
+    for name in selected:
+        if name == "scheduler":
+            bench_scheduler(results)
+        elif name == "engine":
+            bench_engine(results)
+        elif name == "config":
+            bench_config(results, counts)
+        elif name == "step_list":
+            bench_step_list(results, counts, app)
+        elif name == "overlay":
+            bench_overlay(results, counts, app)
+        elif name == "trajectories":
+            bench_trajectories(results)
+        elif name == "hotkeys":
+            bench_hotkeys(results, skipped)
+        elif name == "cli":
+            bench_cli(results)
+    return results, skipped
+
+
+def check(results: Dict[str, float], thresholds) -> Dict[str, dict]:
+    report = {}
+    for name, value in results.items():
+        entry = {"value": round(value, 4)}
+        if name in thresholds:
+            limit, direction = thresholds[name]
+            entry.update(limit=limit, direction=direction,
+                         passed=value <= limit if direction == "max" else value >= limit)
+        report[name] = entry
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS)
+    parser.add_argument("--quick", action="store_true", help="skip the 100k-step sizes")
+    parser.add_argument("--report", default="benchmark_report.json")
+    parser.add_argument("--thresholds", help="JSON file of {name: [limit, \"max\"|\"min\"]} overrides")
+    args = parser.parse_args(argv)
+
+    thresholds = dict(THRESHOLDS)
+    if args.thresholds:
+        with open(args.thresholds) as f:
+            thresholds.update({name: tuple(limit) for name, limit in json.load(f).items()})
+
+    results, skipped = run_benchmarks(args.only, args.quick)
+    checked = check(results, thresholds)
+    failures = [name for name, entry in checked.items() if entry.get("passed") is False]
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": checked,
+        "skipped": skipped,
+        "failures": failures,
+        "passed": not failures,
+    }
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for name, entry in checked.items():
+        status = "" if "passed" not in entry else ("ok" if entry["passed"] else "FAIL")
+        limit = f" (limit {entry['limit']})" if "limit" in entry else ""
+        print(f"{name:36} {entry['value']:>12}{limit} {status}")
+    for name, reason in skipped.items():
+        print(f"{name:36} skipped: {reason}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
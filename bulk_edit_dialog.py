@@ -0,0 +1,88 @@
+from typing import Dict, List
+
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QCheckBox,
+    QSpinBox, QDoubleSpinBox, QPushButton, QComboBox
+)
+from models import DISTRIBUTIONS, Step
+
+
+class BulkEditDialog(QDialog):
+    """Set fields on several steps at once; only ticked fields are applied."""
+
+    def __init__(self, steps: List[Step], parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"Edit {len(steps)} Steps")
+        self.setMinimumWidth(300)
+
+        first = steps[0]
+        layout = QVBoxLayout(self)
+
+        self.radius_input = QSpinBox()
+        self.radius_input.setRange(0, 500)
+        self.radius_input.setValue(int(first.radius))
+
+        self.delay_min_input = QDoubleSpinBox()
+        self.delay_min_input.setRange(0, 60)
+        self.delay_min_input.setValue(first.delay_min)
+
+        self.delay_max_input = QDoubleSpinBox()
+        self.delay_max_input.setRange(0, 60)
+        self.delay_max_input.setValue(first.delay_max)
+
+        self.adapt_min_input = QDoubleSpinBox()
+        self.adapt_min_input.setRange(0, 60)
+        self.adapt_min_input.setValue(first.adapt_min)
+
+        self.adapt_max_input = QDoubleSpinBox()
+        self.adapt_max_input.setRange(0, 60)
+        self.adapt_max_input.setSpecialValueText("Delay Max")  # shown for 0
+        self.adapt_max_input.setValue(first.adapt_max)
+
+        self.distribution_input = QComboBox()
+        self.distribution_input.addItems(DISTRIBUTIONS)
+        self.distribution_input.setCurrentText(first.distribution)
+
+        self.fields = {}
+        for key, label, field in (("radius", "Radius:", self.radius_input),
+                                  ("delay_min", "Delay Min:", self.delay_min_input),
+                                  ("delay_max", "Delay Max:", self.delay_max_input),
+                                  ("adapt_min", "Adaptive Delay Floor:", self.adapt_min_input),
+                                  ("adapt_max", "Adaptive Delay Cap:", self.adapt_max_input),
+                                  ("distribution", "Click Spread:", self.distribution_input)):
+            checkbox = QCheckBox(label)
+            field.setEnabled(False)
+            checkbox.toggled.connect(field.setEnabled)
+            row = QHBoxLayout()
+            row.addWidget(checkbox)
+            row.addWidget(field)
+            layout.addLayout(row)
+            self.fields[key] = (checkbox, field)
+
+        # Buttons
+        btn_layout = QHBoxLayout()
+        save_btn = QPushButton("Apply")
+        cancel_btn = QPushButton("Cancel")
+
+        save_btn.clicked.connect(self.accept)
+        cancel_btn.clicked.connect(self.reject)
+
+        btn_layout.addWidget(save_btn)
+        btn_layout.addWidget(cancel_btn)
+        layout.addLayout(btn_layout)
+
+    def get_changes(self) -> Dict[str, object]:
+        changes = {}
+        for key, (checkbox, field) in self.fields.items():
+            if checkbox.isChecked():
+                changes[key] = field.currentText() if isinstance(field, QComboBox) else field.value()
+        return changes
+
+    @staticmethod
+    def apply(steps: List[Step], changes: Dict[str, object]):
+        """Apply `changes` to each step, keeping delay_min <= delay_max"""
+        for step in steps:
+            for key, value in changes.items():
+                setattr(step, key, value)
+            if step.delay_min > step.delay_max:
+                step.delay_min, step.delay_max = step.delay_max, step.delay_min
@@ -0,0 +1,125 @@
+"""Run checkpoints: where a run was, so it can carry on after a stop or crash.
+
+A checkpoint holds the interpreter state at a step boundary: the pass,
+the next instruction, call stack, loop counters and the RNG state, so a
+resumed run draws the same jitter it would have. It is tied to the
+program's `version` and refused if the config has changed since.
+"""
+import json
+import os
+import re
+import threading
+from hashlib import blake2b
+from typing import List, NamedTuple, Optional
+
+from config_store import atomic_write_text
+
+
+class CheckpointError(ValueError):
+    pass
+
+
+class Checkpoint(NamedTuple):
+    config: str
+    version: str  # StepProgram.version the state belongs to
+    repeat: int  # passes the run was asked for, 0 = until stopped
+    repeat_index: int
+    pc: int  # next instruction
+    stack: List[int]  # return addresses, innermost last
+    counters: List[int]  # loop counters
+    rows: List[int]  # next jitter batch row for each click slot
+    branch_hits: List[int]
+    branch_seen: List[bool]
+    batch_rng: dict  # RNG state the current jitter batch was drawn from
+    rng: dict  # RNG state now
+    done: int  # steps completed so far
+    saved_at: float
+
+
+def load_checkpoint(path: str) -> Optional[Checkpoint]:
+    """The checkpoint at `path`, or None if there is none"""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        raise CheckpointError(f"{path}: {e}") from None
+    try:
+        return Checkpoint(**data)
+    except TypeError:
+        raise CheckpointError(f"{path}: not a checkpoint") from None
+
+
+def checkpoint_path(directory: str, config_name: str) -> str:
+    """One file per config; the hash keeps names that sanitize alike apart"""
+    safe = re.sub(r"[^\w-]+", "_", config_name)[:40]
+    digest = blake2b(config_name.encode(), digest_size=4).hexdigest()
+    return os.path.join(directory, f"{safe}-{digest}.json")
+
+
+class CheckpointWriter:
+    """Keeps the newest checkpoint and writes it to `path` from a background thread.
+
+    `save()` only swaps a reference and wakes the writer, so the run thread
+    never waits on the disk. The writer serializes the latest checkpoint
+    and atomically replaces the file; states superseded while it was busy
+    are skipped. A crash loses at most the steps since the last write.
+    `close()` writes the final state synchronously and fsyncs it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.writes = 0
+        self._latest: Optional[Checkpoint] = None
+        self._written: Optional[Checkpoint] = None
+        self._cond = threading.Condition()
+        self._file_lock = threading.Lock()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+    def save(self, checkpoint: Checkpoint):
+        with self._cond:
+            self._latest = checkpoint
+            if self._thread is None:
+                directory = os.path.dirname(os.path.abspath(self.path))
+                os.makedirs(directory, exist_ok=True)
+                self._thread = threading.Thread(target=self._write_loop, name="checkpoint", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed or self._latest is not self._written)
+                if self._closed:
+                    return
+                checkpoint = self._latest
+            self._write(checkpoint, sync=False)
+
+    def _write(self, checkpoint: Checkpoint, sync: bool):
+        with self._file_lock:
+            atomic_write_text(self.path, json.dumps(checkpoint._asdict()), sync=sync)
+            self._written = checkpoint
+            self.writes += 1
+
+    def _stop_thread(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join()
+
+    def close(self):
+        """Write the last checkpoint durably and stop the writer"""
+        self._stop_thread()
+        if self._latest is not None:
+            self._write(self._latest, sync=True)
+
+    def discard(self):
+        """Stop the writer and delete the file, e.g. once the run completed"""
+        self._stop_thread()
+        with self._file_lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
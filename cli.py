@@ -0,0 +1,227 @@
+"""Run a saved config from the command line, without the GUI.
+
+    python -m cli "My Config" --window "Game Title" --repeat 10
+    python -m cli "My Config" --dry-run
+    python -m cli "My Config" --simulate --repeat 5000
+
+Nothing here imports Qt; window enumeration and input libraries are only
+loaded once a real run needs them.
+"""
+import argparse
+import os
+import sys
+import threading
+
+from adaptive import AdaptiveDelays, store_learned
+from checkpoint import CheckpointError, CheckpointWriter, load_checkpoint
+from config_store import ConfigValidationError, open_store
+from input_backend import BACKENDS, RecordingInputBackend, create_backend
+from run_engine import RunEngine, RunListener
+from screen_capture import MatcherPool
+from simulator import SIMULATED_REPEATS, format_report, simulate
+from telemetry import Telemetry, TraceWriter
+from trajectories import TrajectoryCache, TrajectoryMover
+
+
+class _DryRunWindow:
+    """Stand-in target for dry runs without --window: a focused full-screen window at the origin"""
+    left, top, width, height = 0, 0, 1920, 1080
+    isActive = True
+
+    def activate(self):
+        pass
+
+
+class CliListener(RunListener):
+    def __init__(self, quiet: bool = False):
+        self.quiet = quiet
+        self.repeat_index = 0
+        self.step = None
+        self.error = None
+
+    def on_step(self, repeat_index, step_index, step):
+        self.repeat_index = repeat_index
+        self.step = step
+
+    def on_click(self, step_index, x, y):
+        if not self.quiet:
+            print(f"[{self.repeat_index + 1}] step {step_index + 1} {self.step.name}: click ({x}, {y})", flush=True)
+
+    def on_cycle(self, repeat_index, seconds):
+        if not self.quiet:
+            print(f"[{repeat_index + 1}] cycle took {seconds:.3f}s", flush=True)
+
+    def on_error(self, message):
+        self.error = message
+        print(f"error: {message}", file=sys.stderr, flush=True)
+
+
+def find_window(title: str):
+    from window_registry import WindowRegistry
+    registry = WindowRegistry()
+    registry.poll()
+    return registry.find(title)
+
+
+def run_simulation(args, store, config) -> int:
+    """Simulate instead of running; --window only lends its geometry. Returns 1 if the report finds problems."""
+    window = None
+    if args.window:
+        window = find_window(args.window)
+        if window is None:
+            print(f"No window titled '{args.window}'", file=sys.stderr)
+            return 2
+    try:
+        report = simulate(config, args.repeat or SIMULATED_REPEATS, store.get, window, args.seed, args.paths)
+    except ValueError as e:
+        print(f"Invalid config: {e}", file=sys.stderr)
+        return 2
+    print(format_report(report))
+    return 0 if report.ok else 1
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m cli", description="Run a saved auto clicker config.")
+    parser.add_argument("config", nargs="?", help="name of the config to run")
+    parser.add_argument("--window", help="title of the window to click into")
+    parser.add_argument("--repeat", type=int,
+                        help="passes over the steps, 0 to run until stopped (default 1, or the checkpoint's)")
+    parser.add_argument("--seed", type=int, help="seed for click jitter, to replay a run exactly")
+    parser.add_argument("--dry-run", action="store_true", help="print clicks instead of sending them")
+    parser.add_argument("--simulate", action="store_true",
+                        help=f"run on a virtual clock and report cycle times, click spread and layout problems "
+                             f"(default {SIMULATED_REPEATS} repeats)")
+    parser.add_argument("--config-file", default="configs.json", help="configs.json or a .db store")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), help="input backend (default: per platform)")
+    parser.add_argument("--paths", action="store_true", help="move the cursor along human-like paths")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="fit delays to when each target is seen to be ready, and save what was learned")
+    parser.add_argument("--checkpoint", help="save progress to this file after every step")
+    parser.add_argument("--resume", action="store_true", help="carry on from where the --checkpoint file left off")
+    parser.add_argument("--trace", help="append a JSON Lines telemetry trace to this file")
+    parser.add_argument("--list", action="store_true", help="list config names and exit")
+    parser.add_argument("--quiet", action="store_true", help="only print the summary")
+    return parser
+
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    try:
+        store = open_store(args.config_file)
+    except (OSError, ValueError) as e:
+        print(f"Could not open {args.config_file}: {e}", file=sys.stderr)
+        return 2
+    if args.list:
+        for name in store.names():
+            print(name)
+        return 0
+    if not args.config:
+        parser.error("a config name is required (use --list to see them)")
+    if args.config not in store:
+        print(f"No config named '{args.config}'. Available: {', '.join(store.names()) or 'none'}", file=sys.stderr)
+        return 2
+    if args.repeat is not None and args.repeat < 0:
+        parser.error("--repeat can't be negative")
+    if args.resume and not args.checkpoint:
+        parser.error("--resume needs --checkpoint")
+    try:
+        config = store.get(args.config)
+    except ConfigValidationError as e:
+        print(f"Invalid config: {e}", file=sys.stderr)
+        return 2
+
+    if args.simulate:
+        return run_simulation(args, store, config)
+
+    if args.window:
+        window = find_window(args.window)
+        if window is None:
+            print(f"No window titled '{args.window}'", file=sys.stderr)
+            return 2
+    elif args.dry_run:
+        window = _DryRunWindow()
+    else:
+        parser.error("--window is required unless --dry-run is given")
+
+    resume = None
+    if args.resume:
+        try:
+            resume = load_checkpoint(args.checkpoint)
+        except CheckpointError as e:
+            print(f"Can't resume: {e}", file=sys.stderr)
+            return 2
+        if resume is None:
+            print(f"No checkpoint at {args.checkpoint}", file=sys.stderr)
+            return 2
+    if args.repeat is None:
+        args.repeat = resume.repeat if resume else 1
+
+    try:
+        backend = RecordingInputBackend() if args.dry_run else create_backend(args.backend)
+    except Exception as e:
+        print(f"Mouse input unavailable: {e} (use --dry-run to record clicks instead)", file=sys.stderr)
+        return 2
+    telemetry = Telemetry(len(config.steps), trace=TraceWriter(args.trace) if args.trace else None)
+    listener = CliListener(args.quiet)
+    mover = TrajectoryMover(TrajectoryCache(seed=args.seed)) if args.paths else None
+    matchers = MatcherPool()
+    try:
+        engine = RunEngine(config, window, args.repeat, backend, listener, seed=args.seed, telemetry=telemetry,
+                           configs=store.get, mover=mover, matchers=matchers,
+                           checkpoint=CheckpointWriter(args.checkpoint) if args.checkpoint else None,
+                           resume=resume, adaptive=AdaptiveDelays() if args.adaptive else None)
+    except CheckpointError as e:
+        print(f"Can't resume: {e}", file=sys.stderr)
+        telemetry.close()
+        backend.close()
+        return 2
+    except ValueError as e:
+        print(f"Invalid config: {e}", file=sys.stderr)
+        telemetry.close()
+        backend.close()
+        return 2
+
+    if resume:
+        print(f"Resuming at pass {resume.repeat_index + 1} after {resume.done} steps", flush=True)
+    # Run on a worker so Ctrl+C lands here and can stop the engine cleanly
+    thread = threading.Thread(target=engine.run, name="cli-run")
+    thread.start()
+    try:
+        while thread.is_alive():
+            thread.join(0.2)
+    except KeyboardInterrupt:
+        engine.stop()
+        thread.join()
+    finally:
+        telemetry.close()
+        backend.close()
+        matchers.close()
+
+    cycles = telemetry.cycle_stats()
+    passes = cycles.count + (resume.repeat_index if resume else 0)
+    print(f"{'Stopped' if engine.stopped else 'Finished'}: {passes}/{args.repeat or 'unlimited'} cycles", end="")
+    if cycles.count:
+        print(f", p50 {cycles.p50:.3f}s, p95 {cycles.p95:.3f}s", end="")
+    print()
+    if engine.adaptive:
+        adaptive = engine.adaptive.stats()
+        print(f"Adaptive delays: waited {adaptive.effective:.1f}s instead of {adaptive.configured:.1f}s, "
+              f"cycles {adaptive.cycle_reduction:.0%} shorter ({adaptive.observed} ready, {adaptive.early} early)")
+        if store_learned(store, engine.program):
+            try:
+                store.save()
+            except (OSError, ValueError) as e:
+                print(f"Could not save learned delays: {e}", file=sys.stderr)
+    if engine.checkpoint and os.path.exists(args.checkpoint):
+        print(f"Progress saved to {args.checkpoint}; add --resume to carry on")
+    if engine.mover:
+        paths = engine.mover.stats()
+        print(f"Paths: {paths.events} cursor events, p99 lateness {paths.jitter_p99 * 1000:.2f} ms, "
+              f"{paths.cpu_per_event * 1e6:.0f} us CPU per event")
+    return 1 if engine.stopped or listener.error else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
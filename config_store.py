@@ -0,0 +1,418 @@
+import json
+import os
+import sqlite3
+import tempfile
+from typing import Dict, List, NamedTuple, Optional, Set
+
+from models import BRANCH_CONDITIONS, CONTROL_KINDS, DISTRIBUTIONS, STEP_KINDS, VISION_KINDS, Config
+
+
+class ConfigValidationError(ValueError):
+    pass
+
+
+class ConfigConflictError(ValueError):
+    """The backing file or database was changed by someone else since it was last loaded or saved"""
+    pass
+
+
+class ConfigChanges(NamedTuple):
+    """What a `reload()` found, by config name"""
+    added: List[str]
+    removed: List[str]
+    changed: List[str]  # updated in place from disk
+    conflicts: List[str]  # changed on disk and edited here; the in-memory version was kept
+    errors: List[str]  # changed configs that failed validation and were left as they were
+
+    def __bool__(self):
+        return any(self)
+
+
+def _check(condition: bool, where: str, message: str):
+    if not condition:
+        raise ConfigValidationError(f"{where}: {message}")
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate_config_header(data, where: str = "config"):
+    """Cheap structural check done for every config at load time"""
+    _check(isinstance(data, dict), where, "expected an object")
+    _check(isinstance(data.get("name"), str) and data["name"].strip() != "", where, "missing name")
+    _check(isinstance(data.get("steps", []), list), f"{where} '{data['name']}'", "steps must be a list")
+
+
+def validate_step(step, at: str = "step"):
+    """Schema check for one step's dict"""
+    _check(isinstance(step, dict), at, "expected an object")
+    for key in ("x", "y"):
+        _check(isinstance(step.get(key), int) and not isinstance(step.get(key), bool), at, f"{key} must be an integer")
+    for key in ("radius", "delay_min", "delay_max"):
+        _check(_is_number(step.get(key)) and step[key] >= 0, at, f"{key} must be a non-negative number")
+    _check(step["delay_min"] <= step["delay_max"], at, "delay_min is greater than delay_max")
+    for key in ("adapt_min", "adapt_max"):
+        _check(_is_number(step.get(key, 0.0)) and step.get(key, 0.0) >= 0, at,
+               f"{key} must be a non-negative number")
+    ready = step.get("ready")
+    _check(ready is None or (isinstance(ready, dict) and all(
+        isinstance(ready.get(key), list) and all(_is_number(v) for v in ready[key])
+        for key in ("samples", "early"))), at, "ready must hold lists of samples and early seconds")
+    _check(step.get("distribution", "uniform") in DISTRIBUTIONS, at, "unknown distribution")
+    kind = step.get("kind", "click")
+    _check(kind in STEP_KINDS, at, f"unknown kind '{kind}'")
+    if kind in CONTROL_KINDS:
+        count = step.get("count", 1)
+        _check(isinstance(count, int) and not isinstance(count, bool) and count >= 0, at,
+               "count must be a non-negative integer")
+        if kind not in ("loop", "end_loop"):
+            _check(isinstance(step.get("target"), str) and step["target"] != "", at, f"{kind} needs a target")
+        if kind == "branch":
+            _check(step.get("condition", "every") in BRANCH_CONDITIONS, at, "unknown branch condition")
+    if kind in VISION_KINDS or (kind == "branch" and step.get("condition", "every") == "template"):
+        _check(isinstance(step.get("template"), str) and step["template"] != "", at, "missing template")
+        region = step.get("region")
+        _check(region is None or (isinstance(region, list) and len(region) == 4
+                                  and all(isinstance(v, int) for v in region)),
+               at, "region must be [x, y, w, h]")
+
+
+def validate_config(data, where: str = "config"):
+    """Full schema check, done when a config is first opened and before it is saved"""
+    validate_config_header(data, where)
+    where = f"{where} '{data['name']}'"
+    for i, step in enumerate(data.get("steps", [])):
+        validate_step(step, f"{where} step {i + 1}")
+
+
+def atomic_write_text(path: str, text: str, sync: bool = True):
+    """Write via a temp file in the same directory and rename over `path`.
+
+    A crash mid-write leaves the previous file untouched. Without `sync`
+    the data isn't forced to disk first, which is much cheaper but only
+    safe against the app crashing, not the machine.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=os.path.basename(path), dir=directory)
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class ConfigStore:
+    """Configs indexed by name, built lazily and saved incrementally.
+
+    Only a config's raw dict is kept until `get()` first asks for it. On
+    `save()`, materialized configs are compared against the dict they were
+    built from and only the ones that differ, plus additions and removals,
+    are handed to the backend's `_write`.
+
+    Backends report a `_stamp()` that changes when another writer touches
+    their storage. `save()` refuses to write over such changes until
+    `reload()` has merged them in.
+    """
+
+    def __init__(self):
+        # name -> last persisted dict, in display order; None until fetched, {} if never saved
+        self._raw: Dict[str, Optional[dict]] = {}
+        self._configs: Dict[str, Config] = {}
+        self._removed: Set[str] = set()
+        self._synced = None  # _stamp() as of the last load, reload or save
+
+    def names(self) -> List[str]:
+        return list(self._raw)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._raw
+
+    def __len__(self) -> int:
+        return len(self._raw)
+
+    def _fetch(self, name: str) -> dict:
+        raise NotImplementedError
+
+    def _write(self, dirty: Dict[str, dict], removed: Set[str]):
+        raise NotImplementedError
+
+    def _read_all(self) -> Dict[str, dict]:
+        """Every persisted config, in order, header-validated"""
+        raise NotImplementedError
+
+    def _stamp(self):
+        """A value that changes whenever another writer touches the storage; None if it can't"""
+        return None
+
+    def _rebase(self, name: str, data: Optional[dict]):
+        """Record `data` as the last persisted form of `name`"""
+        self._raw[name] = data
+
+    def get(self, name: str) -> Config:
+        config = self._configs.get(name)
+        if config is None:
+            data = self._raw[name]
+            if data is None:
+                data = self._raw[name] = self._fetch(name)
+            validate_config(data)
+            config = self._configs[name] = Config.from_dict(data)
+            # Compare future edits against the normalized form, not an older file layout
+            self._raw[name] = config.to_dict()
+        return config
+
+    def add(self, config: Config):
+        if config.name in self._raw:
+            raise ValueError(f"A config named '{config.name}' already exists")
+        self._raw[config.name] = {}
+        self._configs[config.name] = config
+        self._removed.discard(config.name)
+
+    def remove(self, name: str):
+        del self._raw[name]
+        self._configs.pop(name, None)
+        self._removed.add(name)
+
+    def dirty(self) -> Dict[str, dict]:
+        """Serialized form of every config that changed since it was loaded or saved"""
+        changed = {}
+        for name, config in self._configs.items():
+            data = config.to_dict()
+            if data != self._raw.get(name):
+                changed[name] = data
+        return changed
+
+    def changed_on_disk(self) -> bool:
+        return self._stamp() != self._synced
+
+    def save(self, force: bool = False) -> bool:
+        """Persist changes. Returns False when there was nothing to write.
+
+        Raises ConfigConflictError if the storage changed since it was last
+        read, unless `force` is set to write over it anyway, and
+        ConfigValidationError, writing nothing, if a changed config is
+        invalid, since it couldn't be opened again.
+        """
+        dirty = self.dirty()
+        if not dirty and not self._removed:
+            return False
+        for data in dirty.values():
+            validate_config(data)
+        if not force and self.changed_on_disk():
+            raise ConfigConflictError("configs were changed elsewhere since they were loaded; reload first")
+        self._write(dirty, self._removed)
+        self._raw.update(dirty)
+        self._removed = set()
+        self._synced = self._stamp()
+        return True
+
+    def reload(self) -> ConfigChanges:
+        """Merge in what another writer saved since the last load or save.
+
+        Configs only changed on disk are updated in place, so whoever holds
+        the Config object sees the new steps. A config also edited here is a
+        conflict: the in-memory version is kept but the disk version becomes
+        its base, so saving it over the other edit is a deliberate choice
+        (see `revert`). Unsaved additions and pending removals are kept.
+        """
+        stamp = self._stamp()
+        disk = self._read_all()
+        changes = ConfigChanges([], [], [], [], [])
+        previous = self._raw
+        self._raw = {}
+        for name, data in disk.items():
+            if name in self._removed:
+                continue
+            if name not in previous:
+                self._rebase(name, data)
+                changes.added.append(name)
+                continue
+            base = previous[name]
+            config = self._configs.get(name)
+            if config is None:
+                if data == base:
+                    self._raw[name] = base
+                    continue
+                self._rebase(name, data)
+                if base is not None:
+                    changes.changed.append(name)
+                continue
+            try:
+                validate_config(data)
+            except ConfigValidationError as e:
+                self._raw[name] = base
+                changes.errors.append(str(e))
+                continue
+            fresh = Config.from_dict(data)
+            normalized = fresh.to_dict()
+            if normalized == base:
+                self._raw[name] = base
+                continue
+            if config.to_dict() != base:
+                changes.conflicts.append(name)
+            else:
+                config.relative, config.steps = fresh.relative, fresh.steps
+                changes.changed.append(name)
+            self._rebase(name, normalized)
+        for name, base in previous.items():
+            if name in self._raw:
+                continue
+            config = self._configs.get(name)
+            if base == {}:
+                self._raw[name] = base  # added here and not saved yet
+            elif config is not None and config.to_dict() != base:
+                # Deleted there but edited here: keep it, as a config that was never saved
+                self._rebase(name, {})
+                changes.conflicts.append(name)
+            else:
+                self._configs.pop(name, None)
+                changes.removed.append(name)
+        self._synced = stamp
+        return changes
+
+    def revert(self, name: str):
+        """Drop in-memory edits to `name`, back to its last persisted (or reloaded) version"""
+        base = self._raw[name]
+        if base == {}:
+            self.remove(name)
+            return
+        config = self._configs.get(name)
+        if config is not None:
+            fresh = Config.from_dict(base)
+            config.relative, config.steps = fresh.relative, fresh.steps
+
+
+def encode_config(data: dict) -> str:
+    """One config as JSON with a step per line.
+
+    Each piece goes through json's C encoder (it is bypassed whenever
+    `indent` is set) while the file stays readable and diffable.
+    """
+    head = {key: value for key, value in data.items() if key != "steps"}
+    steps = data.get("steps", [])
+    opening = "  " + json.dumps(head)[:-1] + ', "steps": ['
+    if not steps:
+        return opening + "]}"
+    body = ",\n".join("    " + json.dumps(step) for step in steps)
+    return f"{opening}\n{body}\n  ]}}"
+
+
+class JsonConfigStore(ConfigStore):
+    """The configs.json array, rewritten atomically.
+
+    Clean configs reuse their cached encoding, so a save costs one encode
+    per changed config plus the file write. With `path` None the store
+    lives only in memory.
+    """
+
+    def __init__(self, path: Optional[str]):
+        super().__init__()
+        self.path = path
+        self._encoded: Dict[str, str] = {}
+        self._synced = self._stamp()
+        self._raw.update(self._read_all())
+
+    def _read_all(self) -> Dict[str, dict]:
+        entries: Dict[str, dict] = {}
+        if not self.path or not os.path.exists(self.path):
+            return entries
+        with open(self.path, "r") as f:
+            data = json.load(f)
+        _check(isinstance(data, list), self.path, "expected a list of configs")
+        for i, entry in enumerate(data):
+            validate_config_header(entry, f"{self.path} config {i + 1}")
+            _check(entry["name"] not in entries, self.path, f"duplicate config '{entry['name']}'")
+            entries[entry["name"]] = entry
+        return entries
+
+    def _stamp(self):
+        # Atomic saves replace the file, so the inode changes even when mtime and size don't
+        if not self.path:
+            return None
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def _rebase(self, name: str, data: Optional[dict]):
+        super()._rebase(name, data)
+        self._encoded.pop(name, None)
+
+    def _fetch(self, name: str) -> dict:
+        return self._raw[name]
+
+    def _write(self, dirty: Dict[str, dict], removed: Set[str]):
+        for name in removed:
+            self._encoded.pop(name, None)
+        for name, data in dirty.items():
+            self._encoded[name] = encode_config(data)
+        if not self.path:
+            return
+        parts = []
+        for name, data in self._raw.items():
+            encoded = self._encoded.get(name)
+            if encoded is None:
+                encoded = self._encoded[name] = encode_config(data)
+            parts.append(encoded)
+        atomic_write_text(self.path, "[\n" + ",\n".join(parts) + "\n]\n" if parts else "[]\n")
+
+
+class SqliteConfigStore(ConfigStore):
+    """One row per config; names load up front and step lists on first use.
+
+    Saves are a single transaction touching only changed rows.
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS configs ("
+            "name TEXT PRIMARY KEY, position INTEGER NOT NULL, data TEXT NOT NULL)"
+        )
+        for (name,) in self._db.execute("SELECT name FROM configs ORDER BY position"):
+            self._raw[name] = None
+        self._synced = self._stamp()
+
+    def _fetch(self, name: str) -> dict:
+        row = self._db.execute("SELECT data FROM configs WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0])
+
+    def _read_all(self) -> Dict[str, dict]:
+        entries = {}
+        for i, (name, data) in enumerate(self._db.execute("SELECT name, data FROM configs ORDER BY position")):
+            entry = json.loads(data)
+            validate_config_header(entry, f"{self.path} config {i + 1}")
+            entries[name] = entry
+        return entries
+
+    def _stamp(self):
+        # Only moves when another connection commits, so our own saves don't count
+        return self._db.execute("PRAGMA data_version").fetchone()[0]
+
+    def _write(self, dirty: Dict[str, dict], removed: Set[str]):
+        positions = {name: i for i, name in enumerate(self._raw)}
+        with self._db:
+            self._db.executemany("DELETE FROM configs WHERE name = ?", [(name,) for name in removed])
+            self._db.executemany(
+                "INSERT INTO configs (name, position, data) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET position = excluded.position, data = excluded.data",
+                [(name, positions[name], json.dumps(data)) for name, data in dirty.items()],
+            )
+
+    def close(self):
+        self._db.close()
+
+
+def open_store(path: str) -> ConfigStore:
+    if path.endswith((".db", ".sqlite", ".sqlite3")):
+        return SqliteConfigStore(path)
+    return JsonConfigStore(path)
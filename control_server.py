@@ -0,0 +1,609 @@
+"""Local control API: drive runs from scripts through a job queue.
+
+    python -m control_server                  # listen on 127.0.0.1:8765
+    python -m control_server --dry-run        # same, recording clicks instead of sending them
+
+Every request and response body is JSON:
+
+    GET  /configs                     config names
+    GET  /windows                     window titles
+    GET  /jobs                        unfinished and recently finished jobs, oldest first
+    POST /jobs                        enqueue {"config", "window", "repeat": 1, "seed", "priority": 0}
+    GET  /jobs/<id>                   one job
+    POST /jobs/<id>/pause             hold a queued job or pause a running one
+    POST /jobs/<id>/resume
+    POST /jobs/<id>/stop              cancel a queued job or stop a running one
+    GET  /events?since=N&timeout=S    events numbered after N, waiting up to S seconds for one
+
+Jobs run one at a time, highest priority first and in submission order
+within a priority. The server only listens on loopback, rejects Host
+headers that aren't loopback names and only takes POSTs with a JSON
+content type, so a web page can't drive it through the browser.
+"""
+import argparse
+import heapq
+import http.client
+import itertools
+import json
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from config_store import ConfigStore, open_store
+from input_backend import BACKENDS, InputBackend, RecordingInputBackend, create_backend
+from run_engine import RunEngine, RunListener
+from scheduler import DeadlineScheduler, PrecisionWaiter
+from screen_capture import MatcherPool
+from step_program import StepProgram
+from trajectories import TrajectoryCache, TrajectoryMover
+
+DEFAULT_PORT = 8765
+MAX_EVENT_WAIT = 30.0  # longest a single /events poll may block
+PROGRESS_INTERVAL = 0.05  # at most this often per job, progress becomes an event
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "[::1]")
+KEEP_FINISHED_JOBS = 1000  # finished jobs kept for GET /jobs; older ones are forgotten
+MAX_BODY = 64 * 1024  # bytes; a job request is a few hundred
+
+# Job states; the last four are final
+QUEUED, HELD, RUNNING, PAUSED, FINISHED, STOPPED, FAILED, CANCELLED = (
+    "queued", "held", "running", "paused", "finished", "stopped", "failed", "cancelled")
+FINAL_STATES = (FINISHED, STOPPED, FAILED, CANCELLED)
+
+
+class Job:
+    def __init__(self, job_id: int, config: str, window: str, repeat: int = 1,
+                 seed: Optional[int] = None, priority: int = 0):
+        self.id = job_id
+        self.config = config
+        self.window = window
+        self.repeat = repeat
+        self.seed = seed
+        self.priority = priority
+        self.state = QUEUED
+        self.done = 0
+        self.total = 0
+        self.cycles = 0
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.engine: Optional[RunEngine] = None
+        self.stop_requested = False  # stopped between leaving the queue and its engine existing
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "config": self.config,
+            "window": self.window,
+            "repeat": self.repeat,
+            "seed": self.seed,
+            "priority": self.priority,
+            "state": self.state,
+            "done": self.done,
+            "total": self.total,
+            "cycles": self.cycles,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class EventLog:
+    """Numbered events in a bounded ring, read by polling with a cursor.
+
+    A reader passes the last number it saw and gets everything newer,
+    blocking up to `timeout` while there is nothing. A reader more than
+    `size` events behind misses the oldest, which shows as a gap in the
+    numbers.
+    """
+
+    def __init__(self, size: int = 4096):
+        self._events = deque(maxlen=size)
+        self._cond = threading.Condition()
+        self.seq = 0
+
+    def emit(self, event: str, **fields) -> dict:
+        with self._cond:
+            self.seq += 1
+            entry = {"seq": self.seq, "t": round(time.time(), 6), "event": event}
+            entry.update(fields)
+            self._events.append(entry)
+            self._cond.notify_all()
+        return entry
+
+    def since(self, seq: int, timeout: float = 0.0) -> List[dict]:
+        with self._cond:
+            if self.seq <= seq and timeout > 0:
+                self._cond.wait_for(lambda: self.seq > seq, timeout)
+            # Numbers are consecutive, so what's newer than `seq` is the tail of the ring
+            newer = min(max(self.seq - seq, 0), len(self._events))
+            return list(itertools.islice(self._events, len(self._events) - newer, None))
+
+
+class _JobListener(RunListener):
+    def __init__(self, runner: "JobRunner", job: Job):
+        self.runner = runner
+        self.job = job
+        self._progress_at = 0.0
+
+    def on_progress(self, done, total):
+        self.job.done, self.job.total = done, total
+        now = time.perf_counter()
+        if now - self._progress_at >= PROGRESS_INTERVAL:
+            self._progress_at = now
+            self.runner.events.emit("progress", job=self.job.id, done=done, total=total)
+
+    def on_cycle(self, repeat_index, seconds):
+        self.job.cycles = repeat_index + 1
+        self.runner.events.emit("cycle", job=self.job.id, repeat=repeat_index, seconds=round(seconds, 6))
+
+    def on_paused(self, paused):
+        with self.runner._cond:
+            # A pause that lands as the run ends mustn't bring a final job back
+            if self.job.state in (RUNNING, PAUSED):
+                self.runner._set_state(self.job, PAUSED if paused else RUNNING)
+
+    def on_error(self, message):
+        self.job.error = message or "the run failed"
+
+
+class JobRunner:
+    """A priority queue of jobs run back to back on one worker thread.
+
+    The next job is taken the moment the previous engine returns. The
+    PrecisionWaiter is shared, so it is calibrated once rather than per
+    job, and jobs start without the lead-in a human needs after pressing
+    Start: the engine still waits out the focus settle time if it has to
+    activate the window. Queued jobs can be held and released. Running
+    jobs are paused, resumed and stopped through their engine. Only the
+    last `keep_finished` finished jobs are kept, so a server that runs
+    for weeks doesn't grow with every job.
+    """
+
+    def __init__(self, store: ConfigStore, backend: InputBackend,
+                 find_window: Callable[[str], object],
+                 window_titles: Callable[[], List[str]] = list,
+                 mover: Optional[TrajectoryMover] = None,
+                 focus_settle: float = 1.0, cycle_gap: float = 1.0,
+                 waiter: Optional[PrecisionWaiter] = None, matchers: Optional[MatcherPool] = None,
+                 keep_finished: int = KEEP_FINISHED_JOBS):
+        self.store = store
+        self.backend = backend
+        self.find_window = find_window
+        self.window_titles = window_titles
+        self.mover = mover
+        self.focus_settle = focus_settle
+        self.cycle_gap = cycle_gap
+        self.waiter = waiter or PrecisionWaiter()
+        self.matchers = matchers
+        self.events = EventLog()
+        self.keep_finished = keep_finished
+        self.jobs: Dict[int, Job] = {}
+        self._finished = deque()  # ids of finished jobs still in `jobs`, oldest first
+        self._heap = []  # (-priority, id, job); entries whose job isn't QUEUED any more are skipped
+        self._ids = itertools.count(1)
+        self._cond = threading.Condition()
+        self._store_lock = threading.Lock()
+        self._closing = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._work, name="job-runner", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Stop the running job, cancel the queued ones and wait for the worker"""
+        with self._cond:
+            self._closing = True
+            pending = [job for job in self.jobs.values() if job.state in (QUEUED, HELD, RUNNING, PAUSED)]
+            self._cond.notify_all()
+        for job in pending:
+            try:
+                self.stop(job.id)
+            except (KeyError, ValueError):
+                pass  # finished (and maybe forgotten) in the meantime
+        if self._thread:
+            self._thread.join()
+
+    def config_names(self) -> List[str]:
+        with self._store_lock:
+            return self.store.names()
+
+    def get_config(self, name: str):
+        with self._store_lock:
+            return self.store.get(name)
+
+    def submit(self, config: str, window: str, repeat: int = 1, seed: Optional[int] = None,
+               priority: int = 0) -> Job:
+        """Queue a run. Raises KeyError for an unknown config and ValueError for a bad one."""
+        if not isinstance(window, str) or not window:
+            raise ValueError("window must be a window title")
+        for name, value in (("repeat", repeat), ("priority", priority), ("seed", seed)):
+            if value is not None and (not isinstance(value, int) or isinstance(value, bool)):
+                raise ValueError(f"{name} must be an integer")
+        if repeat is None or repeat < 0:
+            raise ValueError("repeat must be 0 (until stopped) or more")
+        if config not in self.config_names():
+            raise KeyError(f"no config named '{config}'")
+        # Compile now so a broken config is refused here rather than failing in the queue
+        StepProgram(self.get_config(config), resolve=self.get_config)
+        with self._cond:
+            if self._closing:
+                raise ValueError("the runner is shutting down")
+            job = Job(next(self._ids), config, window, repeat, seed, priority)
+            self.jobs[job.id] = job
+            heapq.heappush(self._heap, (-priority, job.id, job))
+            self._cond.notify_all()
+        self.events.emit("queued", job=job.id, config=config, window=window, priority=priority)
+        return job
+
+    def job(self, job_id: int) -> Job:
+        try:
+            return self.jobs[job_id]
+        except KeyError:
+            raise KeyError(f"no job {job_id}") from None
+
+    def pause(self, job_id: int) -> Job:
+        job = self.job(job_id)
+        with self._cond:
+            if job.state == QUEUED:
+                self._set_state(job, HELD)
+                return job
+            engine = job.engine if job.state == RUNNING else None
+        if engine is None:
+            raise ValueError(f"job {job_id} is {job.state}")
+        engine.pause()
+        return job
+
+    def resume(self, job_id: int) -> Job:
+        job = self.job(job_id)
+        with self._cond:
+            if job.state == HELD:
+                self._set_state(job, QUEUED)
+                heapq.heappush(self._heap, (-job.priority, job.id, job))
+                self._cond.notify_all()
+                return job
+            engine = job.engine if job.state == PAUSED else None
+        if engine is None:
+            raise ValueError(f"job {job_id} is {job.state}")
+        engine.resume()
+        return job
+
+    def stop(self, job_id: int) -> Job:
+        job = self.job(job_id)
+        with self._cond:
+            if job.state in (QUEUED, HELD):
+                job.finished = time.time()
+                self._set_state(job, CANCELLED)
+                return job
+            if job.state not in (RUNNING, PAUSED):
+                raise ValueError(f"job {job_id} is {job.state}")
+            job.stop_requested = True
+            engine = job.engine
+        if engine is not None:
+            engine.stop()
+        return job
+
+    def _set_state(self, job: Job, state: str):
+        job.state = state
+        self.events.emit(state, job=job.id, **({"error": job.error} if state == FAILED else {}))
+        if state in FINAL_STATES:
+            # Always called under _cond once a job is final
+            self._finished.append(job.id)
+            while len(self._finished) > self.keep_finished:
+                self.jobs.pop(self._finished.popleft(), None)
+
+    def _next(self) -> Optional[Job]:
+        with self._cond:
+            while not self._closing:
+                while self._heap:
+                    job = heapq.heappop(self._heap)[2]
+                    if job.state == QUEUED:
+                        job.started = time.time()
+                        self._set_state(job, RUNNING)
+                        return job
+                self._cond.wait()
+        return None
+
+    def _work(self):
+        if self.waiter.accuracy is None:
+            self.waiter.calibrate()
+        while True:
+            job = self._next()
+            if job is None:
+                return
+            self._run(job)
+
+    def _run(self, job: Job):
+        listener = _JobListener(self, job)
+        engine = None
+        try:
+            window = self.find_window(job.window)
+            if window is None:
+                raise LookupError(f"no window titled '{job.window}'")
+            scheduler = DeadlineScheduler(self.waiter.clock, focus_settle=self.focus_settle,
+                                          cycle_gap=self.cycle_gap, lead_in=0.0)
+            engine = RunEngine(self.get_config(job.config), window, job.repeat, self.backend, listener,
+                               waiter=self.waiter, scheduler=scheduler, seed=job.seed, name=f"job {job.id}",
+                               configs=self.get_config, mover=self.mover, matchers=self.matchers)
+        except Exception as e:
+            # Whatever goes wrong fails this job only; the queue behind it carries on
+            job.error = str(e) or type(e).__name__
+        else:
+            with self._cond:
+                job.engine = engine
+                stop_requested = job.stop_requested or self._closing
+            if stop_requested:
+                engine.stop()
+            try:
+                engine.run()
+            except Exception as e:
+                job.error = str(e) or type(e).__name__
+        with self._cond:
+            job.engine = None
+            job.finished = time.time()
+            if job.error:
+                state = FAILED
+            elif engine.stopped:
+                state = STOPPED
+            else:
+                state = FINISHED
+            self._set_state(job, state)
+
+
+class ControlApi:
+    """Request routing, independent of the transport so it can be driven directly"""
+
+    def __init__(self, runner: JobRunner):
+        self.runner = runner
+
+    def handle(self, method: str, parts: List[str], query: Dict[str, List[str]], body: Optional[dict]):
+        """Returns (status, data); raises KeyError for 404s and ValueError for 400s"""
+        runner = self.runner
+        if method == "GET" and parts == ["configs"]:
+            return 200, {"configs": runner.config_names()}
+        if method == "GET" and parts == ["windows"]:
+            return 200, {"windows": runner.window_titles()}
+        if method == "GET" and parts == ["events"]:
+            since = int(query.get("since", ["0"])[0])
+            timeout = min(float(query.get("timeout", ["0"])[0]), MAX_EVENT_WAIT)
+            events = runner.events.since(since, timeout)
+            return 200, {"events": events, "next": events[-1]["seq"] if events else max(since, 0)}
+        if parts[:1] == ["jobs"]:
+            if len(parts) == 1 and method == "GET":
+                return 200, {"jobs": [job.to_dict() for job in list(runner.jobs.values())]}
+            if len(parts) == 1 and method == "POST":
+                body = body or {}
+                if "config" not in body:
+                    raise ValueError("config is required")
+                job = runner.submit(body["config"], body.get("window"), body.get("repeat", 1),
+                                    body.get("seed"), body.get("priority", 0))
+                return 201, job.to_dict()
+            try:
+                job_id = int(parts[1])
+            except ValueError:
+                raise KeyError(f"no job {parts[1]}") from None
+            if len(parts) == 2 and method == "GET":
+                return 200, runner.job(job_id).to_dict()
+            actions = {"pause": runner.pause, "resume": runner.resume, "stop": runner.stop}
+            if len(parts) == 3 and method == "POST" and parts[2] in actions:
+                return 200, actions[parts[2]](job_id).to_dict()
+        raise KeyError(f"no route {method} /{'/'.join(parts)}")
+
+
+def _host_name(header: str) -> str:
+    """A Host header without its port; IPv6 literals keep their brackets"""
+    if header.startswith("["):
+        end = header.find("]")
+        return header[:end + 1] if end != -1 else header
+    return header.rsplit(":", 1)[0]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so pollers reuse one connection
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method: str):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0 or length > MAX_BODY:
+            # The body is left unread, so this connection can't carry another request
+            self.close_connection = True
+            if length < 0:
+                return self._reply(400, {"error": "Content-Length must be a non-negative integer"})
+            return self._reply(413, {"error": f"bodies are limited to {MAX_BODY} bytes"})
+        raw = self.rfile.read(length) if length else b""
+        if _host_name(self.headers.get("Host") or "") not in LOOPBACK_HOSTS:
+            return self._reply(403, {"error": "only local clients may connect"})
+        body = None
+        if method == "POST":
+            if self.headers.get_content_type() != "application/json":
+                return self._reply(415, {"error": "POST bodies must be application/json"})
+            try:
+                body = json.loads(raw) if raw else {}
+            except ValueError:
+                return self._reply(400, {"error": "body is not valid JSON"})
+            if not isinstance(body, dict):
+                return self._reply(400, {"error": "body must be a JSON object"})
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        try:
+            status, data = self.server.api.handle(method, parts, parse_qs(url.query), body)
+        except KeyError as e:
+            status, data = 404, {"error": e.args[0] if e.args else "not found"}
+        except ValueError as e:
+            status, data = 400, {"error": str(e)}
+        self._reply(status, data)
+
+    def _reply(self, status: int, data: dict):
+        payload = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class ControlServer(ThreadingHTTPServer):
+    """HTTP front end for a JobRunner on 127.0.0.1; port 0 picks a free port"""
+
+    daemon_threads = True
+
+    def __init__(self, runner: JobRunner, port: int = DEFAULT_PORT):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.api = ControlApi(runner)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="control-server", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+
+class ControlClient:
+    """Minimal client over one keep-alive connection.
+
+        client = ControlClient()
+        job = client.submit("My Config", "Game Title", repeat=5)
+        for event in client.follow():
+            print(event)
+    """
+
+    def __init__(self, port: int = DEFAULT_PORT, timeout: float = MAX_EVENT_WAIT + 5):
+        self._connection = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+
+    def request(self, method: str, path: str, body: Optional[dict] = None) -> dict:
+        headers = {}
+        payload = None
+        if body is not None or method == "POST":
+            payload = json.dumps(body or {})
+            headers["Content-Type"] = "application/json"
+        self._connection.request(method, path, payload, headers)
+        response = self._connection.getresponse()
+        data = json.loads(response.read() or b"{}")
+        if response.status >= 400:
+            raise RuntimeError(f"{response.status}: {data.get('error')}")
+        return data
+
+    def configs(self) -> List[str]:
+        return self.request("GET", "/configs")["configs"]
+
+    def windows(self) -> List[str]:
+        return self.request("GET", "/windows")["windows"]
+
+    def jobs(self) -> List[dict]:
+        return self.request("GET", "/jobs")["jobs"]
+
+    def job(self, job_id: int) -> dict:
+        return self.request("GET", f"/jobs/{job_id}")
+
+    def submit(self, config: str, window: str, repeat: int = 1, seed: Optional[int] = None,
+               priority: int = 0) -> dict:
+        return self.request("POST", "/jobs", {"config": config, "window": window, "repeat": repeat,
+                                              "seed": seed, "priority": priority})
+
+    def pause(self, job_id: int) -> dict:
+        return self.request("POST", f"/jobs/{job_id}/pause")
+
+    def resume(self, job_id: int) -> dict:
+        return self.request("POST", f"/jobs/{job_id}/resume")
+
+    def stop(self, job_id: int) -> dict:
+        return self.request("POST", f"/jobs/{job_id}/stop")
+
+    def events(self, since: int = 0, timeout: float = 0.0) -> dict:
+        return self.request("GET", f"/events?since={since}&timeout={timeout}")
+
+    def follow(self, since: int = 0):
+        """Yield events as they happen, forever"""
+        while True:
+            batch = self.events(since, MAX_EVENT_WAIT)
+            yield from batch["events"]
+            since = batch["next"]
+
+    def close(self):
+        self._connection.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m control_server", description="Serve the local control API.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"port on 127.0.0.1 (default {DEFAULT_PORT})")
+    parser.add_argument("--config-file", default="configs.json", help="configs.json or a .db store")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), help="input backend (default: per platform)")
+    parser.add_argument("--dry-run", action="store_true", help="record clicks instead of sending them")
+    parser.add_argument("--paths", action="store_true", help="move the cursor along human-like paths")
+    args = parser.parse_args(argv)
+
+    try:
+        store = open_store(args.config_file)
+    except (OSError, ValueError) as e:
+        print(f"Could not open {args.config_file}: {e}", file=sys.stderr)
+        return 2
+    registry = None
+    if args.dry_run:
+        from cli import _DryRunWindow
+        backend = RecordingInputBackend()
+        find_window, titles = (lambda title: _DryRunWindow()), list
+    else:
+        from window_registry import WindowRegistry
+        try:
+            backend = create_backend(args.backend)
+        except Exception as e:
+            print(f"Mouse input unavailable: {e} (use --dry-run to record clicks instead)", file=sys.stderr)
+            return 2
+        registry = WindowRegistry()
+        registry.start()
+        find_window, titles = registry.find, registry.titles
+    mover = TrajectoryMover(TrajectoryCache()) if args.paths else None
+    matchers = MatcherPool()
+    runner = JobRunner(store, backend, find_window, titles, mover=mover, matchers=matchers)
+    try:
+        server = ControlServer(runner, args.port)
+    except OSError as e:
+        print(f"Could not listen on port {args.port}: {e}", file=sys.stderr)
+        return 2
+    runner.start()
+    server.start()
+    print(f"Listening on http://127.0.0.1:{server.port}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        runner.close()
+        matchers.close()
+        if registry:
+            registry.stop()
+        backend.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,9 @@
 from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel,
-    QSpinBox, QDoubleSpinBox, QPushButton, QLineEdit
+    QSpinBox, QDoubleSpinBox, QPushButton, QLineEdit, QComboBox, QFileDialog, QMessageBox
 )
-from models import Step
+from config_store import ConfigValidationError, validate_step
+from models import BRANCH_CONDITIONS, CONTROL_KINDS, DISTRIBUTIONS, STEP_KINDS, VISION_KINDS, Step
 
 
 class EditStepDialog(QDialog):
@@ -38,18 +39,97 @@ class EditStepDialog(QDialog):
         self.delay_max_input.setRange(0, 60)
         self.delay_max_input.setValue(step.delay_max)
 
+        self.adapt_min_input = QDoubleSpinBox()
+        self.adapt_min_input.setRange(0, 60)
+        self.adapt_min_input.setValue(step.adapt_min)
+
+        self.adapt_max_input = QDoubleSpinBox()
+        self.adapt_max_input.setRange(0, 60)
+        self.adapt_max_input.setSpecialValueText("Delay Max")  # shown for 0
+        self.adapt_max_input.setValue(step.adapt_max)
+
+        self.distribution_input = QComboBox()
+        self.distribution_input.addItems(DISTRIBUTIONS)
+        self.distribution_input.setCurrentText(step.distribution)
+
+        self.kind_input = QComboBox()
+        self.kind_input.addItems(STEP_KINDS)
+        self.kind_input.setCurrentText(step.kind)
+        self.kind_input.currentTextChanged.connect(self.update_kind_fields)
+
+        self.template_input = QLineEdit(step.template)
+        self.template_browse_btn = QPushButton("...")
+        self.template_browse_btn.setFixedWidth(30)
+        self.template_browse_btn.clicked.connect(self.browse_template)
+
+        self.region_input = QLineEdit(", ".join(str(v) for v in step.region) if step.region else "")
+        self.region_input.setPlaceholderText("x, y, w, h (blank = whole window)")
+
+        self.threshold_input = QDoubleSpinBox()
+        self.threshold_input.setRange(0, 1)
+        self.threshold_input.setSingleStep(0.05)
+        self.threshold_input.setValue(step.threshold)
+
+        self.timeout_input = QDoubleSpinBox()
+        self.timeout_input.setRange(0, 3600)
+        self.timeout_input.setValue(step.timeout)
+
+        self.poll_interval_input = QDoubleSpinBox()
+        self.poll_interval_input.setRange(0.01, 10)
+        self.poll_interval_input.setValue(step.poll_interval)
+
+        self.target_input = QLineEdit(step.target)
+        self.count_input = QSpinBox()
+        self.count_input.setRange(0, 1_000_000)
+        self.count_input.setValue(step.count)
+        self.condition_input = QComboBox()
+        self.condition_input.addItems(BRANCH_CONDITIONS)
+        self.condition_input.setCurrentText(step.condition)
+        self.condition_input.currentTextChanged.connect(lambda _: self.update_kind_fields(self.kind_input.currentText()))
+
         layout.addWidget(QLabel("Name:"))
         layout.addWidget(self.name_input)
-        layout.addWidget(QLabel("X:"))
-        layout.addWidget(self.x_input)
-        layout.addWidget(QLabel("Y:"))
-        layout.addWidget(self.y_input)
-        layout.addWidget(QLabel("Radius:"))
-        layout.addWidget(self.radius_input)
-        layout.addWidget(QLabel("Delay Min:"))
-        layout.addWidget(self.delay_min_input)
-        layout.addWidget(QLabel("Delay Max:"))
-        layout.addWidget(self.delay_max_input)
+        layout.addWidget(QLabel("Kind:"))
+        layout.addWidget(self.kind_input)
+        self.click_widgets = []
+        for label, field in (("X:", self.x_input),
+                             ("Y:", self.y_input),
+                             ("Radius:", self.radius_input),
+                             ("Delay Min:", self.delay_min_input),
+                             ("Delay Max:", self.delay_max_input),
+                             ("Adaptive Delay Floor:", self.adapt_min_input),
+                             ("Adaptive Delay Cap:", self.adapt_max_input),
+                             ("Click Spread:", self.distribution_input)):
+            label_widget = QLabel(label)
+            layout.addWidget(label_widget)
+            layout.addWidget(field)
+            self.click_widgets += [label_widget, field]
+
+        self.target_label = QLabel()
+        self.count_label = QLabel()
+        self.condition_label = QLabel("Condition:")
+        for widget in (self.target_label, self.target_input, self.condition_label, self.condition_input,
+                       self.count_label, self.count_input):
+            layout.addWidget(widget)
+
+        template_layout = QHBoxLayout()
+        template_layout.addWidget(self.template_input)
+        template_layout.addWidget(self.template_browse_btn)
+        template_label = QLabel("Template:")
+        layout.addWidget(template_label)
+        layout.addLayout(template_layout)
+        self.template_widgets = [template_label, self.template_input, self.template_browse_btn]
+        self.vision_widgets = []
+        for label, field in (("Search Region:", self.region_input),
+                             ("Match Threshold:", self.threshold_input),
+                             ("Timeout (s):", self.timeout_input),
+                             ("Poll Interval (s):", self.poll_interval_input)):
+            label_widget = QLabel(label)
+            layout.addWidget(label_widget)
+            layout.addWidget(field)
+            widgets = self.template_widgets if field in (self.region_input, self.threshold_input) else self.vision_widgets
+            widgets += [label_widget, field]
+        self.update_kind_fields(step.kind)
 
         # Buttons
         btn_layout = QHBoxLayout()
@@ -63,12 +143,70 @@ class EditStepDialog(QDialog):
         btn_layout.addWidget(cancel_btn)
         layout.addLayout(btn_layout)
 
+    def update_kind_fields(self, kind):
+        condition = self.condition_input.currentText()
+        branch_template = kind == "branch" and condition == "template"
+        for widget in self.click_widgets:
+            widget.setVisible(kind not in CONTROL_KINDS)
+        for widget in self.template_widgets:
+            widget.setVisible(kind in VISION_KINDS or branch_template)
+        for widget in self.vision_widgets:
+            widget.setVisible(kind in VISION_KINDS)
+
+        self.target_label.setText("Config:" if kind == "call" else "Label:")
+        for widget in (self.target_label, self.target_input):
+            widget.setVisible(kind in ("label", "goto", "call", "branch"))
+        for widget in (self.condition_label, self.condition_input):
+            widget.setVisible(kind == "branch")
+        self.count_label.setText("Times (0 = forever):" if kind == "loop"
+                                 else "Every Nth Time:" if condition == "every" else "Chance (%):")
+        for widget in (self.count_label, self.count_input):
+            widget.setVisible(kind == "loop" or (kind == "branch" and not branch_template))
+
+    def browse_template(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Template Image", "", "Images (*.png *.bmp *.jpg *.npy)")
+        if path:
+            self.template_input.setText(path)
+
+    def get_region(self):
+        values = [v.strip() for v in self.region_input.text().split(",") if v.strip()]
+        if len(values) != 4:
+            return None
+        try:
+            return [int(v) for v in values]
+        except ValueError:
+            return None
+
+    def accept(self):
+        # Refuse what the config store would reject when the config is next opened
+        try:
+            validate_step(self.get_updated_step().to_dict())
+        except ConfigValidationError as e:
+            QMessageBox.warning(self, "Invalid Step", str(e))
+            return
+        super().accept()
+
     def get_updated_step(self) -> Step:
+        # Keep delay_min <= delay_max, as BulkEditDialog does
+        delay_min, delay_max = sorted((self.delay_min_input.value(), self.delay_max_input.value()))
         return Step(
             x=self.x_input.value(),
             y=self.y_input.value(),
             radius=self.radius_input.value(),
-            delay_min=self.delay_min_input.value(),
-            delay_max=self.delay_max_input.value(),
-            name=self.name_input.text()
+            delay_min=delay_min,
+            delay_max=delay_max,
+            name=self.name_input.text(),
+            distribution=self.distribution_input.currentText(),
+            kind=self.kind_input.currentText(),
+            template=self.template_input.text(),
+            region=self.get_region(),
+            threshold=self.threshold_input.value(),
+            timeout=self.timeout_input.value(),
+            poll_interval=self.poll_interval_input.value(),
+            target=self.target_input.text().strip(),
+            count=self.count_input.value(),
+            condition=self.condition_input.currentText(),
+            adapt_min=self.adapt_min_input.value(),
+            adapt_max=self.adapt_max_input.value(),
+            ready=self.step.ready
         )
\ No newline at end of file
@@ -0,0 +1,133 @@
+"""Process resource sampling for soak tests and the health panel.
+
+Sampling is cheap by default: RSS from the OS, the thread count and, once
+a Qt application exists, its widget count. Python allocations are only
+tracked when `trace_python` is set, since tracemalloc slows every
+allocation down; with it, the allocation sites that grew most since the
+baseline can be listed.
+"""
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from typing import List, NamedTuple, Optional
+
+TOP_ALLOCATORS = 10
+
+
+class ResourceSample(NamedTuple):
+    at: float  # time.monotonic()
+    cycles: int
+    rss: Optional[int]  # bytes, None where it can't be read
+    python_heap: Optional[int]  # bytes traced by tracemalloc, None when not tracing
+    threads: int
+    qt_objects: Optional[int]  # live Qt widgets, None without a Qt application
+
+
+class ResourceGrowth(NamedTuple):
+    rss: Optional[int]
+    python_heap: Optional[int]
+    threads: int
+    qt_objects: Optional[int]
+
+
+class GrowthLimits(NamedTuple):
+    """How much each resource may grow past the baseline before a soak test fails"""
+    rss_mb: float = 50.0
+    python_mb: float = 20.0
+    threads: int = 2
+    qt_objects: int = 0
+
+
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes"""
+    try:
+        import psutil  # optional; covers Windows and macOS
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def qt_object_count() -> Optional[int]:
+    # Only look if the caller already uses Qt; the CLI must not import it
+    if "PyQt5.QtWidgets" not in sys.modules:
+        return None
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance()
+    return len(app.allWidgets()) if app else None
+
+
+def _delta(now: Optional[int], then: Optional[int]) -> Optional[int]:
+    return None if now is None or then is None else now - then
+
+
+def check_growth(growth: ResourceGrowth, limits: GrowthLimits) -> List[str]:
+    """A message for every resource that grew past its limit"""
+    failures = []
+    if growth.rss is not None and growth.rss > limits.rss_mb * 2 ** 20:
+        failures.append(f"RSS grew {growth.rss / 2 ** 20:.1f} MB (limit {limits.rss_mb:g} MB)")
+    if growth.python_heap is not None and growth.python_heap > limits.python_mb * 2 ** 20:
+        failures.append(f"Python heap grew {growth.python_heap / 2 ** 20:.1f} MB (limit {limits.python_mb:g} MB)")
+    if growth.threads > limits.threads:
+        failures.append(f"{growth.threads} more threads (limit {limits.threads})")
+    if growth.qt_objects is not None and growth.qt_objects > limits.qt_objects:
+        failures.append(f"{growth.qt_objects} more Qt widgets (limit {limits.qt_objects})")
+    return failures
+
+
+class ResourceMonitor:
+    """Takes ResourceSamples and compares them against a baseline.
+
+    Safe to call from any thread. `close()` stops tracemalloc again if
+    this monitor was the one to start it.
+    """
+
+    def __init__(self, trace_python: bool = False, frames: int = 1):
+        self._started_tracing = trace_python and not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start(frames)
+        self.baseline: Optional[ResourceSample] = None
+        self._baseline_snapshot: Optional[tracemalloc.Snapshot] = None
+        self._lock = threading.Lock()
+
+    def sample(self, cycles: int = 0) -> ResourceSample:
+        heap = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+        return ResourceSample(time.monotonic(), cycles, current_rss(), heap, threading.active_count(),
+                              qt_object_count())
+
+    def set_baseline(self, sample: Optional[ResourceSample] = None) -> ResourceSample:
+        """Measure growth from `sample` (or from now) on, e.g. once caches have warmed up"""
+        sample = sample or self.sample()
+        snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+        with self._lock:
+            self.baseline = sample
+            self._baseline_snapshot = snapshot
+        return sample
+
+    def growth(self, sample: ResourceSample) -> ResourceGrowth:
+        baseline = self.baseline or sample
+        return ResourceGrowth(_delta(sample.rss, baseline.rss), _delta(sample.python_heap, baseline.python_heap),
+                              sample.threads - baseline.threads, _delta(sample.qt_objects, baseline.qt_objects))
+
+    def top_growth(self, limit: int = TOP_ALLOCATORS) -> List[str]:
+        """Allocation sites that grew most since the baseline, largest first; empty when not tracing"""
+        with self._lock:
+            baseline = self._baseline_snapshot
+        if baseline is None or not tracemalloc.is_tracing():
+            return []
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        snapshot = tracemalloc.take_snapshot().filter_traces(ignore)
+        stats = snapshot.compare_to(baseline.filter_traces(ignore), "lineno")
+        return [f"{stat.traceback[0].filename}:{stat.traceback[0].lineno} {stat.size_diff / 1024:+.1f} KiB "
+                f"({stat.count_diff:+d} blocks)" for stat in stats[:limit] if stat.size_diff > 0]
+
+    def close(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
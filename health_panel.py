@@ -0,0 +1,67 @@
+from PyQt5.QtCore import QEvent, QTimer
+from PyQt5.QtWidgets import QLabel
+from health import GrowthLimits, ResourceMonitor, check_growth
+
+REFRESH_MS = 5000
+# Dialogs and the overlay come and go during a run, so some widget churn is expected
+PANEL_LIMITS = GrowthLimits(qt_objects=50)
+
+
+class HealthPanel(QLabel):
+    """Memory, threads and Qt widgets of this process, and their growth since the run began.
+
+    Polls every REFRESH_MS for as long as it exists; a sample is a few
+    system calls. `start()` re-baselines on the next poll, so what a run
+    allocates while starting up isn't counted as growth. Python
+    allocations are only traced with `trace_python`; then the tooltip
+    lists the sites that grew most.
+    """
+
+    def __init__(self, trace_python: bool = False, limits: GrowthLimits = PANEL_LIMITS, parent=None):
+        super().__init__(parent)
+        self.monitor = ResourceMonitor(trace_python)
+        self.limits = limits
+        self._rebaseline = False
+        self._failures = []
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(REFRESH_MS)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start()
+        self.refresh()
+
+    def start(self):
+        self._rebaseline = True
+
+    def refresh(self):
+        sample = self.monitor.sample()
+        if self._rebaseline:
+            self.monitor.set_baseline(sample)
+            self._rebaseline = False
+        text = f"Memory {sample.rss / 2 ** 20:.0f} MB" if sample.rss is not None else "Memory n/a"
+        if sample.python_heap is not None:
+            text += f" ({sample.python_heap / 2 ** 20:.1f} MB Python)"
+        text += f"   {sample.threads} threads"
+        if sample.qt_objects is not None:
+            text += f"   {sample.qt_objects} widgets"
+        self._failures = []
+        if self.monitor.baseline is not None:
+            growth = self.monitor.growth(sample)
+            if growth.rss is not None:
+                text += f"   since run start: {growth.rss / 2 ** 20:+.1f} MB, {growth.threads:+d} threads"
+            self._failures = check_growth(growth, self.limits)
+        self.setText(text)
+        self.setStyleSheet("color: #c0392b;" if self._failures else "")
+        self.setToolTip("\n".join(self._failures))
+
+    def event(self, event):
+        # Comparing heap snapshots is slow, so only do it when someone asks
+        if event.type() == QEvent.ToolTip:
+            top = self.monitor.top_growth()
+            if top:
+                self.setToolTip("\n".join(self._failures + ["Largest allocation growth since run start:"] + top))
+        return super().event(event)
+
+    def stop(self):
+        self.timer.stop()
+        self.monitor.close()
@@ -0,0 +1,41 @@
+from typing import Dict, List
+
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QLineEdit
+)
+from hotkeys import HOTKEY_ACTIONS
+
+
+class HotkeyDialog(QDialog):
+    def __init__(self, bindings: Dict[str, List[str]], parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Hotkeys")
+        self.setMinimumWidth(300)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel("Comma separated, e.g. esc, ctrl+shift+q"))
+
+        self.inputs = {}
+        for action in HOTKEY_ACTIONS:
+            line_edit = QLineEdit(", ".join(bindings.get(action, [])))
+            layout.addWidget(QLabel(action.replace("_", " ").title() + ":"))
+            layout.addWidget(line_edit)
+            self.inputs[action] = line_edit
+
+        # Buttons
+        btn_layout = QHBoxLayout()
+        save_btn = QPushButton("Save")
+        cancel_btn = QPushButton("Cancel")
+
+        save_btn.clicked.connect(self.accept)
+        cancel_btn.clicked.connect(self.reject)
+
+        btn_layout.addWidget(save_btn)
+        btn_layout.addWidget(cancel_btn)
+        layout.addLayout(btn_layout)
+
+    def get_bindings(self) -> Dict[str, List[str]]:
+        return {
+            action: [combo.strip() for combo in line_edit.text().split(",") if combo.strip()]
+            for action, line_edit in self.inputs.items()
+        }
@@ -0,0 +1,46 @@
+from typing import Callable, Dict, List
+
+HOTKEY_ACTIONS = ("stop", "pause", "resume", "skip_step")
+
+
+class HotkeyManager:
+    """Global hotkeys delivered by the OS keyboard hook instead of polling.
+
+    The `keyboard` package installs a low-level hook and calls us from its
+    own listener thread only when a bound combination is pressed, so an idle
+    manager costs no CPU. `handler` is called with the action name on that
+    thread and must be thread safe.
+    """
+
+    def __init__(self, bindings: Dict[str, List[str]], handler: Callable[[str], None], keyboard_module=None):
+        self.bindings = bindings
+        self.handler = handler
+        self._keyboard = keyboard_module
+        self._handles = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._handles)
+
+    def start(self):
+        if self._handles:
+            return
+        if self._keyboard is None:
+            import keyboard
+            self._keyboard = keyboard
+        for action in HOTKEY_ACTIONS:
+            for combo in self.bindings.get(action, []):
+                self._handles.append(self._keyboard.add_hotkey(combo, self.handler, args=(action,)))
+
+    def stop(self):
+        """Remove every hook this manager installed"""
+        for handle in self._handles:
+            self._keyboard.remove_hotkey(handle)
+        self._handles = []
+
+    def rebind(self, bindings: Dict[str, List[str]]):
+        was_running = self.running
+        self.stop()
+        self.bindings = bindings
+        if was_running:
+            self.start()
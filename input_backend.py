@@ -0,0 +1,214 @@
+import ctypes
+import sys
+import time
+from typing import Callable, List, NamedTuple
+
+from scheduler import precise_sleep
+
+
+class InputBackend:
+    """Injects mouse input. Subclasses implement move/press/release."""
+
+    def __init__(self, sleep: Callable[[float], None] = precise_sleep):
+        self.sleep = sleep
+
+    def move(self, x: int, y: int):
+        raise NotImplementedError
+
+    def press(self):
+        raise NotImplementedError
+
+    def release(self):
+        raise NotImplementedError
+
+    def click(self, x: int, y: int, hold_time: float = 0.02):
+        self.move(x, y)
+        self.press()
+        self.sleep(hold_time)
+        self.release()
+
+    def close(self):
+        pass
+
+
+PUL = ctypes.POINTER(ctypes.c_ulong)
+
+
+class MouseInput(ctypes.Structure):
+    _fields_ = [("dx", ctypes.c_long),
+                ("dy", ctypes.c_long),
+                ("mouseData", ctypes.c_ulong),
+                ("dwFlags", ctypes.c_ulong),
+                ("time", ctypes.c_ulong),
+                ("dwExtraInfo", PUL)]
+
+
+class Input_I(ctypes.Union):
+    _fields_ = [("mi", MouseInput)]
+
+
+class Input(ctypes.Structure):
+    _fields_ = [("type", ctypes.c_ulong),
+                ("ii", Input_I)]
+
+
+MOUSEEVENTF_MOVE = 0x0001
+MOUSEEVENTF_LEFTDOWN = 0x0002
+MOUSEEVENTF_LEFTUP = 0x0004
+MOUSEEVENTF_VIRTUALDESK = 0x4000
+MOUSEEVENTF_ABSOLUTE = 0x8000
+
+SM_XVIRTUALSCREEN = 76
+SM_YVIRTUALSCREEN = 77
+SM_CXVIRTUALSCREEN = 78
+SM_CYVIRTUALSCREEN = 79
+
+
+class WindowsInputBackend(InputBackend):
+    """SendInput backend with a single pre-allocated [move, down, up] array.
+
+    A click sends move+down in one SendInput call and up on its own once
+    the hold is over. Up is never folded into the same batch: the engine
+    always holds for a human-like 50-100 ms, and a zero-length click is
+    what games are quickest to ignore.
+    """
+
+    def __init__(self, sleep: Callable[[float], None] = precise_sleep):
+        super().__init__(sleep)
+        self.user32 = ctypes.windll.user32
+        self._extra = ctypes.c_ulong(0)
+        self._inputs = (Input * 3)()
+        for command, flags in zip(self._inputs, (
+                MOUSEEVENTF_MOVE | MOUSEEVENTF_ABSOLUTE | MOUSEEVENTF_VIRTUALDESK,
+                MOUSEEVENTF_LEFTDOWN,
+                MOUSEEVENTF_LEFTUP)):
+            command.type = 0  # INPUT_MOUSE
+            command.ii.mi = MouseInput(0, 0, 0, flags, 0, ctypes.pointer(self._extra))
+        self._size = ctypes.sizeof(Input)
+        self._move = self._inputs[0].ii.mi
+        self._up_ptr = ctypes.byref(self._inputs, 2 * self._size)
+        self.refresh_screen_metrics()
+
+    def refresh_screen_metrics(self):
+        """Re-read the virtual desktop bounds, e.g. after a monitor change"""
+        self._left = self.user32.GetSystemMetrics(SM_XVIRTUALSCREEN)
+        self._top = self.user32.GetSystemMetrics(SM_YVIRTUALSCREEN)
+        self._width = max(self.user32.GetSystemMetrics(SM_CXVIRTUALSCREEN) - 1, 1)
+        self._height = max(self.user32.GetSystemMetrics(SM_CYVIRTUALSCREEN) - 1, 1)
+
+    def _set_target(self, x: int, y: int):
+        self._move.dx = ((x - self._left) * 65535) // self._width
+        self._move.dy = ((y - self._top) * 65535) // self._height
+
+    def move(self, x: int, y: int):
+        self._set_target(x, y)
+        self.user32.SendInput(1, self._inputs, self._size)
+
+    def press(self):
+        self.user32.SendInput(1, ctypes.byref(self._inputs, self._size), self._size)
+
+    def release(self):
+        self.user32.SendInput(1, self._up_ptr, self._size)
+
+    def click(self, x: int, y: int, hold_time: float = 0.02):
+        self._set_target(x, y)
+        self.user32.SendInput(2, self._inputs, self._size)
+        self.sleep(hold_time)
+        self.user32.SendInput(1, self._up_ptr, self._size)
+
+
+class X11InputBackend(InputBackend):
+    """XTest backend for Linux desktops; needs python-xlib."""
+
+    def __init__(self, sleep: Callable[[float], None] = precise_sleep, display_name: str = None):
+        super().__init__(sleep)
+        try:
+            from Xlib import X, display
+            from Xlib.ext import xtest
+        except ImportError as e:
+            raise ImportError("the x11 input backend needs python-xlib; install it with pip install python-xlib") from e
+        self._X = X
+        self._xtest = xtest
+        self.display = display.Display(display_name)
+
+    def move(self, x: int, y: int):
+        self._xtest.fake_input(self.display, self._X.MotionNotify, x=x, y=y)
+        self.display.flush()
+
+    def press(self):
+        self._xtest.fake_input(self.display, self._X.ButtonPress, 1)
+        self.display.flush()
+
+    def release(self):
+        self._xtest.fake_input(self.display, self._X.ButtonRelease, 1)
+        self.display.flush()
+
+    def click(self, x: int, y: int, hold_time: float = 0.02):
+        # Queue motion and press, then flush them to the server together
+        self._xtest.fake_input(self.display, self._X.MotionNotify, x=x, y=y)
+        self._xtest.fake_input(self.display, self._X.ButtonPress, 1)
+        self.display.flush()
+        self.sleep(hold_time)
+        self.release()
+
+    def close(self):
+        self.display.close()
+
+
+class InputEvent(NamedTuple):
+    time: float
+    kind: str  # "move", "press" or "release"
+    x: int
+    y: int
+
+
+class RecordingInputBackend(InputBackend):
+    """In-memory backend that timestamps every event instead of injecting it."""
+
+    def __init__(self, sleep: Callable[[float], None] = precise_sleep,
+                 clock: Callable[[], float] = time.perf_counter):
+        super().__init__(sleep)
+        self.clock = clock
+        self.events: List[InputEvent] = []
+        self.x = 0
+        self.y = 0
+
+    def move(self, x: int, y: int):
+        self.x, self.y = x, y
+        self.events.append(InputEvent(self.clock(), "move", x, y))
+
+    def press(self):
+        self.events.append(InputEvent(self.clock(), "press", self.x, self.y))
+
+    def release(self):
+        self.events.append(InputEvent(self.clock(), "release", self.x, self.y))
+
+    def clicks(self) -> List[InputEvent]:
+        return [event for event in self.events if event.kind == "press"]
+
+    def clear(self):
+        self.events.clear()
+
+
+BACKENDS = {
+    "windows": WindowsInputBackend,
+    "x11": X11InputBackend,
+    "recording": RecordingInputBackend,
+}
+
+
+def default_backend_name() -> str:
+    """The backend that sends real input on this platform; raises ValueError where there is none"""
+    if sys.platform == "win32":
+        return "windows"
+    if sys.platform.startswith("linux"):
+        return "x11"
+    # Never fall back to "recording" here: a run would go ahead and silently click nothing
+    raise ValueError(f"no input backend sends real clicks on {sys.platform}")
+
+
+def create_backend(name: str = None, **kwargs) -> InputBackend:
+    name = name or default_backend_name()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown input backend '{name}'")
+    return BACKENDS[name](**kwargs)
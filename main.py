@@ -1,105 +1,52 @@
+import os
 import sys
-import random
-import pywinctl
-import math
-import ctypes
-import pyautogui
 import time
-import keyboard
-import threading
-from typing import List
 
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QPushButton, QListWidget, QHBoxLayout, QLabel,
-    QInputDialog, QStackedWidget, QMessageBox, QListWidgetItem, QDialog, QComboBox, QSpinBox
+    QInputDialog, QStackedWidget, QMessageBox, QDialog, QComboBox, QSpinBox,
+    QCheckBox, QShortcut
 )
-from PyQt5.QtCore import Qt, QRect, pyqtSignal
-from PyQt5.QtGui import QBrush, QColor, QPen, QFont, QPainter
+from PyQt5.QtCore import Qt, QFileSystemWatcher, QTimer, pyqtSignal
+from PyQt5.QtGui import QKeySequence
 from models import Config, Step
-from step_item_widget import StepItemWidget
+from overlay import OverlayControlPanel, TransparentOverlay
+from step_list_model import StepListModel, StepItemDelegate, StepListView
 from edit_step_dialog import EditStepDialog
-
-import json
-import os
+from bulk_edit_dialog import BulkEditDialog
+from run_worker import MultiRunWorker, RunWorker, SimulationWorker
+from multi_runner import RunTarget
+from input_backend import create_backend
+from hotkeys import HotkeyManager
+from hotkey_dialog import HotkeyDialog
+from settings import load_settings, save_settings
+from window_registry import WindowRegistry
+from telemetry import Telemetry, TraceWriter
+from stats_panel import StatsPanel
+from health_panel import HealthPanel
+from recorder import MacroRecorder, build_config
+from trajectories import TrajectoryMover
+from step_program import StepProgram
+from simulator import SIMULATED_REPEATS, format_report
+from adaptive import AdaptiveDelays, store_learned
+from checkpoint import CheckpointWriter, checkpoint_path, load_checkpoint
+from screen_capture import MatcherPool
+from config_store import (
+    ConfigChanges, ConfigConflictError, ConfigStore, ConfigValidationError, JsonConfigStore, open_store
+)
 
 CONFIG_FILE = "configs.json"
 
-class OverlayControlPanel(QWidget):
-    def __init__(self, on_close_callback):
-        super().__init__()
-
-        self.setWindowFlags(
-            Qt.FramelessWindowHint |
-            Qt.WindowStaysOnTopHint |
-            Qt.Tool
-        )
-        self.setAttribute(Qt.WA_TranslucentBackground)
-
-        layout = QHBoxLayout(self)
-        layout.setContentsMargins(0, 0, 0, 0)
-
-        close_btn = QPushButton("✕")
-        close_btn.setFixedSize(30, 30)
-        close_btn.clicked.connect(on_close_callback)
-        layout.addWidget(close_btn)
-
-        self.setStyleSheet("background-color: rgba(30, 30, 30, 180); color: white; border-radius: 4px;")
-
-class TransparentOverlay(QWidget):
-    positionClicked = pyqtSignal(int, int) 
-    def __init__(self, x, y, width, height, config: Config):
-        super().__init__()
-
-        self.setWindowFlags(
-            Qt.FramelessWindowHint |
-            Qt.WindowStaysOnTopHint |
-            Qt.Tool
-        )
-        self.setAttribute(Qt.WA_TranslucentBackground)
-        self.setGeometry(x, y, width, height)
-        self.config = config
-        self.active_for_step = False
-
-    def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
-
-        painter.setBrush(QColor(0, 255, 0, 100))
-        painter.setPen(Qt.NoPen)
-        painter.drawRect(self.rect())
-
-
-        painter.setBrush(Qt.NoBrush)
-        step_pen = QPen(QColor(0, 0, 0, 200))  # green
-        step_pen.setWidth(2)
-        painter.setPen(step_pen)
-        font = QFont("Arial", 12, QFont.Bold)
-        painter.setFont(font)
-        
-        if hasattr(self, "config") and self.config:
-            for i, step in enumerate(self.config.steps):
-                local_x = step.x - self.x()
-                local_y = step.y - self.y()
-                radius = step.radius
-
-                rect = QRect(local_x - radius, local_y - radius, radius * 2, radius * 2)
-                painter.drawEllipse(rect)
-                painter.drawText(QRect(local_x - 10, local_y - 10, 20, 20), Qt.AlignCenter, str(i + 1))
-
-    def mousePressEvent(self, event):
-        if self.active_for_step and event.button() == Qt.LeftButton:
-            self.active_for_step = False  # deactivate after first use
-            self.positionClicked.emit(event.x(), event.y())
-
-
 class AutoClickerGUI(QWidget):
+    windowsChanged = pyqtSignal(object, bool)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Auto Clicker Config")
         self.resize(400, 600)
 
 
-        self.configs: List[Config] = []
+        self.store: ConfigStore = None
         self.current_config: Config = None
         self.selected_step_index: int = -1
         self.repeat = 1
@@ -114,8 +61,15 @@ class AutoClickerGUI(QWidget):
         self.window_selector_refresh_btn = QPushButton("⟳")
         self.window_selector.setMaximumWidth(200)
         self.selected_window = None
-        self.stop_flag = False
-        self.overlay = QWidget()
+        self.selected_window_handle = None
+        self.run_worker: RunWorker = None
+        self.simulation_worker: SimulationWorker = None
+        self.input_backend = None
+        self.overlay = None
+        self.overlay_controls = None
+        self.recorder = MacroRecorder()
+        self.mover = None
+        self.matchers = MatcherPool()  # kept across runs, so templates stay loaded in its workers
 
         self.show_overlay_btn = QPushButton("Show Overlay")
         self.window_selector_layout.addWidget(self.show_overlay_btn)
@@ -127,19 +81,31 @@ class AutoClickerGUI(QWidget):
         self.main_layout.addLayout(self.window_selector_layout)
 
 
+        self.window_registry = WindowRegistry()
+        self.window_registry.add_listener(self.windowsChanged.emit)
+        self.windowsChanged.connect(self.on_windows_changed)
+        self.window_registry.start()
         self.populate_window_list()
-        self.window_selector_refresh_btn.clicked.connect(self.populate_window_list)
+        self.window_selector_refresh_btn.clicked.connect(self.window_registry.refresh)
 
         self.stack = QStackedWidget()
         self.main_layout.addWidget(self.stack)
 
+        self.settings = load_settings()
         self.init_config_screen()
         self.init_step_editor_screen()
 
         self.load_configs()
-        self.config_list.addItems([config.name for config in self.configs])
+        self.config_list.addItems(self.store.names())
+        self.watch_configs()
 
-        self.keyboard_thread = None
+        self.hotkeys = HotkeyManager(self.settings["hotkeys"], self.on_hotkey)
+        self.human_paths_checkbox.blockSignals(True)
+        self.human_paths_checkbox.setChecked(self.settings["human_paths"])
+        self.human_paths_checkbox.blockSignals(False)
+        self.adaptive_checkbox.blockSignals(True)
+        self.adaptive_checkbox.setChecked(self.settings["adaptive_delays"])
+        self.adaptive_checkbox.blockSignals(False)
 
 
     def init_config_screen(self):
@@ -155,29 +121,46 @@ class AutoClickerGUI(QWidget):
         layout.addWidget(self.config_list)
         layout.addWidget(self.add_config_btn)
 
+        self.hotkeys_btn = QPushButton("Hotkeys...")
+        self.hotkeys_btn.clicked.connect(self.edit_hotkeys)
+        layout.addWidget(self.hotkeys_btn)
+
         self.stack.addWidget(self.config_screen)
 
         self.config_list.itemClicked.connect(self.enter_step_editor)
 
 
     def populate_window_list(self):
+        current = self.window_selector.currentText()
         self.window_selector.clear()
-        titles = [title for title in pywinctl.getAllTitles() if title.strip()]
+        titles = self.window_registry.titles()
         if not titles:
             self.window_selector.addItem("No windows found")
         else:
             self.window_selector.addItems(titles)
+            if current in titles:
+                self.window_selector.setCurrentText(current)
+
+    def on_windows_changed(self, changed, titles_changed):
+        if titles_changed:
+            self.populate_window_list()
+        if not self.selected_window or not self.overlay or not self.overlay.isVisible():
+            return
+        for info in changed:
+            if info.handle == self.selected_window_handle:
+                self.overlay.setGeometry(info.left, info.top, info.width, info.height)
+                self.overlay_controls.move(info.left + info.width + 20, info.top - 20)
 
     def add_config(self):
         name, ok = QInputDialog.getText(self, "Add Config", "Enter config name:")
         if ok and name.strip():
             name = name.strip()
             # Check for duplicates
-            if any(cfg.name == name for cfg in self.configs):
+            if name in self.store:
                 QMessageBox.warning(self, "Duplicate", f"A config named '{name}' already exists.")
                 return  
             new_config = Config(name=name)
-            self.configs.append(new_config)
+            self.store.add(new_config)
             self.config_list.addItem(name)
 
     def init_step_editor_screen(self):
@@ -190,12 +173,50 @@ class AutoClickerGUI(QWidget):
         layout.addWidget(self.step_header)
         layout.addWidget(self.back_btn)
 
-        self.step_list = QListWidget()
+        self.step_model = StepListModel(self)
+        self.step_delegate = StepItemDelegate(self)
+        self.step_delegate.actionTriggered.connect(self.on_step_action)
+        self.step_list = StepListView(self.step_model, self.step_delegate)
+        self.step_list.doubleClicked.connect(lambda index: self.edit_step(index.row()))
         layout.addWidget(self.step_list)
-
+        for signal in (self.step_model.rowsInserted, self.step_model.rowsRemoved,
+                       self.step_model.rowsMoved, self.step_model.dataChanged,
+                       self.step_model.modelReset):
+            signal.connect(self.repaint_overlay)
+        QShortcut(QKeySequence.Delete, self.step_list, self.delete_selected_steps)
+
+        selection_controls = QHBoxLayout()
+        self.edit_selected_btn = QPushButton("Edit Selected")
+        self.edit_selected_btn.clicked.connect(self.edit_selected_steps)
+        selection_controls.addWidget(self.edit_selected_btn)
+        self.delete_selected_btn = QPushButton("Delete Selected")
+        self.delete_selected_btn.clicked.connect(self.delete_selected_steps)
+        selection_controls.addWidget(self.delete_selected_btn)
+        layout.addLayout(selection_controls)
+
+        self.relative_checkbox = QCheckBox("Coordinates relative to window")
+        self.relative_checkbox.toggled.connect(self.set_config_relative)
+        layout.addWidget(self.relative_checkbox)
+
+        self.human_paths_checkbox = QCheckBox("Move the cursor like a person")
+        self.human_paths_checkbox.toggled.connect(self.set_human_paths)
+        layout.addWidget(self.human_paths_checkbox)
+
+        self.adaptive_checkbox = QCheckBox("Shorten delays once the screen is seen to be ready")
+        self.adaptive_checkbox.toggled.connect(self.set_adaptive_delays)
+        layout.addWidget(self.adaptive_checkbox)
+
+        add_controls = QHBoxLayout()
         self.add_step_btn = QPushButton("Add Step")
-        layout.addWidget(self.add_step_btn)
+        add_controls.addWidget(self.add_step_btn)
         self.add_step_btn.clicked.connect(self.add_step)
+        self.add_control_step_btn = QPushButton("Add Control Step")
+        add_controls.addWidget(self.add_control_step_btn)
+        self.add_control_step_btn.clicked.connect(self.add_control_step)
+        self.record_btn = QPushButton("Record Clicks")
+        add_controls.addWidget(self.record_btn)
+        self.record_btn.clicked.connect(self.toggle_recording)
+        layout.addLayout(add_controls)
 
         self.save_step_btn = QPushButton("Save Steps")
         layout.addWidget(self.save_step_btn)
@@ -203,8 +224,8 @@ class AutoClickerGUI(QWidget):
 
         self.repeat_label = QLabel("Repeat:")
         self.repeat_input = QSpinBox()
-        self.repeat_input.setMinimum(1)
-        self.repeat_input.setMaximum(999)  # Arbitrary upper limit
+        self.repeat_input.setRange(0, 2**31 - 1)
+        self.repeat_input.setSpecialValueText("Until stopped")  # shown for 0
         self.repeat_input.setValue(self.repeat)  # Default
         self.repeat_input.valueChanged.connect(self.update_repeat_value)
         layout.addWidget(self.repeat_input)
@@ -213,23 +234,61 @@ class AutoClickerGUI(QWidget):
         layout.addWidget(self.start_steps_btn)
         self.start_steps_btn.clicked.connect(self.start_steps)
 
+        self.resume_steps_btn = QPushButton("Resume from Checkpoint")
+        self.resume_steps_btn.setEnabled(False)
+        layout.addWidget(self.resume_steps_btn)
+        self.resume_steps_btn.clicked.connect(self.resume_steps)
+
+        self.simulate_btn = QPushButton("Simulate")
+        self.simulate_btn.setToolTip("Run the steps on a virtual clock, without clicking, and report "
+                                     f"cycle times and layout problems (Repeat, or {SIMULATED_REPEATS} passes)")
+        layout.addWidget(self.simulate_btn)
+        self.simulate_btn.clicked.connect(self.simulate_steps)
+
+        self.start_all_btn = QPushButton("Start on All Matching Windows")
+        layout.addWidget(self.start_all_btn)
+        self.start_all_btn.clicked.connect(self.start_steps_all)
+
+        run_controls = QHBoxLayout()
+        self.pause_steps_btn = QPushButton("Pause")
+        self.pause_steps_btn.setEnabled(False)
+        self.pause_steps_btn.clicked.connect(self.toggle_pause_steps)
+        run_controls.addWidget(self.pause_steps_btn)
+        self.stop_steps_btn = QPushButton("Stop")
+        self.stop_steps_btn.setEnabled(False)
+        self.stop_steps_btn.clicked.connect(self.stop_steps)
+        run_controls.addWidget(self.stop_steps_btn)
+        layout.addLayout(run_controls)
+
+        self.run_status_label = QLabel("Idle")
+        layout.addWidget(self.run_status_label)
+        self.timing_label = QLabel("")
+        layout.addWidget(self.timing_label)
+        self.stats_panel = StatsPanel()
+        layout.addWidget(self.stats_panel)
+        self.health_panel = HealthPanel(self.settings["trace_allocations"])
+        layout.addWidget(self.health_panel)
+
         self.stack.addWidget(self.step_screen)
         self.back_btn.clicked.connect(self.back_to_config_list)
     
     def show_overlay(self):
         selected_title = self.window_selector.currentText()
-        matches = pywinctl.getWindowsWithTitle(selected_title)
-        self.selected_window = matches[0]
+        target = self.window_registry.find(selected_title)
 
-        if not matches:
+        if target is None:
             QMessageBox.warning(self, "Not Found", "Target window not found.")
             return
 
-        target = matches[0]
+        self.selected_window = target
+        self.selected_window_handle = target.getHandle()
         x, y = target.left, target.top
         w, h = target.width, target.height
 
+        # Replace rather than stack windows; a run keeps the existing overlay alive for days
+        self.destroy_overlay()
         self.overlay = TransparentOverlay(x, y, w, h, self.current_config)
+        self.overlay.positionClicked.connect(self.handle_overlay_click_for_step)
         self.overlay.show()
 
         self.overlay_controls = OverlayControlPanel(self.close_overlay)
@@ -237,188 +296,561 @@ class AutoClickerGUI(QWidget):
         self.overlay_controls.move(x + w + 20, y - 20)
         self.overlay_controls.show()
 
-
     def close_overlay(self):
-        if hasattr(self, "overlay"):
+        if self.overlay:
             self.overlay.hide()
-        if hasattr(self, "overlay_controls"):
+        if self.overlay_controls:
             self.overlay_controls.hide()
 
+    def destroy_overlay(self):
+        for widget in (self.overlay, self.overlay_controls):
+            if widget:
+                widget.close()
+                widget.deleteLater()
+        self.overlay = self.overlay_controls = None
+
     def enter_step_editor(self, item):
         """Switch to step editor screen for selected config"""
-        config_name = item.text()
-        for config in self.configs:
-            if config.name == config_name:
-                self.current_config = config
-                break
+        try:
+            self.current_config = self.store.get(item.text())
+        except ConfigValidationError as e:
+            QMessageBox.warning(self, "Invalid Config", str(e))
+            return
 
         self.step_header.setText(f"{self.current_config.name}")
-        self.refresh_step_list()
+        self.relative_checkbox.blockSignals(True)
+        self.relative_checkbox.setChecked(self.current_config.relative)
+        self.relative_checkbox.blockSignals(False)
+        self.step_model.set_config(self.current_config)
+        if self.overlay:
+            self.overlay.set_config(self.current_config)
+        self.update_resume_button()
         self.stack.setCurrentWidget(self.step_screen)
 
+    def set_config_relative(self, relative):
+        if not self.selected_window:
+            QMessageBox.warning(self, "No Window", "Select a window to convert coordinates against")
+            self.relative_checkbox.blockSignals(True)
+            self.relative_checkbox.setChecked(self.current_config.relative)
+            self.relative_checkbox.blockSignals(False)
+            return
+        self.current_config.set_relative(relative, self.selected_window.left, self.selected_window.top)
+        self.step_model.steps_changed(range(len(self.current_config.steps)))
+
+    def set_human_paths(self, enabled):
+        self.settings["human_paths"] = enabled
+        save_settings(self.settings)
+
+    def set_adaptive_delays(self, enabled):
+        self.settings["adaptive_delays"] = enabled
+        save_settings(self.settings)
+
     def back_to_config_list(self):
         self.stack.setCurrentWidget(self.config_screen)
 
     def add_step(self):
-        if not hasattr(self, "overlay") or not self.overlay.isVisible():
+        if not self.overlay or not self.overlay.isVisible():
             QMessageBox.warning(self, "Overlay Missing", "Overlay must be active to add steps.")
             return
 
+        # positionClicked is connected once in show_overlay and fires only while this is set
         self.overlay.active_for_step = True
-        self.overlay.positionClicked.connect(self.handle_overlay_click_for_step)
 
-    def handle_overlay_click_for_step(self, x, y):
-        abs_x = self.overlay.x() + x
-        abs_y = self.overlay.y() + y
-
-        new_step = Step(x=abs_x, y=abs_y, radius=30, delay_min=2, delay_max=3)
-        self.current_config.steps.append(new_step)
-        self.refresh_step_list()
-        self.overlay.repaint()
+    def add_control_step(self):
+        """Loops, labels, gotos, calls and branches have no position, so they skip the overlay"""
+        dialog = EditStepDialog(Step(x=0, y=0, radius=0, delay_min=0, delay_max=0, name="Loop", kind="loop", count=2),
+                                self)
+        if dialog.exec_() == QDialog.Accepted:
+            self.step_model.append_step(dialog.get_updated_step())
+
+    def toggle_recording(self):
+        """Record real clicks into the game, then append them as steps"""
+        if not self.recorder.recording:
+            if self.current_config.relative and not self.selected_window:
+                QMessageBox.warning(self, "No Window", "Show the overlay on a window to record relative steps.")
+                return
+            try:
+                self.recorder.clear()
+                self.recorder.start()
+            except Exception as e:
+                QMessageBox.warning(self, "Recording Unavailable", f"Could not hook the mouse: {e}")
+                return
+            if self.overlay:
+                self.overlay.set_live(True)  # let the clicks through to the game
+            self.record_btn.setText("Stop Recording")
+            return
+        events = self.recorder.stop()
+        self.record_btn.setText("Record Clicks")
+        if self.overlay:
+            self.overlay.set_live(False)
+        own = self.frameGeometry()
+        origin = (self.selected_window.left, self.selected_window.top) if self.current_config.relative else None
+        recorded = build_config(self.current_config.name, events, origin=origin,
+                                exclude=[(own.x(), own.y(), own.width(), own.height())])
+        first = len(self.current_config.steps)
+        for i, step in enumerate(recorded.steps):
+            step.name = f"Step {first + i + 1}"
+            self.step_model.append_step(step)
+        if self.recorder.ring.dropped:
+            QMessageBox.warning(self, "Clicks Missed",
+                                f"The recorder fell behind and lost {self.recorder.ring.dropped} mouse events, "
+                                "so the new steps may be missing clicks.")
 
-        self.overlay.positionClicked.disconnect(self.handle_overlay_click_for_step)
+    def handle_overlay_click_for_step(self, x, y):
+        if not self.current_config.relative:
+            x += self.overlay.x()
+            y += self.overlay.y()
+
+        new_step = Step(x=x, y=y, radius=30, delay_min=2, delay_max=3)
+        self.step_model.append_step(new_step)
+
+    def repaint_overlay(self, *args):
+        if self.overlay:
+            self.overlay.invalidate()
+
+    def on_step_action(self, index, action):
+        if action == "up":
+            self.move_step_up(index)
+        elif action == "down":
+            self.move_step_down(index)
+        elif action == "edit":
+            self.edit_step(index)
+        elif action == "delete":
+            self.delete_step(index)
+
+    def selected_rows(self):
+        return sorted(index.row() for index in self.step_list.selectionModel().selectedRows())
 
     def delete_step(self, index):
         if 0 <= index < len(self.current_config.steps):
-            del self.current_config.steps[index]
-            self.refresh_step_list()
-            self.overlay.repaint()
+            self.step_model.remove_rows([index])
+
+    def delete_selected_steps(self):
+        self.step_model.remove_rows(self.selected_rows())
 
     def edit_step(self, index):
         step = self.current_config.steps[index]
         dialog = EditStepDialog(step, self)
         if dialog.exec_() == QDialog.Accepted:
-            self.current_config.steps[index] = dialog.get_updated_step()
-            self.refresh_step_list()
-            self.overlay.repaint()
-
-
-    def refresh_step_list(self):
-        """Update the step list display"""
-        self.step_list.clear()
-        for i, step in enumerate(self.current_config.steps):
-            item_widget = StepItemWidget(
-                i, step,
-                move_up_callback=self.move_step_up,
-                move_down_callback=self.move_step_down,
-                delete_callback=self.delete_step,
-                edit_callback=self.edit_step
-            )
-            list_item = QListWidgetItem(self.step_list)
-            list_item.setSizeHint(item_widget.sizeHint())
-            self.step_list.addItem(list_item)
-            self.step_list.setItemWidget(list_item, item_widget)
+            self.step_model.replace_step(index, dialog.get_updated_step())
+
+    def edit_selected_steps(self):
+        rows = self.selected_rows()
+        if not rows:
+            return
+        steps = [self.current_config.steps[row] for row in rows]
+        dialog = BulkEditDialog(steps, self)
+        if dialog.exec_() == QDialog.Accepted:
+            BulkEditDialog.apply(steps, dialog.get_changes())
+            self.step_model.steps_changed(rows)
 
     def move_step_up(self, index):
         if index > 0:
-            self.current_config.steps[index - 1], self.current_config.steps[index] = \
-                self.current_config.steps[index], self.current_config.steps[index - 1]
-            self.refresh_step_list()
-            self.overlay.repaint()
+            self.step_model.move_rows([index], index - 1)
 
     def move_step_down(self, index):
         if index < len(self.current_config.steps) - 1:
-            self.current_config.steps[index + 1], self.current_config.steps[index] = \
-                self.current_config.steps[index], self.current_config.steps[index + 1]
-            self.refresh_step_list()
-            self.overlay.repaint()
+            self.step_model.move_rows([index], index + 2)
 
     def update_repeat_value(self, value):
         self.repeat = value
 
     def closeEvent(self, event):
+        if self.run_worker:
+            self.run_worker.stop()
+            self.run_worker.wait()
+        if self.simulation_worker:
+            self.simulation_worker.stop()
+            self.simulation_worker.wait()
+        self.hotkeys.stop()
+        self.window_registry.stop()
+        self.health_panel.stop()
+        if self.input_backend:
+            self.input_backend.close()
+        self.matchers.close()
         self.save_configs()
         event.accept()
 
     def save_configs(self):
-        data = [config.to_dict() for config in self.configs]
-        with open(CONFIG_FILE, "w") as f:
-            json.dump(data, f, indent=2)
+        try:
+            self.store.save()
+        except ConfigValidationError as e:
+            QMessageBox.warning(self, "Configs Not Saved", f"Nothing was saved:\n\n{e}")
+        except ConfigConflictError:
+            # Merge the outside edits first, so only configs edited here get written over
+            try:
+                self.apply_config_changes(self.store.reload())
+            except (OSError, ValueError) as e:
+                answer = QMessageBox.question(
+                    self, "Configs Changed",
+                    f"{self.store.path} was changed elsewhere and can't be read:\n\n{e}\n\n"
+                    "Overwrite it with the configs open here?")
+                if answer != QMessageBox.Yes:
+                    return
+            self.store.save(force=True)
+
+    def watch_configs(self):
+        """Reload configs whenever another editor or instance saves them"""
+        self.config_watcher = QFileSystemWatcher(self)
+        self.reload_timer = QTimer(self)
+        self.reload_timer.setSingleShot(True)
+        self.reload_timer.setInterval(250)  # editors save in bursts; settle first
+        self.reload_timer.timeout.connect(self.reload_configs)
+        self.reload_error = None  # last reload failure shown, so a half-saved file is only reported once
+        path = getattr(self.store, "path", None)
+        if not path:
+            return
+        # Atomic saves replace the file, which drops a watch on it; the directory sees the rename
+        self.config_watcher.addPath(os.path.dirname(os.path.abspath(path)))
+        if os.path.exists(path):
+            self.config_watcher.addPath(path)
+        self.config_watcher.fileChanged.connect(self.reload_timer.start)
+        self.config_watcher.directoryChanged.connect(self.reload_timer.start)
+
+    def reload_configs(self):
+        path = self.store.path
+        if os.path.exists(path) and os.path.abspath(path) not in self.config_watcher.files():
+            self.config_watcher.addPath(path)
+        if not self.store.changed_on_disk():
+            return  # our own save, or another file in the directory
+        try:
+            changes = self.store.reload()
+        except (OSError, ValueError) as e:
+            # Likely a hand edit in progress; the next save of the file tries again
+            if str(e) != self.reload_error:
+                self.reload_error = str(e)
+                QMessageBox.warning(self, "Configs Not Reloaded",
+                                    f"{path} could not be read, so the configs here are unchanged:\n\n{e}")
+            return
+        self.reload_error = None
+        self.apply_config_changes(changes)
+
+    def apply_config_changes(self, changes: ConfigChanges):
+        """Bring the config list, the open editor and any run up to date with a reload"""
+        changed = list(changes.changed)
+        removed = list(changes.removed)
+        for name in changes.conflicts:
+            answer = QMessageBox.question(
+                self, "Config Changed Elsewhere",
+                f"'{name}' was changed in {self.store.path} while it was being edited here.\n\n"
+                "Keep the version open here? Choosing No loads the saved one.")
+            if answer != QMessageBox.Yes:
+                self.store.revert(name)
+                (changed if name in self.store else removed).append(name)
+        if changes.errors:
+            QMessageBox.warning(self, "Config Not Reloaded", "\n".join(changes.errors))
+
+        for name in removed:
+            for item in self.config_list.findItems(name, Qt.MatchExactly):
+                self.config_list.takeItem(self.config_list.row(item))
+        names = self.store.names()
+        for name in changes.added:
+            self.config_list.insertItem(min(names.index(name), self.config_list.count()), name)
+
+        current = self.current_config.name if self.current_config else None
+        if current in removed:
+            self.current_config = None
+            if self.stack.currentWidget() is self.step_screen:
+                self.back_to_config_list()
+                QMessageBox.information(self, "Config Removed", f"'{current}' was deleted from {self.store.path}.")
+        elif current in changed:
+            self.relative_checkbox.blockSignals(True)
+            self.relative_checkbox.setChecked(self.current_config.relative)
+            self.relative_checkbox.blockSignals(False)
+            self.step_model.set_config(self.current_config)
+            if self.overlay:
+                self.overlay.set_config(self.current_config)
+
+        if self.run_worker and changed:
+            try:
+                self.run_worker.reload(changed)
+            except ValueError as e:
+                QMessageBox.warning(self, "Run Not Updated", f"The run keeps its previous steps:\n\n{e}")
 
     def load_configs(self):
-        if not os.path.exists(CONFIG_FILE):
-            return
-        with open(CONFIG_FILE, "r") as f:
-            data = json.load(f)
-            self.configs = [Config.from_dict(cfg_data) for cfg_data in data]
+        try:
+            self.store = open_store(CONFIG_FILE)
+        except (OSError, ValueError) as e:
+            # Keep going without touching the file so a bad edit can be fixed by hand
+            QMessageBox.warning(self, "Configs Not Loaded",
+                                f"Could not load {CONFIG_FILE}; changes will not be saved.\n\n{e}")
+            self.store = JsonConfigStore(None)
 
     def start_steps(self):
-        if self.selected_window:
-            self.stop_flag = False
-            self.close_overlay()
-
-            if not self.keyboard_thread or not self.keyboard_thread.is_alive():
-                self.keyboard_thread = threading.Thread(target=self.listen_for_exit_key, daemon=True)
-                self.keyboard_thread.start()
-
-            for _ in range(self.repeat):
-                for i, step in enumerate(self.current_config.steps):
-                    if self.stop_flag:
-                        self.stop_flag = False
-                        break
-                    self.click_client(step)
-                time.sleep(1)
-            print("end")
+        if self.run_worker:
+            return
+        path = self.checkpoint_file()
+        if path and os.path.exists(path):
+            answer = QMessageBox.question(self, "Discard Checkpoint",
+                                          "This config has a saved checkpoint. Start over and discard it?")
+            if answer != QMessageBox.Yes:
+                return
+        self.run_steps(self.repeat)
+
+    def resume_steps(self):
+        if self.run_worker:
+            return
+        path = self.checkpoint_file()
+        try:
+            checkpoint = load_checkpoint(path) if path else None
+            if checkpoint is None:
+                raise ValueError("There is no checkpoint saved for this config.")
+            if checkpoint.version != StepProgram(self.current_config, resolve=self.store.get).version:
+                raise ValueError(f"'{self.current_config.name}' has changed since its checkpoint was saved.")
+        except ValueError as e:
+            QMessageBox.warning(self, "Can't Resume", str(e))
+            self.update_resume_button()
+            return
+        self.run_steps(checkpoint.repeat, checkpoint)
+
+    def run_steps(self, repeat, resume=None):
+        if not self.selected_window:
+            QMessageBox.warning(self, "No Window", "Select a window")
+            return
+        if not self.prepare_run():
+            return
+        telemetry = self.create_telemetry()
+        path = self.checkpoint_file()
+        self.run_worker = RunWorker(self.current_config, self.selected_window, repeat,
+                                    self.input_backend, telemetry, self.store.get, self.mover,
+                                    checkpoint=CheckpointWriter(path) if path else None, resume=resume,
+                                    adaptive=AdaptiveDelays() if self.settings["adaptive_delays"] else None,
+                                    matchers=self.matchers, parent=self)
+        self.stats_panel.start(telemetry)
+        self.run_worker.stepStarted.connect(self.on_run_step)
+        self.run_worker.progressChanged.connect(self.on_run_progress)
+        self.run_worker.stepTiming.connect(self.on_run_timing)
+        self.run_worker.clicked.connect(self.on_run_click)
+        self.begin_run()
+
+    def checkpoint_file(self):
+        directory = self.settings.get("checkpoint_dir")
+        if not directory or not self.current_config:
+            return None
+        return checkpoint_path(directory, self.current_config.name)
+
+    def update_resume_button(self):
+        path = self.checkpoint_file()
+        try:
+            checkpoint = load_checkpoint(path) if path else None
+        except ValueError:
+            checkpoint = None
+        self.resume_steps_btn.setEnabled(checkpoint is not None and self.run_worker is None)
+        self.resume_steps_btn.setToolTip(
+            f"Pass {checkpoint.repeat_index + 1}, {checkpoint.done} steps done, saved "
+            f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(checkpoint.saved_at))}" if checkpoint else "")
+
+    def simulate_steps(self):
+        if self.simulation_worker:
+            return
+        try:
+            program = StepProgram(self.current_config, resolve=self.store.get)
+        except ValueError as e:
+            QMessageBox.warning(self, "Invalid Config", str(e))
+            return
+        # The worker only sees snapshots; the store isn't safe to read from another thread
+        configs = {name: self.store.get(name).snapshot() for name in program.config_names}
+        self.simulation_worker = SimulationWorker(self.current_config, self.repeat or SIMULATED_REPEATS,
+                                                  configs.__getitem__, self.selected_window,
+                                                  self.settings["human_paths"], parent=self)
+        self.simulation_worker.simulated.connect(self.on_simulated)
+        self.simulation_worker.failed.connect(lambda message: self.on_simulated(None, message))
+        self.simulate_btn.setEnabled(False)
+        self.simulate_btn.setText("Simulating...")
+        self.simulation_worker.start()
+
+    def on_simulated(self, report, error=None):
+        self.simulation_worker.wait()
+        self.simulation_worker.deleteLater()
+        self.simulation_worker = None
+        self.simulate_btn.setEnabled(True)
+        self.simulate_btn.setText("Simulate")
+        if report is None:
+            QMessageBox.warning(self, "Invalid Config", error)
+        elif report.ok:
+            QMessageBox.information(self, "Simulation", format_report(report))
         else:
+            QMessageBox.warning(self, "Simulation", format_report(report))
+
+    def start_steps_all(self):
+        if self.run_worker:
+            return
+        title = self.window_selector.currentText()
+        windows = self.window_registry.find_all(title)
+        if not windows:
             QMessageBox.warning(self, "No Window", "Select a window")
+            return
+        if not self.prepare_run():
+            return
+        targets = [RunTarget(f"{title} #{i + 1}", self.current_config, window, self.repeat)
+                   for i, window in enumerate(windows)]
+        self.target_cycles = {}
+        self.run_worker = MultiRunWorker(targets, self.input_backend, self.store.get, self.mover,
+                                         matchers=self.matchers, parent=self)
+        self.run_worker.targetCycle.connect(self.on_target_cycle)
+        self.begin_run()
+
+    def create_telemetry(self):
+        trace = None
+        if self.settings.get("trace_file"):
+            try:
+                trace = TraceWriter(self.settings["trace_file"])
+            except OSError as e:
+                QMessageBox.warning(self, "Trace Unavailable", f"The run goes ahead without a trace file:\n\n{e}")
+        return Telemetry(len(self.current_config.steps), trace=trace)
+
+    def prepare_run(self):
+        """Set up input and hotkeys shared by single and multi-window runs"""
+        try:
+            # Compiling catches bad labels, unclosed loops and call cycles before anything starts
+            StepProgram(self.current_config, resolve=self.store.get)
+        except ValueError as e:
+            QMessageBox.warning(self, "Invalid Config", str(e))
+            return False
+        if self.input_backend is None:
+            try:
+                self.input_backend = create_backend()
+            except Exception as e:
+                QMessageBox.warning(self, "Input Unavailable", f"Could not set up mouse input: {e}")
+                return False
+        self.mover = TrajectoryMover() if self.settings["human_paths"] else None
+        if self.overlay:
+            # Stays up during the run, but must not swallow the clicks it sits over
+            self.overlay.set_live(True)
+        try:
+            self.hotkeys.start()
+        except Exception as e:
+            self.warn_hotkeys_unavailable(e)
+        return True
+
+    def warn_hotkeys_unavailable(self, error):
+        QMessageBox.warning(self, "Hotkeys Unavailable",
+                            f"Hotkeys won't work, so stop or pause runs with the buttons here:\n\n{error}")
+
+    def begin_run(self):
+        self.run_worker.pausedChanged.connect(self.on_run_paused)
+        self.run_worker.reloaded.connect(self.on_run_reloaded)
+        self.run_worker.errorOccurred.connect(self.on_run_error)
+        self.run_worker.runFinished.connect(self.on_run_finished)
+        self.start_steps_btn.setEnabled(False)
+        self.start_all_btn.setEnabled(False)
+        self.resume_steps_btn.setEnabled(False)
+        self.pause_steps_btn.setEnabled(True)
+        self.stop_steps_btn.setEnabled(True)
+        self.run_status_label.setText("Starting...")
+        self.timing_label.setText("")
+        self.worst_timing_error = 0.0
+        self.health_panel.start()
+        self.run_worker.start()
+
+    def stop_steps(self):
+        if self.run_worker:
+            self.run_worker.stop()
+
+    def toggle_pause_steps(self):
+        if not self.run_worker:
+            return
+        if self.run_worker.paused:
+            self.run_worker.resume()
+        else:
+            self.run_worker.pause()
 
-    def click_client(self, step):
-        if self.selected_window:
-            self.selected_window.activate()
-            time.sleep(1)
-            x, y = self.random_point_in_circle(step.x, step.y, step.radius)
-            print(step.name)
-            click(x,y, random.uniform(.05,.1))
-            delay = random.uniform(step.delay_min, step.delay_max)
-            time.sleep(delay)
-
-    def random_point_in_circle(self, cx, cy, radius):
-        r = radius * math.sqrt(random.random())  # uniform distribution
-        theta = random.uniform(0, 2 * math.pi)
-        x = cx + r * math.cos(theta)
-        y = cy + r * math.sin(theta)
-        return int(x), int(y)
-    
-    def listen_for_exit_key(self):
-    # Runs in a background thread
-        while True:
-            if keyboard.is_pressed('q') or keyboard.is_pressed('esc'):
-                print("Stop key pressed!")
-                self.stop_flag = True
-                self.keyboard_thread = None
-                break
-
-PUL = ctypes.POINTER(ctypes.c_ulong)
-
-class MouseInput(ctypes.Structure):
-    _fields_ = [("dx", ctypes.c_long),
-                ("dy", ctypes.c_long),
-                ("mouseData", ctypes.c_ulong),
-                ("dwFlags", ctypes.c_ulong),
-                ("time", ctypes.c_ulong),
-                ("dwExtraInfo", PUL)]
-
-class Input_I(ctypes.Union):
-    _fields_ = [("mi", MouseInput)]
-
-class Input(ctypes.Structure):
-    _fields_ = [("type", ctypes.c_ulong),
-                ("ii", Input_I)]
-    
-def click(x, y, hold_time=0.02):
-    ctypes.windll.user32.SetCursorPos(x, y)
+    def on_hotkey(self, action):
+        # Runs on the keyboard hook thread; RunWorker's controls are thread safe
+        worker = self.run_worker
+        if worker is None:
+            return
+        if action == "stop":
+            worker.stop()
+        elif action == "pause":
+            worker.pause()
+        elif action == "resume":
+            worker.resume()
+        elif action == "skip_step":
+            worker.skip_step()
+
+    def edit_hotkeys(self):
+        dialog = HotkeyDialog(self.settings["hotkeys"], self)
+        if dialog.exec_() == QDialog.Accepted:
+            self.settings["hotkeys"] = dialog.get_bindings()
+            save_settings(self.settings)
+            try:
+                self.hotkeys.rebind(self.settings["hotkeys"])
+            except Exception as e:
+                self.warn_hotkeys_unavailable(e)
+
+    def on_run_paused(self, paused):
+        self.pause_steps_btn.setText("Resume" if paused else "Pause")
+        if paused:
+            self.run_status_label.setText("Paused")
+
+    def on_run_step(self, repeat_index, step_index, step_name):
+        self.run_status_label.setText(
+            f"Repeat {repeat_index + 1}/{self.run_worker.engine.repeat or 'until stopped'} - "
+            f"Step {step_index + 1}: {step_name}"
+        )
+        if self.overlay:
+            self.overlay.highlight_step(step_index)
+
+    def on_run_click(self, step_index, x, y):
+        if self.overlay:
+            self.overlay.show_click(x, y)
+
+    def on_run_progress(self, done, total):
+        # total is 0 when loops, branches or an unlimited repeat make it unknown
+        self.setWindowTitle(f"Auto Clicker Config ({done}/{total})" if total else f"Auto Clicker Config ({done})")
+
+    def on_run_timing(self, step_index, error):
+        self.worst_timing_error = max(self.worst_timing_error, abs(error))
+        self.timing_label.setText(
+            f"Step {step_index + 1} timing error: {error * 1000:+.1f} ms "
+            f"(worst {self.worst_timing_error * 1000:.1f} ms)"
+        )
 
-    extra = ctypes.c_ulong(0)
-    ii_ = Input_I()
-    ii_.mi = MouseInput(0, 0, 0, 0x0002, 0, ctypes.pointer(extra))  # Mouse down
-    command = Input(ctypes.c_ulong(0), ii_)
-    ctypes.windll.user32.SendInput(1, ctypes.pointer(command), ctypes.sizeof(command))
+    def on_target_cycle(self, name, seconds, lock_wait_share):
+        self.target_cycles[name] = (seconds, lock_wait_share)
+        self.timing_label.setText("\n".join(
+            f"{target}: cycle {cycle:.1f} s, {share:.0%} waiting for input"
+            for target, (cycle, share) in sorted(self.target_cycles.items())
+        ))
 
-    time.sleep(hold_time) 
+    def on_run_reloaded(self, name):
+        self.run_status_label.setText(f"Reloaded {name}")
 
-    ii_.mi = MouseInput(0, 0, 0, 0x0004, 0, ctypes.pointer(extra))  # Mouse up
-    command = Input(ctypes.c_ulong(0), ii_)
-    ctypes.windll.user32.SendInput(1, ctypes.pointer(command), ctypes.sizeof(command))
+    def on_run_error(self, message):
+        QMessageBox.warning(self, "Run Failed", message)
+
+    def on_run_finished(self, stopped):
+        self.run_status_label.setText("Stopped" if stopped else "Finished")
+        self.setWindowTitle("Auto Clicker Config")
+        self.start_steps_btn.setEnabled(True)
+        self.start_all_btn.setEnabled(True)
+        self.pause_steps_btn.setEnabled(False)
+        self.pause_steps_btn.setText("Pause")
+        self.stop_steps_btn.setEnabled(False)
+        if self.overlay:
+            self.overlay.set_live(False)
+        if self.mover and self.mover.moves:
+            paths = self.mover.stats()
+            self.timing_label.setText(
+                f"{self.timing_label.text()}\nCursor paths: {paths.events} events, "
+                f"p99 lateness {paths.jitter_p99 * 1000:.1f} ms, {paths.cpu_per_event * 1e6:.0f} us CPU each"
+            )
+        self.stats_panel.stop()
+        self.hotkeys.stop()
+        self.run_worker.wait()
+        engine = getattr(self.run_worker, "engine", None)
+        if engine and engine.adaptive:
+            adaptive = engine.adaptive.stats()
+            self.timing_label.setText(
+                f"{self.timing_label.text()}\nAdaptive delays: {adaptive.saved:.1f} s saved, cycles "
+                f"{adaptive.cycle_reduction:.0%} shorter ({adaptive.observed} ready, {adaptive.early} early)"
+            )
+            if store_learned(self.store, engine.program):
+                self.save_configs()
+        self.run_worker.deleteLater()
+        self.run_worker = None
+        self.update_resume_button()
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -1,25 +1,88 @@
 from dataclasses import dataclass, field
 from typing import List
 
+STEP_KINDS = ("click", "wait_template", "click_template", "loop", "end_loop", "label", "goto", "call", "branch")
+DISTRIBUTIONS = ("uniform", "gaussian")
+VISION_KINDS = ("wait_template", "click_template")
+# Steps that steer the run instead of clicking; they take no time and have no position
+CONTROL_KINDS = ("loop", "end_loop", "label", "goto", "call", "branch")
+# What a branch step tests: its template is on screen now, every `count`-th time it is
+# reached, or a `count` percent chance
+BRANCH_CONDITIONS = ("template", "every", "chance")
+
 @dataclass
 class Step:
-    def __init__(self, x, y, radius, delay_min, delay_max, name ="Step"):
+    __slots__ = ("name", "x", "y", "radius", "delay_min", "delay_max", "distribution",
+                 "kind", "template", "region", "threshold", "timeout", "poll_interval",
+                 "target", "count", "condition", "adapt_min", "adapt_max", "ready")
+
+    def __init__(self, x, y, radius, delay_min, delay_max, name ="Step", distribution="uniform",
+                 kind="click", template="", region=None, threshold=0.8, timeout=30.0, poll_interval=0.25,
+                 target="", count=1, condition="every", adapt_min=0.0, adapt_max=0.0, ready=None):
         self.name = name
         self.x = x
         self.y = y
         self.radius = radius
         self.delay_min = delay_min
         self.delay_max = delay_max
+        # How click points spread over the circle, one of DISTRIBUTIONS
+        self.distribution = distribution
+        self.kind = kind
+        # Vision steps: image to look for, [x, y, w, h] search area (None = whole window),
+        # minimum NCC score, and how long / how often to look
+        self.template = template
+        self.region = region
+        self.threshold = threshold
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        # Control steps: label name (label, goto, branch) or config name (call),
+        # loop iterations (0 = forever) or branch parameter, and the branch condition
+        self.target = target
+        self.count = count
+        self.condition = condition
+        # Adaptive delays: the safety bounds a learned delay stays within (max 0 = delay_max),
+        # and the learned seconds until the screen was ready after this step's click
+        self.adapt_min = adapt_min
+        self.adapt_max = adapt_max
+        self.ready = ready
+
+    def uses_template(self):
+        """Whether template, region and threshold apply to this step"""
+        return self.kind in VISION_KINDS or (self.kind == "branch" and self.condition == "template")
 
     def to_dict(self):
-        return {
+        data = {
             "name": self.name,
             "x": self.x,
             "y": self.y,
             "radius": self.radius,
             "delay_min": self.delay_min,
-            "delay_max": self.delay_max
+            "delay_max": self.delay_max,
+            "distribution": self.distribution,
+            "kind": self.kind
         }
+        if self.adapt_min or self.adapt_max:
+            data.update({
+                "adapt_min": self.adapt_min,
+                "adapt_max": self.adapt_max
+            })
+        if self.ready:
+            data["ready"] = {key: list(values) for key, values in self.ready.items()}
+        if self.kind in CONTROL_KINDS:
+            data.update({
+                "target": self.target,
+                "count": self.count,
+                "condition": self.condition
+            })
+        if self.uses_template():
+            data.update({
+                "template": self.template,
+                "region": self.region,
+                "threshold": self.threshold,
+                "timeout": self.timeout,
+                "poll_interval": self.poll_interval
+            })
+        return data
 
     @classmethod
     def from_dict(cls, data):
@@ -29,23 +92,70 @@ class Step:
             y=data["y"],
             radius=data["radius"],
             delay_min=data["delay_min"],
-            delay_max=data["delay_max"]
+            delay_max=data["delay_max"],
+            distribution=data.get("distribution", "uniform"),
+            kind=data.get("kind", "click"),
+            template=data.get("template", ""),
+            region=data.get("region"),
+            threshold=data.get("threshold", 0.8),
+            timeout=data.get("timeout", 30.0),
+            poll_interval=data.get("poll_interval", 0.25),
+            target=data.get("target", ""),
+            count=data.get("count", 1),
+            condition=data.get("condition", "every"),
+            adapt_min=data.get("adapt_min", 0.0),
+            adapt_max=data.get("adapt_max", 0.0),
+            ready=data.get("ready")
         )
 
 @dataclass
 class Config:
-    def __init__(self, name):
+    def __init__(self, name, relative=False):
         self.name = name
+        # When relative, step coordinates are offsets from the window's top-left corner
+        self.relative = relative
         self.steps: List[Step] = []
 
     def to_dict(self):
         return {
             "name": self.name,
+            "relative": self.relative,
             "steps": [step.to_dict() for step in self.steps]
         }
 
     @classmethod
     def from_dict(cls, data):
-        cfg = cls(data["name"])
+        cfg = cls(data["name"], relative=data.get("relative", False))
         cfg.steps = [Step.from_dict(step_data) for step_data in data.get("steps", [])]
-        return cfg
\ No newline at end of file
+        return cfg
+
+    def snapshot(self) -> "Config":
+        """Deep copy used to hand a config to a run without sharing step objects"""
+        return Config.from_dict(self.to_dict())
+
+    def set_relative(self, relative, origin_x, origin_y):
+        """Switch coordinate mode, converting steps around the given window origin"""
+        if relative == self.relative:
+            return
+        sign = -1 if relative else 1
+        for step in self.steps:
+            if step.kind not in CONTROL_KINDS:
+                step.x += sign * origin_x
+                step.y += sign * origin_y
+            if step.region:
+                x, y, w, h = step.region
+                step.region = [x + sign * origin_x, y + sign * origin_y, w, h]
+        self.relative = relative
+
+    def resolve(self, step, origin_x, origin_y):
+        """Absolute screen position of a step's centre"""
+        if self.relative:
+            return step.x + origin_x, step.y + origin_y
+        return step.x, step.y
+
+    def resolve_region(self, region, origin_x, origin_y):
+        """Absolute [x, y, w, h] of a vision step's search region"""
+        x, y, w, h = region
+        if self.relative:
+            return x + origin_x, y + origin_y, w, h
+        return x, y, w, h
@@ -0,0 +1,203 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from input_backend import InputBackend
+from models import Config
+from run_engine import RunEngine, RunListener
+from scheduler import DeadlineScheduler, PrecisionWaiter
+from screen_capture import MatcherPool
+from trajectories import TrajectoryMover
+
+
+class InputArbiter:
+    """FIFO lock around the real focus + click, shared by every target.
+
+    Tickets are served in arrival order so no client can starve the others,
+    and the time each target spends queued and holding the lock is kept
+    for reporting.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self.clock = clock
+        self._cond = threading.Condition()
+        self._next_ticket = 0
+        self._serving = 0
+        self.wait_time: Dict[str, float] = {}
+        self.hold_time: Dict[str, float] = {}
+        self.acquisitions: Dict[str, int] = {}
+
+    @contextmanager
+    def hold(self, name: str):
+        queued_at = self.clock()
+        with self._cond:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            while self._serving != ticket:
+                self._cond.wait()
+        acquired_at = self.clock()
+        try:
+            yield
+        finally:
+            released_at = self.clock()
+            with self._cond:
+                self._serving += 1
+                self.wait_time[name] = self.wait_time.get(name, 0.0) + acquired_at - queued_at
+                self.hold_time[name] = self.hold_time.get(name, 0.0) + released_at - acquired_at
+                self.acquisitions[name] = self.acquisitions.get(name, 0) + 1
+                self._cond.notify_all()
+
+
+class RunTarget(NamedTuple):
+    name: str
+    config: Config
+    window: object
+    repeat: int
+    seed: Optional[int] = None
+
+
+class TargetStats(NamedTuple):
+    name: str
+    cycles: int
+    mean_cycle: float
+    last_cycle: float
+    lock_wait: float  # total seconds spent queued for the arbiter
+    lock_wait_share: float  # lock_wait as a fraction of the target's run time
+
+
+class _TargetListener(RunListener):
+    """Sums up cycle times for one target and forwards events to `inner`.
+
+    Only running totals are kept, so a run of any length uses the same memory.
+    """
+
+    def __init__(self, inner: RunListener):
+        self.inner = inner
+        self.cycles = 0
+        self.cycle_total = 0.0
+        self.last_cycle = 0.0
+
+    def on_step(self, repeat_index, step_index, step):
+        self.inner.on_step(repeat_index, step_index, step)
+
+    def on_progress(self, done, total):
+        self.inner.on_progress(done, total)
+
+    def on_timing(self, timing):
+        self.inner.on_timing(timing)
+
+    def on_click(self, step_index, x, y):
+        self.inner.on_click(step_index, x, y)
+
+    def on_cycle(self, repeat_index, seconds):
+        self.cycles += 1
+        self.cycle_total += seconds
+        self.last_cycle = seconds
+        self.inner.on_cycle(repeat_index, seconds)
+
+    def on_paused(self, paused):
+        self.inner.on_paused(paused)
+
+    def on_reloaded(self, name):
+        self.inner.on_reloaded(name)
+
+    def on_error(self, message):
+        self.inner.on_error(message)
+
+    def on_finished(self, stopped):
+        self.inner.on_finished(stopped)
+
+
+class MultiTargetRunner:
+    """Runs several (window, config) pairs at once, one engine thread each.
+
+    Delays and template searches overlap freely; only focus + click goes
+    through the shared InputArbiter, so throughput grows with the number
+    of clients until the arbiter itself is saturated. A `mover` is shared
+    too, since there is one cursor; its paths are walked under the arbiter.
+    So are `matchers`, whose worker processes match for every target.
+    """
+
+    def __init__(self, targets: List[RunTarget], backend: InputBackend,
+                 listener_factory: Callable[[RunTarget], RunListener] = None,
+                 focus_settle: float = 0.1, cycle_gap: float = 1.0,
+                 configs: Callable[[str], Config] = None, mover: TrajectoryMover = None,
+                 matchers: MatcherPool = None):
+        self.targets = targets
+        self.arbiter = InputArbiter()
+        self.engines: List[RunEngine] = []
+        self._listeners: List[_TargetListener] = []
+        self._threads: List[threading.Thread] = []
+        self._started_at = 0.0
+        self._finished_at: Optional[float] = None
+        for target in targets:
+            listener = _TargetListener(listener_factory(target) if listener_factory else RunListener())
+            waiter = PrecisionWaiter()
+            scheduler = DeadlineScheduler(waiter.clock, focus_settle=focus_settle, cycle_gap=cycle_gap)
+            self.engines.append(RunEngine(
+                target.config, target.window, target.repeat, backend, listener,
+                waiter=waiter, scheduler=scheduler, seed=target.seed,
+                arbiter=self.arbiter, name=target.name, configs=configs, mover=mover, matchers=matchers,
+            ))
+            self._listeners.append(listener)
+
+    def start(self):
+        self._started_at = self.arbiter.clock()
+        for engine in self.engines:
+            thread = threading.Thread(target=engine.run, name=f"run-{engine.name}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+        self._finished_at = self.arbiter.clock()
+
+    def run(self):
+        self.start()
+        self.join()
+
+    def stop(self):
+        for engine in self.engines:
+            engine.stop()
+
+    def pause(self):
+        for engine in self.engines:
+            engine.pause()
+
+    def resume(self):
+        for engine in self.engines:
+            engine.resume()
+
+    def skip_step(self):
+        for engine in self.engines:
+            engine.skip_step()
+
+    def reload(self, names) -> int:
+        """Rebuild every engine whose program uses one of the named configs; returns how many"""
+        engines = [engine for engine in self.engines if engine.uses(names)]
+        for engine in engines:
+            engine.reload()
+        return len(engines)
+
+    @property
+    def paused(self) -> bool:
+        return any(engine.paused for engine in self.engines)
+
+    def stats(self) -> List[TargetStats]:
+        end = self._finished_at or self.arbiter.clock()
+        elapsed = max(end - self._started_at, 1e-9)
+        result = []
+        for engine, listener in zip(self.engines, self._listeners):
+            cycles = listener.cycles
+            lock_wait = self.arbiter.wait_time.get(engine.name, 0.0)
+            result.append(TargetStats(
+                name=engine.name,
+                cycles=cycles,
+                mean_cycle=listener.cycle_total / cycles if cycles else 0.0,
+                last_cycle=listener.last_cycle,
+                lock_wait=lock_wait,
+                lock_wait_share=lock_wait / elapsed,
+            ))
+        return result
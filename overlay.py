@@ -0,0 +1,215 @@
+import time
+from typing import Optional, Tuple
+
+from PyQt5.QtWidgets import QWidget, QHBoxLayout, QPushButton
+from PyQt5.QtCore import Qt, QRect, QTimer, pyqtSignal
+from PyQt5.QtGui import QColor, QPen, QFont, QPainter, QPixmap, QRegion
+from models import CONTROL_KINDS, Config
+
+LIVE_FRAME_MS = 16  # ~60 fps while the live layer is animating
+CLICK_MARKER_SECONDS = 0.4
+HIGHLIGHT_MARGIN = 6
+
+
+class OverlayControlPanel(QWidget):
+    def __init__(self, on_close_callback):
+        super().__init__()
+
+        self.setWindowFlags(
+            Qt.FramelessWindowHint |
+            Qt.WindowStaysOnTopHint |
+            Qt.Tool
+        )
+        self.setAttribute(Qt.WA_TranslucentBackground)
+
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        close_btn = QPushButton("✕")
+        close_btn.setFixedSize(30, 30)
+        close_btn.clicked.connect(on_close_callback)
+        layout.addWidget(close_btn)
+
+        self.setStyleSheet("background-color: rgba(30, 30, 30, 180); color: white; border-radius: 4px;")
+
+
+class TransparentOverlay(QWidget):
+    """Step circles drawn over the target window.
+
+    The tint and circles are rendered into a cached pixmap that is only
+    rebuilt after `invalidate()` or when the overlay changes size; paint events copy just the
+    exposed region out of it. In live mode the running step and the last
+    click point are drawn on top, and a frame timer repaints only the small
+    rects around them, stopping once nothing is animating.
+    """
+
+    positionClicked = pyqtSignal(int, int)
+
+    def __init__(self, x, y, width, height, config: Config):
+        super().__init__()
+
+        self.setWindowFlags(
+            Qt.FramelessWindowHint |
+            Qt.WindowStaysOnTopHint |
+            Qt.Tool
+        )
+        self.setAttribute(Qt.WA_TranslucentBackground)
+        self.setAttribute(Qt.WA_ShowWithoutActivating)
+        self.setGeometry(x, y, width, height)
+        self.config = config
+        self.active_for_step = False
+
+        self.live = False
+        self.current_step: Optional[int] = None
+        self._click: Optional[Tuple[int, int, float]] = None  # local x, local y, time shown
+        self._layer: Optional[QPixmap] = None
+        self._dirty = QRegion()
+        self._frame_timer = QTimer(self)
+        self._frame_timer.setInterval(LIVE_FRAME_MS)
+        self._frame_timer.timeout.connect(self._next_frame)
+
+    def set_config(self, config: Config):
+        self.config = config
+        self.current_step = None
+        self.invalidate()
+
+    def invalidate(self):
+        """Rebuild the step layer on the next paint, e.g. after steps change"""
+        self._layer = None
+        self.update()
+
+    def _step_center(self, step) -> Tuple[int, int]:
+        cx, cy = self.config.resolve(step, self.x(), self.y())
+        return cx - self.x(), cy - self.y()
+
+    def _render_layer(self):
+        ratio = self.devicePixelRatioF()
+        layer = QPixmap(self.size() * ratio)
+        layer.setDevicePixelRatio(ratio)
+        layer.fill(Qt.transparent)
+
+        painter = QPainter(layer)
+        painter.setRenderHint(QPainter.Antialiasing)
+
+        painter.setBrush(QColor(0, 255, 0, 100))
+        painter.setPen(Qt.NoPen)
+        painter.drawRect(self.rect())
+
+        painter.setBrush(Qt.NoBrush)
+        step_pen = QPen(QColor(0, 0, 0, 200))
+        step_pen.setWidth(2)
+        painter.setPen(step_pen)
+        font = QFont("Arial", 12, QFont.Bold)
+        painter.setFont(font)
+
+        if self.config:
+            for i, step in enumerate(self.config.steps):
+                if step.kind in CONTROL_KINDS:
+                    continue
+                local_x, local_y = self._step_center(step)
+                radius = int(step.radius)
+
+                rect = QRect(local_x - radius, local_y - radius, radius * 2, radius * 2)
+                painter.drawEllipse(rect)
+                painter.drawText(QRect(local_x - 10, local_y - 10, 20, 20), Qt.AlignCenter, str(i + 1))
+        painter.end()
+        self._layer = layer
+
+    def paintEvent(self, event):
+        if self._layer is None or self._layer.size() != self.size() * self.devicePixelRatioF():
+            self._render_layer()
+        painter = QPainter(self)
+        painter.setClipRegion(event.region())
+        painter.drawPixmap(0, 0, self._layer)
+        if self.live:
+            painter.setRenderHint(QPainter.Antialiasing)
+            self._paint_live(painter)
+
+    def _paint_live(self, painter: QPainter):
+        rect = self._highlight_rect()
+        if rect is not None:
+            pen = QPen(QColor(255, 200, 0, 230))
+            pen.setWidth(4)
+            painter.setPen(pen)
+            painter.setBrush(QColor(255, 200, 0, 60))
+            painter.drawEllipse(rect.adjusted(HIGHLIGHT_MARGIN - 2, HIGHLIGHT_MARGIN - 2,
+                                              2 - HIGHLIGHT_MARGIN, 2 - HIGHLIGHT_MARGIN))
+        if self._click is not None:
+            x, y, shown_at = self._click
+            fade = 1.0 - (time.monotonic() - shown_at) / CLICK_MARKER_SECONDS
+            if fade > 0:
+                pen = QPen(QColor(255, 0, 0, int(255 * fade)))
+                pen.setWidth(2)
+                painter.setPen(pen)
+                painter.setBrush(Qt.NoBrush)
+                size = 4 + int(8 * (1.0 - fade))
+                painter.drawEllipse(QRect(x - size, y - size, size * 2, size * 2))
+                painter.drawLine(x - 3, y, x + 3, y)
+                painter.drawLine(x, y - 3, x, y + 3)
+
+    def _highlight_rect(self) -> Optional[QRect]:
+        if self.current_step is None or not self.config or self.current_step >= len(self.config.steps):
+            return None
+        step = self.config.steps[self.current_step]
+        if step.kind in CONTROL_KINDS:
+            return None
+        x, y = self._step_center(step)
+        radius = int(step.radius) + HIGHLIGHT_MARGIN
+        return QRect(x - radius, y - radius, radius * 2, radius * 2)
+
+    def _click_rect(self) -> Optional[QRect]:
+        if self._click is None:
+            return None
+        x, y, _ = self._click
+        return QRect(x - 16, y - 16, 32, 32)
+
+    def _mark_dirty(self, rect: Optional[QRect]):
+        if rect is not None:
+            self._dirty |= QRegion(rect)
+            if not self._frame_timer.isActive():
+                self._frame_timer.start()
+
+    def _next_frame(self):
+        if self._click is not None:
+            self._mark_dirty(self._click_rect())  # keep fading the marker
+            if time.monotonic() - self._click[2] >= CLICK_MARKER_SECONDS:
+                self._click = None  # this frame erases it
+        if self._dirty.isEmpty():
+            self._frame_timer.stop()
+            return
+        self.update(self._dirty)
+        self._dirty = QRegion()
+
+    def set_live(self, live: bool):
+        """Show run progress and let mouse input pass through to the window below"""
+        if live == self.live:
+            return
+        self.live = live
+        visible = self.isVisible()
+        self.setWindowFlag(Qt.WindowTransparentForInput, live)
+        self.setAttribute(Qt.WA_TransparentForMouseEvents, live)
+        if visible:
+            self.show()  # changing window flags hides the window
+        if not live:
+            self._mark_dirty(self._highlight_rect())
+            self._mark_dirty(self._click_rect())
+            self.current_step = None
+            self._click = None
+
+    def highlight_step(self, step_index: int):
+        if step_index == self.current_step:
+            return
+        self._mark_dirty(self._highlight_rect())
+        self.current_step = step_index
+        self._mark_dirty(self._highlight_rect())
+
+    def show_click(self, x: int, y: int):
+        """Mark a click at screen coordinates (x, y)"""
+        self._mark_dirty(self._click_rect())
+        self._click = (x - self.x(), y - self.y(), time.monotonic())
+        self._mark_dirty(self._click_rect())
+
+    def mousePressEvent(self, event):
+        if self.active_for_step and event.button() == Qt.LeftButton:
+            self.active_for_step = False  # deactivate after first use
+            self.positionClicked.emit(event.x(), event.y())
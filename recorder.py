@@ -0,0 +1,279 @@
+"""Record real mouse clicks and turn them into steps.
+
+    python -m recorder events.jsonl                     # print the steps a recording becomes
+    python -m recorder events.jsonl --name "Farm Loop"  # and save them as a new config
+
+Event files are JSON Lines of InputEvent fields, as written by
+`save_events`; a RecordingInputBackend's events can be saved the same way.
+"""
+import argparse
+import json
+import math
+import sys
+import threading
+import time
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from input_backend import InputEvent
+from models import Config, Step
+
+RING_SIZE = 4096
+
+
+class EventRing:
+    """Preallocated ring of press/release events with one writer and one reader.
+
+    `push` is called from the input hook thread and only stores into
+    preallocated lists and bumps a counter, so recording adds next to
+    nothing to the hook's latency. If the reader falls more than `size`
+    events behind, the oldest are overwritten and counted in `dropped`.
+    """
+
+    def __init__(self, size: int = RING_SIZE):
+        self.size = size
+        self._times = [0.0] * size
+        self._xs = [0] * size
+        self._ys = [0] * size
+        self._pressed = [False] * size
+        self._written = 0
+        self._read = 0
+        self.dropped = 0
+
+    def push(self, t: float, x: int, y: int, pressed: bool):
+        i = self._written % self.size
+        self._times[i] = t
+        self._xs[i] = x
+        self._ys[i] = y
+        self._pressed[i] = pressed
+        self._written += 1  # publish last, so a reader never sees a half-written slot
+
+    def drain(self) -> List[InputEvent]:
+        written = self._written
+        start = max(self._read, written - self.size)
+        self.dropped += start - self._read
+        events = []
+        for n in range(start, written):
+            i = n % self.size
+            events.append(InputEvent(self._times[i], "press" if self._pressed[i] else "release",
+                                     self._xs[i], self._ys[i]))
+        self._read = written
+        return events
+
+
+class MacroRecorder:
+    """Records left clicks through a pynput mouse listener.
+
+    pynput calls `on_click` on its own listener thread for every button
+    change; only left-button events are kept, pushed into an EventRing.
+    Mouse movement isn't subscribed to at all. `drain()` collects what was
+    recorded so far and may be called while recording.
+    """
+
+    def __init__(self, ring_size: int = RING_SIZE, clock: Callable[[], float] = time.perf_counter,
+                 mouse_module=None):
+        self.ring = EventRing(ring_size)
+        self.clock = clock
+        self._mouse = mouse_module
+        self._listener = None
+        self._events: List[InputEvent] = []
+        self._lock = threading.Lock()
+
+    @property
+    def recording(self) -> bool:
+        return self._listener is not None
+
+    def start(self):
+        if self._listener is not None:
+            return
+        if self._mouse is None:
+            from pynput import mouse
+            self._mouse = mouse
+        self._left = self._mouse.Button.left
+        self._listener = self._mouse.Listener(on_click=self.on_click)
+        self._listener.start()
+
+    def on_click(self, x, y, button, pressed):
+        if button == self._left:
+            self.ring.push(self.clock(), int(x), int(y), pressed)
+
+    def stop(self) -> List[InputEvent]:
+        """Stop listening and return every event recorded since `start()`"""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener.join()  # don't leave a hook thread behind for every recording
+            self._listener = None
+        return self.drain()
+
+    def drain(self) -> List[InputEvent]:
+        with self._lock:
+            self._events += self.ring.drain()
+            return list(self._events)
+
+    def clear(self):
+        with self._lock:
+            self.ring.drain()
+            self.ring.dropped = 0
+            self._events = []
+
+
+class Click(NamedTuple):
+    time: float
+    x: int
+    y: int
+    hold: float
+
+
+def save_events(path: str, events: Sequence[InputEvent]):
+    with open(path, "w") as f:
+        for event in events:
+            f.write(json.dumps(event._asdict()) + "\n")
+
+
+def load_events(path: str) -> List[InputEvent]:
+    with open(path) as f:
+        return [InputEvent(**json.loads(line)) for line in f if line.strip()]
+
+
+def replay(events: Sequence[InputEvent], recorder: MacroRecorder):
+    """Push saved events into a recorder's ring, as its hook would have"""
+    for event in events:
+        if event.kind in ("press", "release"):
+            recorder.ring.push(event.time, event.x, event.y, event.kind == "press")
+
+
+def _inside(x: int, y: int, rect: Tuple[int, int, int, int]) -> bool:
+    left, top, width, height = rect
+    return left <= x < left + width and top <= y < top + height
+
+
+def extract_clicks(events: Sequence[InputEvent], max_hold: float = 1.0, max_slip: int = 10,
+                   debounce: float = 0.05, exclude: Sequence[Tuple[int, int, int, int]] = ()) -> List[Click]:
+    """Pair presses with releases and drop the noise.
+
+    Dropped: unpaired presses and releases, drags (held longer than
+    `max_hold` or released more than `max_slip` pixels away), switch bounce
+    (a second click on the same spot within `debounce` seconds) and clicks
+    inside any `exclude` rect, such as the recorder's own window.
+    """
+    clicks: List[Click] = []
+    pressed: Optional[InputEvent] = None
+    for event in events:
+        if event.kind == "press":
+            pressed = event
+            continue
+        if event.kind != "release" or pressed is None:
+            continue
+        started, x, y = pressed.time, pressed.x, pressed.y
+        pressed = None
+        hold = event.time - started
+        if hold > max_hold or math.hypot(event.x - x, event.y - y) > max_slip:
+            continue
+        if any(_inside(x, y, rect) for rect in exclude):
+            continue
+        if clicks:
+            last = clicks[-1]
+            if started - (last.time + last.hold) < debounce and math.hypot(x - last.x, y - last.y) <= max_slip:
+                continue
+        clicks.append(Click(started, x, y, hold))
+    return clicks
+
+
+def cluster_labels(clicks: Sequence[Click], radius: float) -> List[int]:
+    """Greedy clustering: each click joins the first cluster whose centre is within `radius`"""
+    centres: List[List[float]] = []  # [sum x, sum y, count]
+    labels = []
+    for click in clicks:
+        for label, (sx, sy, n) in enumerate(centres):
+            if math.hypot(click.x - sx / n, click.y - sy / n) <= radius:
+                centres[label] = [sx + click.x, sy + click.y, n + 1]
+                break
+        else:
+            label = len(centres)
+            centres.append([click.x, click.y, 1])
+        labels.append(label)
+    return labels
+
+
+def find_period(labels: Sequence[int]) -> int:
+    """Shortest pass length the click sequence repeats with, or its full length if it doesn't"""
+    n = len(labels)
+    for period in range(1, n // 2 + 1):
+        if all(labels[i] == labels[i - period] for i in range(period, n)):
+            return period
+    return n
+
+
+def build_steps(clicks: Sequence[Click], cluster_radius: float = 40.0, min_radius: int = 5,
+                default_delay: Tuple[float, float] = (2.0, 3.0)) -> List[Step]:
+    """Turn a demonstration into steps.
+
+    Clicks are clustered by position; if the sequence of clusters repeats,
+    one pass of it becomes the steps and every pass contributes samples.
+    Each step is centred on its samples' mean with a radius covering their
+    spread, and its delay range is the shortest to longest gap observed
+    between that step's release and the next press.
+    """
+    if not clicks:
+        return []
+    labels = cluster_labels(clicks, cluster_radius)
+    period = find_period(labels)
+    xs = np.array([click.x for click in clicks], dtype=float)
+    ys = np.array([click.y for click in clicks], dtype=float)
+    # The engine waits the delay after releasing, so measure from release to the next press
+    gaps = np.array([later.time - (click.time + click.hold) for click, later in zip(clicks, clicks[1:])])
+    steps = []
+    for k in range(period):
+        members = np.arange(k, len(clicks), period)
+        cx, cy = xs[members].mean(), ys[members].mean()
+        spread = np.hypot(xs[members] - cx, ys[members] - cy).max()
+        radius = int(min(max(math.ceil(spread), min_radius), cluster_radius))
+        observed = gaps[members[members < len(gaps)]]
+        if len(observed):
+            delay_min, delay_max = round(float(observed.min()), 2), round(float(observed.max()), 2)
+        else:
+            delay_min, delay_max = default_delay
+        steps.append(Step(x=int(round(cx)), y=int(round(cy)), radius=radius,
+                          delay_min=delay_min, delay_max=delay_max, name=f"Step {k + 1}"))
+    return steps
+
+
+def build_config(name: str, events: Sequence[InputEvent], origin: Optional[Tuple[int, int]] = None,
+                 exclude: Sequence[Tuple[int, int, int, int]] = (), **options) -> Config:
+    """A config from recorded events; with `origin`, steps are relative to that window corner"""
+    config = Config(name, relative=origin is not None)
+    config.steps = build_steps(extract_clicks(events, exclude=exclude), **options)
+    if origin is not None:
+        for step in config.steps:
+            step.x -= origin[0]
+            step.y -= origin[1]
+    return config
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m recorder", description="Turn recorded clicks into steps.")
+    parser.add_argument("events", help="JSON Lines event file")
+    parser.add_argument("--name", help="save the steps as a new config with this name")
+    parser.add_argument("--config-file", default="configs.json", help="configs.json or a .db store")
+    parser.add_argument("--cluster-radius", type=float, default=40.0, help="pixels within which clicks are one spot")
+    args = parser.parse_args(argv)
+
+    config = build_config(args.name or "recording", load_events(args.events), cluster_radius=args.cluster_radius)
+    for step in config.steps:
+        print(f"{step.name}: x={step.x}, y={step.y}, r={step.radius}, delay=({step.delay_min}-{step.delay_max})")
+    if args.name:
+        from config_store import open_store
+        store = open_store(args.config_file)
+        try:
+            store.add(config)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 2
+        store.save()
+        print(f"Saved {len(config.steps)} steps as '{args.name}'")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,570 @@
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+from adaptive import AdaptiveDelays, watch_region
+from checkpoint import Checkpoint, CheckpointError, CheckpointWriter
+from input_backend import InputBackend
+from models import VISION_KINDS, Config, Step
+from scheduler import DeadlineScheduler, PrecisionWaiter, StepTiming
+from screen_capture import CapturePipeline, Frame, MatcherPool, ScreenSource
+from step_program import (
+    OP_BRANCH, OP_CALL, OP_JUMP, OP_LOOP, OP_NEXT, OP_RETURN, OP_STEP, StepProgram
+)
+from telemetry import Telemetry
+from trajectories import TrajectoryMover
+from template_match import Match, TemplateCache, match_template
+from window_registry import WindowTarget
+
+# Runs of each click slot worth of jitter drawn per vectorized RNG call
+JITTER_BATCH = 64
+
+
+class RunListener:
+    """Receives events from a RunEngine. All callbacks run on the engine's thread."""
+
+    def on_step(self, repeat_index: int, step_index: int, step: Step):
+        pass
+
+    def on_progress(self, done: int, total: int):
+        pass
+
+    def on_timing(self, timing: StepTiming):
+        pass
+
+    def on_click(self, step_index: int, x: int, y: int):
+        """Called after a click is sent, with the screen point actually clicked"""
+        pass
+
+    def on_cycle(self, repeat_index: int, seconds: float):
+        """Called after each full pass over the steps with its wall-clock duration"""
+        pass
+
+    def on_paused(self, paused: bool):
+        """Called on the thread that paused or resumed the engine"""
+        pass
+
+    def on_reloaded(self, name: str):
+        """Called when a reloaded program takes over at a cycle boundary"""
+        pass
+
+    def on_error(self, message: str):
+        pass
+
+    def on_finished(self, stopped: bool):
+        pass
+
+
+class RunEngine:
+    """Runs a snapshot of a config `repeat` times against a window (0 = until stopped).
+
+    The engine is thread agnostic: `run()` blocks the calling thread, while
+    `pause()`, `resume()` and `stop()` may be called from any other thread.
+    Every wait goes through a condition variable so a stop request wakes the
+    run immediately instead of after the current delay expires. Clicks are
+    placed on absolute deadlines from a DeadlineScheduler and the last
+    couple of milliseconds before each one are spun by a PrecisionWaiter.
+    `skip_step()` abandons whichever step is currently being waited on.
+    Click jitter comes from a StepProgram, so a given `seed` replays the
+    same offsets, holds and delays. The StepProgram also holds the config's
+    loops, gotos, branches and calls (configs are looked up by name through
+    `configs`) compiled to a flat instruction list, which `run()` steps
+    through with preallocated counters and call stack. Vision steps poll
+    their region through a CapturePipeline (real screenshots unless one is
+    passed in) and only re-run matching when the captured pixels changed,
+    optionally on a MatcherPool. The run closes the pipeline when it ends if
+    it made it, or if `owns_capture` hands over one that was passed in.
+
+    When several engines share an `arbiter`, each waits out its delays
+    independently and only holds the arbiter for the focus + click itself.
+
+    `reload()` compiles an edited config on the caller's thread and the
+    run switches to it at the next cycle boundary, so a pass never mixes
+    two versions of the steps.
+
+    With a `checkpoint` writer, the interpreter state is saved after every
+    step and pass, and kept if the run stops or fails; a run built with
+    `resume` carries on from such a checkpoint, with the same jitter.
+
+    With `adaptive`, the target of each click step is watched for change
+    after the click before it, and the delays between them are fitted to
+    how long the screen actually took to get ready.
+
+    With a `mover`, the cursor travels to each click along a human-like
+    path streamed at a fixed rate, started early so the click still lands
+    on its deadline.
+
+    With `telemetry` set, each step's time is split into the PHASES it went
+    through and recorded along with its deadline error and the cycle times.
+    """
+
+    def __init__(self, config: Config, window, repeat: int,
+                 backend: InputBackend,
+                 listener: Optional[RunListener] = None,
+                 waiter: Optional[PrecisionWaiter] = None,
+                 scheduler: Optional[DeadlineScheduler] = None,
+                 seed: Optional[int] = None,
+                 capture: Optional[CapturePipeline] = None,
+                 owns_capture: Optional[bool] = None,
+                 templates: Optional[TemplateCache] = None,
+                 matchers: Optional[MatcherPool] = None,
+                 arbiter=None,
+                 name: Optional[str] = None,
+                 telemetry: Optional[Telemetry] = None,
+                 configs: Optional[Callable[[str], Config]] = None,
+                 mover: Optional[TrajectoryMover] = None,
+                 checkpoint: Optional[CheckpointWriter] = None,
+                 resume: Optional[Checkpoint] = None,
+                 adaptive: Optional[AdaptiveDelays] = None):
+        self.config = config.snapshot()
+        self.program = StepProgram(self.config, seed, resolve=configs)
+        if resume and (resume.config != self.config.name or resume.version != self.program.version):
+            raise CheckpointError(f"'{self.config.name}' has changed since its checkpoint was saved")
+        self.checkpoint = checkpoint
+        self.resume = resume
+        self.configs = configs
+        self._pending: Optional[StepProgram] = None
+        self.target = window if isinstance(window, WindowTarget) else WindowTarget(window)
+        self.repeat = repeat
+        self.backend = backend
+        self.listener = listener or RunListener()
+        self.waiter = waiter or PrecisionWaiter()
+        self.scheduler = scheduler or DeadlineScheduler(self.waiter.clock)
+        self._owns_capture = capture is None if owns_capture is None else owns_capture
+        self.capture = capture or CapturePipeline(ScreenSource())
+        self.templates = templates or TemplateCache()
+        self.matchers = matchers
+        self.arbiter = arbiter
+        self.name = name or self.config.name
+        self.telemetry = telemetry
+        self.mover = mover
+        self.adaptive = adaptive
+        if adaptive and adaptive.source is None:
+            adaptive.source = self.capture.source
+
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._paused = False
+        self._skip_requested = False
+        self._repeat_index = 0
+        self._step_started = 0.0
+        self._focus_seconds = 0.0
+        self._move_seconds = 0.0
+        self._last_slot: Optional[int] = None  # slot clicked last, whose delay is being waited out
+        self._last_delay = 0.0
+        self._watch_origin = 0.0
+
+    @property
+    def stopped(self) -> bool:
+        return self._stopped
+
+    @property
+    def paused(self) -> bool:
+        return self._paused
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def pause(self):
+        self._set_paused(True)
+
+    def resume(self):
+        self._set_paused(False)
+
+    def _set_paused(self, paused: bool):
+        with self._cond:
+            changed = self._paused != paused
+            self._paused = paused
+            self._cond.notify_all()
+        if changed:
+            self.listener.on_paused(paused)
+
+    def uses(self, names) -> bool:
+        """Whether the running (or pending) program was built from any of the named configs"""
+        program = self._pending or self.program
+        return not program.config_names.isdisjoint(names)
+
+    def reload(self, config: Optional[Config] = None):
+        """Rebuild the program from `config`, or from the current version of the running config.
+
+        Raises ProgramError (a ValueError) if it no longer compiles, in which
+        case the run carries on with the old program.
+        """
+        if config is None:
+            if self.configs is None:
+                raise ValueError("no configs to reload from")
+            config = self.configs(self.config.name)
+        config = config.snapshot()
+        program = StepProgram(config, resolve=self.configs)
+        # Keep drawing from the same stream so a seeded run stays reproducible
+        program.rng = self.program.rng
+        with self._cond:
+            self.config = config
+            self._pending = program
+
+    def skip_step(self):
+        with self._cond:
+            self._skip_requested = True
+            self._cond.notify_all()
+
+    def _take_skip(self) -> bool:
+        with self._cond:
+            skipped = self._skip_requested
+            self._skip_requested = False
+        if skipped:
+            self.scheduler.next_deadline = self.waiter.clock()
+        return skipped
+
+    def _wait_until(self, deadline: float) -> bool:
+        """Wait until `deadline` on the waiter's clock. Returns False if stopped.
+
+        Time spent paused pushes back both this deadline and the rest of the
+        plan. A pending skip request ends the wait early.
+        """
+        clock = self.waiter.clock
+        with self._cond:
+            while not self._stopped and not self._skip_requested:
+                if self._paused:
+                    paused_at = clock()
+                    self._cond.wait()
+                    paused_for = clock() - paused_at
+                    self.scheduler.shift(paused_for)
+                    deadline += paused_for
+                    continue
+                remaining = self.waiter.coarse_remaining(deadline)
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            if self._stopped:
+                return False
+            if self._skip_requested:
+                return True
+        self.waiter.spin_until(deadline, lambda: self._stopped or self._skip_requested)
+        return not self._stopped
+
+    def run(self):
+        program = None
+        clock = self.waiter.clock
+        # Paths to the next click set off before its deadline, so wake up in time for the longest
+        lead = self.mover.max_duration if self.mover else 0.0
+        resume, self.resume = self.resume, None
+        checkpoint = self.checkpoint
+        done = resume.done if resume else 0
+        completed = False
+        try:
+            if self.waiter.accuracy is None:
+                self.waiter.calibrate()
+            self.scheduler.start()
+            cycle_started = clock()
+            repeat_index = resume.repeat_index if resume else 0
+            pc = sp = 0
+            while (not self.repeat or repeat_index < self.repeat) and not self._stopped:
+                self._repeat_index = repeat_index
+                if self._pending is not None:
+                    with self._cond:
+                        previous, self.program, self._pending = self.program, self._pending, None
+                    if self.adaptive:
+                        self._carry_learned(previous)
+                    # Capture keys are slot numbers, which may now belong to other steps
+                    self.capture.invalidate()
+                    self.listener.on_reloaded(self.config.name)
+                if self.program is not program:
+                    program = self.program
+                    ops, args, targets, origins = program.ops, program.args, program.targets, program.origins
+                    slots, loop_counts = program.slots, program.loop_counts
+                    # Everything the interpreter mutates is allocated here, once per program
+                    counters = [0] * len(loop_counts)
+                    stack = [0] * program.call_depth
+                    rows = [0] * len(slots)  # next batch row for each slot
+                    self._branch_hits = [0] * len(program.branches)
+                    self._branch_seen = [False] * len(program.branches)
+                    self._slot_matches = [None] * len(slots)
+                    batch_rng = program.rng.bit_generator.state
+                    self._last_slot = None
+                    if resume:
+                        # Pick up mid-pass, redrawing the jitter batch the checkpoint was using
+                        pc, sp = resume.pc, len(resume.stack)
+                        stack[:sp] = resume.stack
+                        counters[:] = resume.counters
+                        rows[:] = resume.rows
+                        self._branch_hits[:] = resume.branch_hits
+                        self._branch_seen[:] = resume.branch_seen
+                        batch_rng = program.rng.bit_generator.state = resume.batch_rng
+                    batch = program.sample(JITTER_BATCH)
+                    if resume:
+                        program.rng.bit_generator.state = resume.rng
+                        resume = None
+                    per_pass = program.steps_per_pass
+                    total = done + (self.repeat - repeat_index) * per_pass if self.repeat and per_pass is not None else 0
+                while True:
+                    op = ops[pc]
+                    if op == OP_STEP:
+                        slot = args[pc]
+                        row = rows[slot]
+                        if row == JITTER_BATCH:
+                            batch_rng = program.rng.bit_generator.state
+                            batch = program.sample(JITTER_BATCH)
+                            for i in range(len(rows)):
+                                rows[i] = 0
+                            row = 0
+                        rows[slot] = row + 1
+                        # Steps inside called configs report the top-level call they run under
+                        step_index = origins[pc] if sp == 0 else origins[stack[0] - 1]
+                        self._step_started = clock()
+                        if self.adaptive:
+                            self._adapt(slot)
+                        if not self._wait_until(self.scheduler.activation_deadline() - lead):
+                            return
+                        if not self._take_skip():
+                            self.listener.on_step(repeat_index, step_index, slots[slot])
+                            if not self.click_step(step_index, slot, batch.dx[row][slot], batch.dy[row][slot],
+                                                   batch.hold[row][slot], batch.delay[row][slot]):
+                                return
+                        done += 1
+                        pc += 1
+                        if checkpoint:
+                            self._save_checkpoint(repeat_index, pc, stack[:sp], counters, rows, batch_rng, done)
+                        self.listener.on_progress(done, total)
+                    elif op == OP_JUMP:
+                        pc = targets[pc]
+                    elif op == OP_LOOP:
+                        counters[args[pc]] = loop_counts[args[pc]]
+                        pc += 1
+                    elif op == OP_NEXT:
+                        # A loop of 0 counts down past zero and never exits
+                        loop = args[pc]
+                        counters[loop] -= 1
+                        pc = targets[pc] if counters[loop] else pc + 1
+                    elif op == OP_CALL:
+                        stack[sp] = pc + 1
+                        sp += 1
+                        pc = args[pc]
+                    elif op == OP_RETURN:
+                        sp -= 1
+                        pc = stack[sp]
+                    elif op == OP_BRANCH:
+                        pc = targets[pc] if self._branch_taken(args[pc]) else pc + 1
+                    else:
+                        break
+                self.scheduler.end_cycle()
+                cycle_ended = clock()
+                self.listener.on_cycle(repeat_index, cycle_ended - cycle_started)
+                if self.telemetry:
+                    self.telemetry.record_cycle(repeat_index, cycle_ended - cycle_started)
+                if self.adaptive:
+                    self.adaptive.record_cycle(cycle_ended - cycle_started)
+                cycle_started = cycle_ended
+                repeat_index += 1
+                pc = sp = 0
+                if checkpoint:
+                    self._save_checkpoint(repeat_index, 0, [], counters, rows, batch_rng, done)
+            completed = not self._stopped
+        except Exception as e:
+            self.listener.on_error(str(e))
+        finally:
+            if self.adaptive:
+                self.adaptive.close()
+            if self._owns_capture:
+                self.capture.close()
+            if checkpoint:
+                # A finished run has nothing left to resume; anything else keeps its place
+                if completed:
+                    checkpoint.discard()
+                else:
+                    checkpoint.close()
+            self.listener.on_finished(self._stopped)
+
+    def _save_checkpoint(self, repeat_index: int, pc: int, stack: List[int], counters: List[int],
+                         rows: List[int], batch_rng: dict, done: int):
+        program = self.program
+        self.checkpoint.save(Checkpoint(
+            self.config.name, program.version, self.repeat, repeat_index, pc, stack, list(counters), list(rows),
+            list(self._branch_hits), list(self._branch_seen), batch_rng, program.rng.bit_generator.state,
+            done, time.time(),
+        ))
+
+    def _adapt(self, slot: int):
+        """Fit the wait since the last click to what its step learned, and watch this step's target"""
+        last, self._last_slot = self._last_slot, None
+        if last is None:
+            self.adaptive.cancel()
+            return
+        owner = self.program.slots[last]
+        delay = self.adaptive.delay(owner, self._last_delay)
+        self.scheduler.next_deadline += delay - self._last_delay
+        step = self.program.slots[slot]
+        if step.kind != "click":
+            # Vision steps wait for their own template; nothing to learn from them
+            self.adaptive.cancel()
+            return
+        x, y = step.x, step.y
+        if self.program.slot_relative[slot]:
+            origin_x, origin_y = self.target.origin()
+            x, y = x + origin_x, y + origin_y
+        self._watch_origin = self.scheduler.origin
+        self.adaptive.watch(owner, watch_region(x, y, step.radius), self.waiter.clock())
+
+    def _carry_learned(self, previous: StepProgram):
+        """Hand what the old program's steps learned to the same steps in the reloaded one"""
+        learned = {source: step.ready for step, source in zip(previous.slots, previous.slot_sources) if step.ready}
+        for step, source in zip(self.program.slots, self.program.slot_sources):
+            if source in learned:
+                step.ready = learned[source]
+
+    def _branch_taken(self, branch: int) -> bool:
+        step = self.program.branches[branch]
+        if step.condition == "every":
+            self._branch_hits[branch] += 1
+            if self._branch_hits[branch] < step.count:
+                return False
+            self._branch_hits[branch] = 0
+            return True
+        if step.condition == "chance":
+            return self.program.rng.random() * 100 < step.count
+        # One look, no waiting; negative capture keys keep clear of the click slots
+        region = self._search_region(step, self.program.branch_relative[branch])
+        frame = self.capture.capture(-1 - branch, region)
+        if frame.changed:
+            self._branch_seen[branch] = self._match(frame, step) is not None
+        return self._branch_seen[branch]
+
+    def _search_region(self, step: Step, relative: bool) -> Tuple[int, int, int, int]:
+        """Absolute [x, y, w, h] a template step looks in"""
+        if not step.region:
+            return self.target.rect()
+        x, y, w, h = step.region
+        if relative:
+            origin_x, origin_y = self.target.origin()
+            return x + origin_x, y + origin_y, w, h
+        return x, y, w, h
+
+    def _focus_until(self, deadline: float) -> bool:
+        """Focus the target, then wait for `deadline` or the focus settle time, whichever is later"""
+        focused_at = self.waiter.clock()
+        if self.target.ensure_focused():
+            deadline = max(deadline, focused_at + self.scheduler.focus_settle)
+        self._focus_seconds = self.waiter.clock() - focused_at
+        return self._wait_until(deadline)
+
+    def click_step(self, step_index: int, slot: int, dx: int, dy: int, hold: float, delay: float) -> bool:
+        step = self.program.slots[slot]
+        arbiter = self.arbiter
+        mover = self.mover
+        clock = self.waiter.clock
+        focus = lock = search = 0.0
+        self._move_seconds = 0.0
+        cx, cy = step.x, step.y
+        if self.program.slot_relative[slot]:
+            origin_x, origin_y = self.target.origin()
+            cx, cy = cx + origin_x, cy + origin_y
+        deadline = self.scheduler.next_deadline
+        path = None
+        if mover and arbiter is None and step.kind == "click":
+            # Set off early enough for the path to end on the click deadline
+            path = mover.plan(cx + dx, cy + dy)
+            if path:
+                path = mover.fit(path, deadline - clock())
+                deadline -= mover.duration(path)
+        if arbiter is None:
+            ready = self._focus_until(deadline)
+            focus = self._focus_seconds
+        else:
+            # Focusing now would be undone by the other targets; do it under the arbiter
+            ready = self._wait_until(deadline)
+        if not ready:
+            return False
+        if self._take_skip():
+            return True
+        if step.kind in VISION_KINDS:
+            search_started = clock()
+            found = self.wait_for_template(slot)
+            if found is None:
+                return self._take_skip()
+            cx, cy = found
+            # The search moved this step off its planned deadline; plan onwards from now
+            deadline = self.scheduler.next_deadline = clock()
+            search = self.scheduler.next_deadline - search_started
+            if mover and arbiter is None and step.kind == "click_template":
+                path = mover.plan(cx + dx, cy + dy)
+                if path:
+                    self.scheduler.next_deadline += mover.duration(path)
+        x, y = cx + dx, cy + dy
+        if step.kind == "wait_template":
+            actual = clock()
+            hold = 0.0
+        elif arbiter is None:
+            if path and not self._move_along(path, deadline):
+                return self._take_skip()
+            actual = clock()
+            if self.adaptive:
+                # A pause moved the scheduler origin; time spent paused says nothing about readiness
+                self.adaptive.finish(actual, discard=self.scheduler.origin != self._watch_origin)
+            self.backend.click(x, y, hold)
+        else:
+            queued_at = clock()
+            with arbiter.hold(self.name):
+                lock = clock() - queued_at
+                if not self._focus_until(clock()):
+                    return False
+                focus = self._focus_seconds
+                path = mover.plan(x, y) if mover else None
+                if path and not self._move_along(path, clock()):
+                    return self._take_skip()
+                actual = clock()
+                if self.adaptive:
+                    self.adaptive.finish(actual, discard=self.scheduler.origin != self._watch_origin)
+                self.backend.click(x, y, hold)
+        if step.kind != "wait_template":
+            if mover:
+                mover.position = (x, y)
+            self.listener.on_click(step_index, x, y)
+        timing = self.scheduler.complete(step_index, actual, hold, delay)
+        self._last_slot, self._last_delay = slot, delay
+        self.listener.on_timing(timing)
+        if self.telemetry:
+            move = self._move_seconds
+            inject = clock() - actual
+            wait = actual - self._step_started - focus - lock - search - move
+            self.telemetry.record_step(self._repeat_index, step_index, (wait, focus, lock, search, move, inject),
+                                       timing.error)
+        return True
+
+    def _move_along(self, path, start: float) -> bool:
+        """Stream the cursor along `path` from `start`. False if stopped or skipped on the way."""
+        started = self.waiter.clock()
+        moved = self.mover.stream(self.backend, path, max(start, started),
+                                  lambda deadline: self._wait_until(deadline) and not self._skip_requested,
+                                  self.waiter.clock)
+        self._move_seconds = self.waiter.clock() - started
+        return moved
+
+    def wait_for_template(self, slot: int) -> Optional[Tuple[int, int]]:
+        """Poll until the slot's template shows up and return its screen centre.
+
+        Returns None if stopped or skipped, and raises TimeoutError once
+        `step.timeout` seconds of unpaused time pass without a match.
+        """
+        step = self.program.slots[slot]
+        region = self._search_region(step, self.program.slot_relative[slot])
+        clock = self.waiter.clock
+        # Measured from the scheduler origin, which pausing shifts forward
+        give_up = clock() - self.scheduler.origin + step.timeout
+        while True:
+            frame = self.capture.capture(slot, region)
+            # Unchanged pixels match the way they did last time, even on a previous pass
+            if frame.changed:
+                self._slot_matches[slot] = self._match(frame, step)
+            match = self._slot_matches[slot]
+            if match:
+                return region[0] + match.x, region[1] + match.y
+            if clock() - self.scheduler.origin >= give_up:
+                raise TimeoutError(f"{step.name}: {step.template} not found within {step.timeout}s")
+            if not self._wait_until(clock() + step.poll_interval) or self._skip_requested:
+                return None
+
+    def _match(self, frame: Frame, step: Step) -> Optional[Match]:
+        if self.matchers:
+            return self.matchers.submit(frame, step.template, step.threshold).result()
+        return match_template(frame.pixels, self.templates.get(step.template), step.threshold)
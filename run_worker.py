@@ -0,0 +1,184 @@
+from typing import Callable, List, Optional
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from adaptive import AdaptiveDelays
+from checkpoint import Checkpoint, CheckpointWriter
+from input_backend import InputBackend
+from models import Config, Step
+from multi_runner import MultiTargetRunner, RunTarget
+from run_engine import RunEngine, RunListener
+from scheduler import StepTiming
+from screen_capture import MatcherPool
+from simulator import simulate
+from telemetry import Telemetry
+from trajectories import TrajectoryMover
+
+
+class RunWorker(QThread, RunListener):
+    """Runs a RunEngine on its own thread and reports back through Qt signals."""
+
+    stepStarted = pyqtSignal(int, int, str)
+    progressChanged = pyqtSignal(int, int)
+    stepTiming = pyqtSignal(int, float)
+    clicked = pyqtSignal(int, int, int)  # step index, screen x, screen y
+    pausedChanged = pyqtSignal(bool)
+    reloaded = pyqtSignal(str)
+    errorOccurred = pyqtSignal(str)
+    runFinished = pyqtSignal(bool)
+
+    def __init__(self, config: Config, window, repeat: int, backend: InputBackend,
+                 telemetry: Optional[Telemetry] = None, configs: Optional[Callable[[str], Config]] = None,
+                 mover: Optional[TrajectoryMover] = None, checkpoint: Optional[CheckpointWriter] = None,
+                 resume: Optional[Checkpoint] = None, adaptive: Optional[AdaptiveDelays] = None,
+                 matchers: Optional[MatcherPool] = None, parent=None):
+        super().__init__(parent)
+        self.telemetry = telemetry
+        self.engine = RunEngine(config, window, repeat, backend, listener=self, telemetry=telemetry,
+                                configs=configs, mover=mover, checkpoint=checkpoint, resume=resume,
+                                adaptive=adaptive, matchers=matchers)
+
+    def run(self):
+        try:
+            self.engine.run()
+        finally:
+            if self.telemetry:
+                self.telemetry.close()
+
+    @property
+    def paused(self) -> bool:
+        return self.engine.paused
+
+    def stop(self):
+        self.engine.stop()
+
+    def pause(self):
+        self.engine.pause()
+
+    def resume(self):
+        self.engine.resume()
+
+    def skip_step(self):
+        self.engine.skip_step()
+
+    def reload(self, names) -> int:
+        """Rebuild the run's program if it uses any of the named configs; returns 1 if it did"""
+        if not self.engine.uses(names):
+            return 0
+        self.engine.reload()
+        return 1
+
+    def on_paused(self, paused: bool):
+        self.pausedChanged.emit(paused)
+
+    def on_reloaded(self, name: str):
+        self.reloaded.emit(name)
+
+    def on_step(self, repeat_index: int, step_index: int, step: Step):
+        self.stepStarted.emit(repeat_index, step_index, step.name)
+
+    def on_progress(self, done: int, total: int):
+        self.progressChanged.emit(done, total)
+
+    def on_timing(self, timing: StepTiming):
+        self.stepTiming.emit(timing.step_index, timing.error)
+
+    def on_click(self, step_index: int, x: int, y: int):
+        self.clicked.emit(step_index, x, y)
+
+    def on_error(self, message: str):
+        self.errorOccurred.emit(message)
+
+    def on_finished(self, stopped: bool):
+        self.runFinished.emit(stopped)
+
+
+class _TargetSignals(RunListener):
+    def __init__(self, worker: "MultiRunWorker", name: str):
+        self.worker = worker
+        self.name = name
+
+    def on_cycle(self, repeat_index: int, seconds: float):
+        self.worker.report_cycle(self.name, seconds)
+
+    def on_paused(self, paused: bool):
+        self.worker.pausedChanged.emit(paused)
+
+    def on_reloaded(self, name: str):
+        self.worker.reloaded.emit(f"{self.name}: {name}")
+
+    def on_error(self, message: str):
+        self.worker.errorOccurred.emit(f"{self.name}: {message}")
+
+
+class MultiRunWorker(QThread):
+    """Runs a MultiTargetRunner off the GUI thread."""
+
+    targetCycle = pyqtSignal(str, float, float)  # target, cycle seconds, share of time waiting for input
+    pausedChanged = pyqtSignal(bool)
+    reloaded = pyqtSignal(str)
+    errorOccurred = pyqtSignal(str)
+    runFinished = pyqtSignal(bool)
+
+    def __init__(self, targets: List[RunTarget], backend: InputBackend,
+                 configs: Optional[Callable[[str], Config]] = None, mover: Optional[TrajectoryMover] = None,
+                 matchers: Optional[MatcherPool] = None, parent=None):
+        super().__init__(parent)
+        self.runner = MultiTargetRunner(targets, backend,
+                                        listener_factory=lambda target: _TargetSignals(self, target.name),
+                                        configs=configs, mover=mover, matchers=matchers)
+
+    def run(self):
+        self.runner.run()
+        self.runFinished.emit(any(engine.stopped for engine in self.runner.engines))
+
+    @property
+    def paused(self) -> bool:
+        return self.runner.paused
+
+    def stop(self):
+        self.runner.stop()
+
+    def pause(self):
+        self.runner.pause()
+
+    def resume(self):
+        self.runner.resume()
+
+    def skip_step(self):
+        self.runner.skip_step()
+
+    def reload(self, names) -> int:
+        return self.runner.reload(names)
+
+    def report_cycle(self, name: str, seconds: float):
+        for stats in self.runner.stats():
+            if stats.name == name:
+                self.targetCycle.emit(name, seconds, stats.lock_wait_share)
+
+
+class SimulationWorker(QThread):
+    """Runs a simulation off the GUI thread; it can take a few seconds for long configs."""
+
+    simulated = pyqtSignal(object)  # SimulationReport
+    failed = pyqtSignal(str)
+
+    def __init__(self, config: Config, repeat: int, configs: Optional[Callable[[str], Config]] = None,
+                 window=None, paths: bool = False, parent=None):
+        super().__init__(parent)
+        self.config = config.snapshot()
+        self.repeat = repeat
+        self.configs = configs
+        self.window = window
+        self.paths = paths
+        self._stopped = False
+
+    def run(self):
+        try:
+            self.simulated.emit(simulate(self.config, self.repeat, self.configs, self.window, paths=self.paths,
+                                         cancelled=lambda: self._stopped))
+        except ValueError as e:
+            self.failed.emit(str(e))
+
+    def stop(self):
+        self._stopped = True
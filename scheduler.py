@@ -0,0 +1,134 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+
+@dataclass
+class StepTiming:
+    step_index: int
+    planned: float
+    actual: float
+
+    @property
+    def error(self) -> float:
+        """Seconds the click landed after (positive) or before its deadline"""
+        return self.actual - self.planned
+
+
+class PrecisionWaiter:
+    """Hybrid waiter: OS sleep until `spin_threshold` before the deadline, then spin.
+
+    OS sleeps overshoot by anything from ~0.1 ms (Linux) to a full timer tick
+    (~15.6 ms on Windows), so the coarse phase stops early by at least the
+    worst overshoot seen during `calibrate` and the remainder is spent
+    polling the clock.
+    """
+
+    def __init__(self, spin_threshold: float = 0.002, clock: Callable[[], float] = time.perf_counter):
+        self.spin_threshold = spin_threshold
+        self.clock = clock
+        self.accuracy: Optional[float] = None
+
+    def coarse_remaining(self, deadline: float) -> float:
+        """Seconds that can safely be slept before spinning must start"""
+        return deadline - self.clock() - self.spin_threshold
+
+    def spin_until(self, deadline: float, cancelled: Callable[[], bool] = None) -> bool:
+        clock = self.clock
+        while clock() < deadline:
+            if cancelled is not None and cancelled():
+                return False
+            time.sleep(0)
+        return True
+
+    def wait_until(self, deadline: float, cancelled: Callable[[], bool] = None) -> bool:
+        remaining = self.coarse_remaining(deadline)
+        if remaining > 0:
+            time.sleep(remaining)
+        return self.spin_until(deadline, cancelled)
+
+    def sleep(self, seconds: float) -> bool:
+        return self.wait_until(self.clock() + seconds)
+
+    def calibrate(self, target: float = 0.002, samples: int = 25) -> float:
+        """Size the spin window from measured sleep overshoot.
+
+        Overshoot is measured on both coarse sleeps the spin window has to
+        cover: time.sleep, which wait_until uses, and the timed lock wait
+        behind Condition.wait, which the run engine uses. Returns the worst
+        wait error observed afterwards; callers can compare it against
+        `target` to decide whether the machine can hold the budget.
+        """
+        worst = max(self._overshoot(time.sleep, samples), self._overshoot(threading.Event().wait, samples))
+        self.spin_threshold = min(max(worst + target / 2, target), 0.025)
+
+        errors = []
+        for _ in range(samples):
+            deadline = self.clock() + target * 2
+            self.wait_until(deadline)
+            errors.append(abs(self.clock() - deadline))
+        self.accuracy = max(errors)
+        return self.accuracy
+
+    def _overshoot(self, sleep: Callable[[float], object], samples: int) -> float:
+        """95th percentile of how late `sleep(0.001)` returns"""
+        overshoots = []
+        for _ in range(samples):
+            start = self.clock()
+            sleep(0.001)
+            overshoots.append(self.clock() - start - 0.001)
+        overshoots.sort()
+        return overshoots[int(0.95 * (len(overshoots) - 1))]
+
+
+class DeadlineScheduler:
+    """Plans absolute click deadlines on the waiter's clock.
+
+    Deadlines advance by each step's hold + delay from the previous
+    deadline, so time spent focusing the window or injecting input is
+    absorbed by the next wait rather than added to it. A click that lands
+    more than `max_lag` late re-bases the plan on the actual click time so a
+    stall never makes the following delays shorter than configured.
+
+    The first click lands `lead_in` seconds after `start()`, by default the
+    focus settle time.
+    """
+
+    def __init__(self, clock: Callable[[], float], focus_settle: float = 1.0,
+                 cycle_gap: float = 1.0, max_lag: float = 0.05, lead_in: Optional[float] = None):
+        self.clock = clock
+        self.focus_settle = focus_settle
+        self.cycle_gap = cycle_gap
+        self.max_lag = max_lag
+        self.lead_in = focus_settle if lead_in is None else lead_in
+        self.origin = 0.0
+        self.next_deadline = 0.0
+
+    def start(self):
+        self.origin = self.clock()
+        self.next_deadline = self.origin + self.lead_in
+
+    def shift(self, seconds: float):
+        """Push the whole plan back, e.g. by time spent paused"""
+        self.origin += seconds
+        self.next_deadline += seconds
+
+    def activation_deadline(self) -> float:
+        return self.next_deadline - self.focus_settle
+
+    def complete(self, step_index: int, actual: float, hold: float, delay: float) -> StepTiming:
+        timing = StepTiming(step_index, self.next_deadline - self.origin, actual - self.origin)
+        base = self.next_deadline if timing.error <= self.max_lag else actual
+        self.next_deadline = base + hold + delay
+        return timing
+
+    def end_cycle(self):
+        self.next_deadline += self.cycle_gap
+
+
+_default_waiter = PrecisionWaiter()
+
+
+def precise_sleep(seconds: float):
+    _default_waiter.sleep(seconds)
@@ -0,0 +1,234 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from template_match import Match, TemplateCache, match_template, to_gray
+
+Region = Tuple[int, int, int, int]
+
+
+class CaptureSource:
+    """Produces pixels for a screen region. Subclasses implement grab()."""
+
+    def grab(self, region: Region) -> np.ndarray:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class ScreenSource(CaptureSource):
+    """Real screenshots of just the requested region, via pyautogui."""
+
+    def grab(self, region: Region) -> np.ndarray:
+        import pyautogui
+        return np.asarray(pyautogui.screenshot(region=tuple(region)))
+
+
+class SyntheticSource(CaptureSource):
+    """Crops regions out of in-memory frames for headless runs.
+
+    `frames` is either a callable returning the current full frame, or a
+    stack of frames (T x H x W[ x C]). A stack advances one frame per grab,
+    or plays back at `fps` against `clock` when a rate is given.
+    """
+
+    def __init__(self, frames: Union[Callable[[], np.ndarray], Sequence[np.ndarray]],
+                 fps: Optional[float] = None, clock: Callable[[], float] = time.perf_counter):
+        self.frames = frames
+        self.fps = fps
+        self.clock = clock
+        self._start = clock()
+        self._index = 0
+
+    def current(self) -> np.ndarray:
+        if callable(self.frames):
+            return self.frames()
+        if self.fps:
+            index = int((self.clock() - self._start) * self.fps)
+        else:
+            index = self._index
+            self._index += 1
+        return self.frames[index % len(self.frames)]
+
+    def grab(self, region: Region) -> np.ndarray:
+        x, y, w, h = region
+        return self.current()[y:y + h, x:x + w]
+
+
+class FileSource(SyntheticSource):
+    """Plays back a frame stack saved with np.save / np.savez (key "frames")."""
+
+    def __init__(self, path: str, fps: Optional[float] = None, clock: Callable[[], float] = time.perf_counter):
+        data = np.load(path)
+        if not isinstance(data, np.ndarray):
+            data = data["frames"]
+        super().__init__(data, fps, clock)
+
+
+class FrameRef(NamedTuple):
+    """Picklable pointer to one slot of a FrameRing's shared memory"""
+    shm_name: str
+    slots: int
+    height: int
+    width: int
+    slot: int
+
+
+class Frame(NamedTuple):
+    key: object
+    region: Region
+    seq: int
+    digest: bytes
+    changed: bool  # False when the pixels hash the same as this key's previous capture
+    pixels: np.ndarray  # view into shared memory, valid until the ring wraps around
+    ref: FrameRef
+
+
+class FrameRing:
+    """Fixed-size ring of grayscale frames in one shared memory block.
+
+    Captures are written into the slot after the one readers were last
+    given, so with the default three slots a published frame stays intact
+    while the next two are being captured.
+    """
+
+    def __init__(self, height: int, width: int, slots: int = 3):
+        self.height = height
+        self.width = width
+        self.slots = slots
+        from multiprocessing import shared_memory  # only needed once a vision step captures
+        self.shm = shared_memory.SharedMemory(create=True, size=max(slots * height * width, 1))
+        self.buffers = np.ndarray((slots, height, width), dtype=np.uint8, buffer=self.shm.buf)
+        self.seq = 0
+        self.last_digest: Optional[bytes] = None
+
+    def write(self, key, region: Region, pixels: np.ndarray) -> Frame:
+        slot = self.seq % self.slots
+        buffer = self.buffers[slot]
+        np.copyto(buffer, pixels, casting="unsafe")
+        digest = hashlib.blake2b(buffer.data, digest_size=16).digest()
+        changed = digest != self.last_digest
+        self.last_digest = digest
+        self.seq += 1
+        ref = FrameRef(self.shm.name, self.slots, self.height, self.width, slot)
+        return Frame(key, region, self.seq, digest, changed, buffer, ref)
+
+    def close(self):
+        self.buffers = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # a caller still holds a Frame view; the mapping goes when it does
+        self.shm.unlink()
+
+
+class CapturePipeline:
+    """Region-limited capture with per-key change detection.
+
+    Each caller key (the engine uses the step index) gets its own FrameRing
+    sized to its region, so only the pixels active steps ask for are
+    grabbed, and `Frame.changed` tells the caller whether they differ from
+    that key's previous capture.
+    """
+
+    def __init__(self, source: CaptureSource, slots: int = 3):
+        self.source = source
+        self.slots = slots
+        self._rings: Dict[object, FrameRing] = {}
+        self._lock = threading.Lock()
+
+    def capture(self, key, region: Region) -> Frame:
+        pixels = self.source.grab(region)
+        if pixels.ndim == 3 or pixels.dtype != np.uint8:
+            pixels = np.clip(to_gray(pixels), 0, 255)
+        height, width = pixels.shape
+        with self._lock:
+            ring = self._rings.get(key)
+            if ring is None or (ring.height, ring.width) != (height, width):
+                if ring is not None:
+                    ring.close()
+                ring = self._rings[key] = FrameRing(height, width, self.slots)
+            return ring.write(key, tuple(region), pixels)
+
+    def invalidate(self):
+        """Report the next capture of every key as changed, e.g. once keys mean different steps"""
+        with self._lock:
+            for ring in self._rings.values():
+                ring.last_digest = None
+
+    def close(self):
+        with self._lock:
+            for ring in self._rings.values():
+                ring.close()
+            self._rings.clear()
+        self.source.close()
+
+
+# Per-worker-process state for MatcherPool. Rings are replaced whenever a
+# run ends or a region changes size, and a worker can't tell when that
+# happens, so it keeps only the segments it used most recently mapped.
+# An evicted ring that is still live just gets attached again
+WORKER_SEGMENTS = 16
+_worker_templates = TemplateCache()
+_worker_segments: "OrderedDict[str, object]" = OrderedDict()  # shm name -> SharedMemory, oldest first
+
+
+def _attach_segment(name: str):
+    shm = _worker_segments.get(name)
+    if shm is not None:
+        _worker_segments.move_to_end(name)
+        return shm
+    from multiprocessing import shared_memory
+    # Pool workers share the parent's resource tracker, so attaching here
+    # doesn't make them responsible for unlinking the segment
+    shm = _worker_segments[name] = shared_memory.SharedMemory(name=name)
+    while len(_worker_segments) > WORKER_SEGMENTS:
+        _, oldest = _worker_segments.popitem(last=False)
+        oldest.close()
+    return shm
+
+
+def _worker_segment_count() -> int:
+    return len(_worker_segments)
+
+
+def _match_shared(ref: FrameRef, template_path: str, threshold: float) -> Optional[Match]:
+    shm = _attach_segment(ref.shm_name)
+    frames = np.ndarray((ref.slots, ref.height, ref.width), dtype=np.uint8, buffer=shm.buf)
+    return match_template(frames[ref.slot], _worker_templates.get(template_path), threshold)
+
+
+class MatcherPool:
+    """Process pool that matches templates against frames in shared memory.
+
+    Only the FrameRef crosses the process boundary; workers map the ring
+    themselves. Templates are loaded from disk in each worker, so in-memory
+    templates registered with TemplateCache.put() can't be used here.
+    Workers start with the first match, so runners can hand a pool to
+    every engine and configs without vision steps never pay for it.
+    """
+
+    def __init__(self, processes: Optional[int] = None):
+        self.processes = processes
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def submit(self, frame: Frame, template_path: str, threshold: float) -> Future:
+        with self._lock:
+            if self._executor is None:
+                from concurrent.futures import ProcessPoolExecutor
+                self._executor = ProcessPoolExecutor(self.processes)
+            executor = self._executor
+        return executor.submit(_match_shared, frame.ref, template_path, threshold)
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown()
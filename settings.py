@@ -0,0 +1,42 @@
+import json
+import os
+
+SETTINGS_FILE = "settings.json"
+
+DEFAULT_SETTINGS = {
+    "hotkeys": {
+        "stop": ["q", "esc"],
+        "pause": ["f7"],
+        "resume": ["f8"],
+        "skip_step": ["f9"],
+    },
+    # JSON Lines file that run telemetry is appended to; empty to turn tracing off
+    "trace_file": "",
+    # Move the cursor to each click along a human-like path instead of jumping
+    "human_paths": False,
+    # Fit delays to when each click target is seen to be ready, within each step's safety bounds
+    "adaptive_delays": False,
+    # Where run progress is checkpointed, one file per config, for "Resume"; empty to turn it off
+    "checkpoint_dir": "checkpoints",
+    # Trace Python allocations so the health panel can name what grew; slows the whole app down
+    "trace_allocations": False,
+}
+
+
+def load_settings(path: str = SETTINGS_FILE) -> dict:
+    """Read user settings, filling anything missing from DEFAULT_SETTINGS"""
+    settings = json.loads(json.dumps(DEFAULT_SETTINGS))
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            data = json.load(f)
+        for key, value in data.items():
+            if isinstance(value, dict) and isinstance(settings.get(key), dict):
+                settings[key].update(value)
+            else:
+                settings[key] = value
+    return settings
+
+
+def save_settings(settings: dict, path: str = SETTINGS_FILE):
+    with open(path, "w") as f:
+        json.dump(settings, f, indent=2)
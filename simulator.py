@@ -0,0 +1,287 @@
+"""Dry-run configs on a virtual clock to check them without a game client.
+
+The real RunEngine, scheduler and jitter run unchanged; only time, the
+window and the mouse are fake. Every wait moves a VirtualClock straight to
+its deadline, so thousands of passes with multi-second delays finish in
+seconds. Vision steps are assumed to find their template at once, in the
+middle of their search region.
+"""
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from input_backend import InputBackend
+from models import Config, Step
+from run_engine import RunEngine, RunListener
+from scheduler import DeadlineScheduler, PrecisionWaiter
+from screen_capture import CaptureSource, CapturePipeline, Frame, Region
+from template_match import Match
+from trajectories import TrajectoryCache, TrajectoryMover
+
+SIMULATED_REPEATS = 1000  # passes simulated when no repeat count is given
+MAX_SIMULATED_STEPS = 2_000_000  # a pass that never ends is cut off here
+REPORTED_OVERLAPS = 20  # overlapping pairs listed by format_report; the rest are only counted
+
+
+class VirtualClock:
+    """Seconds that only pass when something waits on them"""
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        if seconds > 0:
+            self.now += seconds
+
+    def advance_to(self, deadline: float):
+        if deadline > self.now:
+            self.now = deadline
+
+
+class VirtualWaiter(PrecisionWaiter):
+    """Waits by moving a VirtualClock to the deadline, so nothing is left to sleep or spin"""
+
+    def __init__(self, clock: VirtualClock):
+        super().__init__(spin_threshold=0.0, clock=clock)
+        self.accuracy = 0.0
+
+    def coarse_remaining(self, deadline: float) -> float:
+        self.clock.advance_to(deadline)
+        return 0.0
+
+    def spin_until(self, deadline: float, cancelled: Callable[[], bool] = None) -> bool:
+        self.clock.advance_to(deadline)
+        return True
+
+    def calibrate(self, target: float = 0.002, samples: int = 25) -> float:
+        return 0.0
+
+
+class SimulatedWindow:
+    """Always-focused window of a given geometry"""
+    isActive = True
+
+    def __init__(self, left: int = 0, top: int = 0, width: int = 1920, height: int = 1080):
+        self.left, self.top, self.width, self.height = left, top, width, height
+
+    def activate(self):
+        pass
+
+
+class _SimulatedInput(InputBackend):
+    """Holds buttons down on the virtual clock and sends nothing"""
+
+    def move(self, x: int, y: int):
+        pass
+
+    def press(self):
+        pass
+
+    def release(self):
+        pass
+
+
+class _BlankScreen(CaptureSource):
+    """Black pixels for any region, including ones on monitors left of or above the primary"""
+
+    def __init__(self):
+        self._blanks: Dict[Tuple[int, int], np.ndarray] = {}
+
+    def grab(self, region: Region) -> np.ndarray:
+        x, y, w, h = region
+        blank = self._blanks.get((h, w))
+        if blank is None:
+            blank = self._blanks[(h, w)] = np.zeros((h, w), dtype=np.uint8)
+        return blank
+
+
+class _SimulatedEngine(RunEngine):
+    def wait_for_template(self, slot: int) -> Optional[Tuple[int, int]]:
+        x, y, w, h = self._search_region(self.program.slots[slot], self.program.slot_relative[slot])
+        return x + w // 2, y + h // 2
+
+    def _match(self, frame: Frame, step: Step) -> Optional[Match]:
+        x, y, w, h = frame.region
+        return Match(w // 2, h // 2, 1.0)
+
+
+class _SimulationListener(RunListener):
+    def __init__(self, max_steps: int, cancelled: Callable[[], bool]):
+        self.engine: Optional[RunEngine] = None
+        self.max_steps = max_steps
+        self.cancelled = cancelled
+        self.steps = 0
+        self.cycles: List[float] = []
+        self.clicks: Dict[int, Tuple[List[int], List[int]]] = {}
+        self.error: Optional[str] = None
+
+    def on_progress(self, done: int, total: int):
+        self.steps = done
+        if done >= self.max_steps or self.cancelled():
+            self.engine.stop()
+
+    def on_click(self, step_index: int, x: int, y: int):
+        xs, ys = self.clicks.setdefault(step_index, ([], []))
+        xs.append(x)
+        ys.append(y)
+
+    def on_cycle(self, repeat_index: int, seconds: float):
+        self.cycles.append(seconds)
+
+    def on_error(self, message: str):
+        self.error = message
+
+
+class ClickSpread(NamedTuple):
+    step_index: int
+    name: str
+    clicks: int
+    mean_x: float
+    mean_y: float
+    std_x: float
+    std_y: float
+    outside: int  # clicks that landed outside the window
+
+
+class Overlap(NamedTuple):
+    first: int  # step indexes
+    second: int
+    distance: float  # between the circle centres
+    reach: float  # sum of the radii
+
+
+class SimulationReport(NamedTuple):
+    config: str
+    repeats: int  # passes completed
+    steps: int  # steps run
+    simulated_seconds: float
+    wall_seconds: float
+    cycle_mean: float
+    cycle_p50: float
+    cycle_p95: float
+    spreads: List[ClickSpread]
+    overlaps: List[Overlap]
+    outside: List[int]  # click steps whose circle crosses the window edge
+    truncated: bool  # cut off at max_steps, e.g. a loop that never ends
+    error: Optional[str]
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and not self.outside and not self.truncated
+
+
+def _click_circles(config: Config, window) -> Tuple[List[int], np.ndarray]:
+    """Indexes and absolute (x, y, radius) of the config's own click steps"""
+    indexes = [i for i, step in enumerate(config.steps) if step.kind == "click"]
+    circles = np.array([(*config.resolve(config.steps[i], window.left, window.top), config.steps[i].radius)
+                        for i in indexes], dtype=np.float64).reshape(-1, 3)
+    return indexes, circles
+
+
+def find_overlaps(config: Config, window) -> List[Overlap]:
+    """Pairs of click steps whose circles intersect, found with a sweep along x"""
+    indexes, circles = _click_circles(config, window)
+    order = np.argsort(circles[:, 0], kind="stable")
+    xs, ys, radii = circles[order, 0], circles[order, 1], circles[order, 2]
+    widest = radii.max() if len(radii) else 0.0
+    overlaps = []
+    for a in range(len(order)):
+        b = a + 1
+        while b < len(order) and xs[b] - xs[a] <= radii[a] + widest:
+            distance = float(np.hypot(xs[b] - xs[a], ys[b] - ys[a]))
+            reach = float(radii[a] + radii[b])
+            if distance < reach:
+                first, second = sorted((indexes[order[a]], indexes[order[b]]))
+                overlaps.append(Overlap(first, second, distance, reach))
+            b += 1
+    overlaps.sort()
+    return overlaps
+
+
+def find_outside(config: Config, window) -> List[int]:
+    """Click steps whose circle reaches past the window edges"""
+    indexes, circles = _click_circles(config, window)
+    xs, ys, radii = circles[:, 0], circles[:, 1], circles[:, 2]
+    outside = ((xs - radii < window.left) | (xs + radii >= window.left + window.width)
+               | (ys - radii < window.top) | (ys + radii >= window.top + window.height))
+    return [indexes[i] for i in np.flatnonzero(outside)]
+
+
+def simulated_engine(config: Config, repeat: int, listener: Optional[RunListener] = None,
+                     configs: Optional[Callable[[str], Config]] = None, window=None, seed: Optional[int] = None,
+                     paths: bool = False, **options) -> RunEngine:
+    """A RunEngine on its own VirtualClock (`engine.waiter.clock`) with a fake window, mouse and screen.
+
+    `options` go to RunEngine as they are, e.g. telemetry or checkpoint.
+    """
+    # Only the geometry of a real window is used; it is never activated or clicked
+    window = SimulatedWindow(window.left, window.top, window.width, window.height) if window else SimulatedWindow()
+    clock = VirtualClock()
+    mover = TrajectoryMover(TrajectoryCache(seed=seed)) if paths else None
+    return _SimulatedEngine(config, window, repeat, _SimulatedInput(sleep=clock.advance), listener,
+                            waiter=VirtualWaiter(clock), scheduler=DeadlineScheduler(clock), seed=seed,
+                            capture=CapturePipeline(_BlankScreen()), owns_capture=True,
+                            configs=configs, mover=mover, **options)
+
+
+def simulate(config: Config, repeat: int = SIMULATED_REPEATS, configs: Optional[Callable[[str], Config]] = None,
+             window=None, seed: Optional[int] = None, paths: bool = False,
+             max_steps: int = MAX_SIMULATED_STEPS, cancelled: Callable[[], bool] = lambda: False) -> SimulationReport:
+    """Run `config` `repeat` times on a virtual clock and summarize what would happen.
+
+    `cancelled` is polled after every step; once it returns True the
+    simulation ends early and reports what ran so far. Raises
+    ProgramError (a ValueError) if the config doesn't compile.
+    """
+    if repeat < 1:
+        raise ValueError("a simulation needs a number of repeats")
+    listener = _SimulationListener(max_steps, cancelled)
+    engine = simulated_engine(config, repeat, listener, configs, window, seed, paths)
+    window = engine.target.window
+    listener.engine = engine
+    started = time.perf_counter()
+    engine.run()
+    wall = time.perf_counter() - started
+
+    cycles = np.array(listener.cycles)
+    mean, p50, p95 = (float(cycles.mean()), *np.percentile(cycles, (50, 95)).tolist()) if len(cycles) else (0, 0, 0)
+    right, bottom = window.left + window.width, window.top + window.height
+    spreads = []
+    for step_index in sorted(listener.clicks):
+        xs, ys = (np.array(values) for values in listener.clicks[step_index])
+        outside = np.count_nonzero((xs < window.left) | (xs >= right) | (ys < window.top) | (ys >= bottom))
+        spreads.append(ClickSpread(step_index, config.steps[step_index].name, len(xs), float(xs.mean()),
+                                   float(ys.mean()), float(xs.std()), float(ys.std()), int(outside)))
+    return SimulationReport(config.name, len(cycles), listener.steps, engine.waiter.clock.now, wall, mean, p50, p95, spreads,
+                            find_overlaps(config, window), find_outside(config, window),
+                            listener.steps >= max_steps, listener.error)
+
+
+def format_report(report: SimulationReport) -> str:
+    lines = [f"Simulated {report.repeats} passes of '{report.config}' ({report.steps} steps, "
+             f"{report.simulated_seconds / 3600:.1f} h of run time) in {report.wall_seconds:.2f} s"]
+    if report.error:
+        lines.append(f"Run failed: {report.error}")
+    if report.truncated:
+        lines.append(f"Stopped after {report.steps} steps: a pass never ends")
+    if report.repeats:
+        lines.append(f"Cycle time: mean {report.cycle_mean:.2f} s, p50 {report.cycle_p50:.2f} s, "
+                     f"p95 {report.cycle_p95:.2f} s")
+    for spread in report.spreads:
+        line = (f"Step {spread.step_index + 1} {spread.name}: {spread.clicks} clicks around "
+                f"({spread.mean_x:.0f}, {spread.mean_y:.0f}), spread {spread.std_x:.1f} x {spread.std_y:.1f} px")
+        if spread.outside:
+            line += f", {spread.outside} outside the window"
+        lines.append(line)
+    for overlap in report.overlaps[:REPORTED_OVERLAPS]:
+        lines.append(f"Steps {overlap.first + 1} and {overlap.second + 1} overlap: centres "
+                     f"{overlap.distance:.0f} px apart, radii add up to {overlap.reach:.0f} px")
+    if len(report.overlaps) > REPORTED_OVERLAPS:
+        lines.append(f"...and {len(report.overlaps) - REPORTED_OVERLAPS} more overlapping pairs")
+    if report.outside:
+        lines.append("Outside the window: " + ", ".join(f"step {i + 1}" for i in report.outside))
+    return "\n".join(lines)
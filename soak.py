@@ -0,0 +1,198 @@
+"""Soak test: run a config for many cycles on fake backends and fail if resources keep growing.
+
+    python -m soak "My Config" --cycles 100000 --runs 50
+    python -m soak --cycles 20000        # a built-in ten-step config
+
+Every run is started the way the GUI starts one: on a new thread, with
+its own Telemetry and checkpoint writer. So leaks that happen once per
+run show up as well as ones that happen once per cycle. Runs use the
+simulator's virtual clock, which makes days of clicking take minutes.
+Resources are sampled every `sample_every` cycles. The first sample,
+taken once caches have warmed up, is the baseline that growth is
+measured against.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, List, NamedTuple, Optional
+
+from checkpoint import CheckpointWriter
+from config_store import open_store
+from health import GrowthLimits, ResourceGrowth, ResourceMonitor, ResourceSample, check_growth
+from models import Config, Step
+from run_engine import RunEngine, RunListener
+from simulator import simulated_engine
+from telemetry import Telemetry
+
+SOAK_CYCLES = 10_000
+SOAK_RUNS = 10
+SAMPLE_EVERY = 500  # cycles between resource samples
+
+
+class SoakReport(NamedTuple):
+    config: str
+    cycles: int  # completed across all runs
+    runs: int  # started
+    samples: List[ResourceSample]
+    failures: List[str]  # growth over the limits, or why the soak stopped
+    top_growth: List[str]  # allocation sites that grew most, when tracing Python allocations
+    wall_seconds: float
+
+    @property
+    def ok(self) -> bool:
+        return not self.failures
+
+
+class _SoakListener(RunListener):
+    """Counts cycles over every run and samples resources on the engine thread"""
+
+    def __init__(self, monitor: ResourceMonitor, sample_every: int, limits: GrowthLimits,
+                 on_sample: Optional[Callable[[ResourceSample, ResourceGrowth], None]]):
+        self.monitor = monitor
+        self.sample_every = sample_every
+        self.limits = limits
+        self.on_sample = on_sample
+        self.engine: Optional[RunEngine] = None
+        self.cycles = 0
+        self.samples: List[ResourceSample] = []
+        self.failures: List[str] = []
+
+    def on_cycle(self, repeat_index: int, seconds: float):
+        self.cycles += 1
+        if self.cycles % self.sample_every == 0:
+            self.check()
+
+    def check(self):
+        sample = self.monitor.sample(self.cycles)
+        self.samples.append(sample)
+        if self.monitor.baseline is None:
+            self.monitor.set_baseline(sample)
+        growth = self.monitor.growth(sample)
+        if self.on_sample:
+            self.on_sample(sample, growth)
+        failures = check_growth(growth, self.limits)
+        if failures:
+            self.failures = [f"after {self.cycles} cycles: {failure}" for failure in failures]
+            self.engine.stop()
+
+    def on_error(self, message: str):
+        self.failures.append(f"run failed: {message}")
+
+
+def soak(config: Config, cycles: int = SOAK_CYCLES, runs: int = SOAK_RUNS, sample_every: int = SAMPLE_EVERY,
+         limits: GrowthLimits = GrowthLimits(), configs: Optional[Callable[[str], Config]] = None,
+         seed: Optional[int] = None, paths: bool = False, trace_python: bool = True,
+         on_sample: Optional[Callable[[ResourceSample, ResourceGrowth], None]] = None) -> SoakReport:
+    """Run `config` for `cycles` cycles split over `runs` runs, stopping at the first growth past `limits`.
+
+    Raises ProgramError (a ValueError) if the config doesn't compile.
+    """
+    if cycles < 1 or runs < 1 or sample_every < 1:
+        raise ValueError("cycles, runs and sample_every must be positive")
+    monitor = ResourceMonitor(trace_python)
+    listener = _SoakListener(monitor, sample_every, limits, on_sample)
+    started = time.perf_counter()
+    run = 0
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint = os.path.join(directory, "checkpoint.json")
+            while listener.cycles < cycles and not listener.failures:
+                repeat = min(-(-cycles // runs), cycles - listener.cycles)
+                telemetry = Telemetry(len(config.steps))
+                engine = simulated_engine(config, repeat, listener, configs, seed=None if seed is None else seed + run,
+                                          paths=paths, telemetry=telemetry, checkpoint=CheckpointWriter(checkpoint))
+                listener.engine = engine
+                thread = threading.Thread(target=engine.run, name=f"soak-run-{run}")
+                thread.start()
+                thread.join()
+                telemetry.close()
+                run += 1
+                if engine.stopped and not listener.failures:
+                    break
+            if not listener.failures and (not listener.samples or listener.samples[-1].cycles != listener.cycles):
+                listener.check()
+        top = monitor.top_growth()
+    finally:
+        monitor.close()
+    return SoakReport(config.name, listener.cycles, run, listener.samples, listener.failures, top,
+                      time.perf_counter() - started)
+
+
+def builtin_config(steps: int = 10) -> Config:
+    config = Config("soak")
+    config.steps = [Step(100 + 40 * i, 200, 10, 2.0, 4.0, name=f"Step {i + 1}") for i in range(steps)]
+    return config
+
+
+def _megabytes(value: Optional[int]) -> str:
+    return "n/a" if value is None else f"{value / 2 ** 20:.1f} MB"
+
+
+def format_sample(sample: ResourceSample, growth: ResourceGrowth) -> str:
+    line = (f"{sample.cycles} cycles: RSS {_megabytes(sample.rss)} ({_megabytes(growth.rss)} growth), "
+            f"{sample.threads} threads ({growth.threads:+d})")
+    if sample.python_heap is not None:
+        line += f", Python heap {_megabytes(sample.python_heap)} ({_megabytes(growth.python_heap)} growth)"
+    if sample.qt_objects is not None:
+        line += f", {sample.qt_objects} Qt widgets ({growth.qt_objects:+d})"
+    return line
+
+
+def build_parser() -> argparse.ArgumentParser:
+    limits = GrowthLimits()
+    parser = argparse.ArgumentParser(prog="python -m soak",
+                                     description="Run a config for many cycles on fake backends and watch for leaks.")
+    parser.add_argument("config", nargs="?", help="config to run (default: a built-in ten-step config)")
+    parser.add_argument("--config-file", default="configs.json", help="configs.json or a .db store")
+    parser.add_argument("--cycles", type=int, default=SOAK_CYCLES, help="cycles to run in total")
+    parser.add_argument("--runs", type=int, default=SOAK_RUNS, help="runs to split the cycles over")
+    parser.add_argument("--sample-every", type=int, default=SAMPLE_EVERY, help="cycles between resource samples")
+    parser.add_argument("--max-rss-mb", type=float, default=limits.rss_mb, help="allowed RSS growth")
+    parser.add_argument("--max-python-mb", type=float, default=limits.python_mb,
+                        help="allowed growth of traced Python allocations")
+    parser.add_argument("--max-threads", type=int, default=limits.threads, help="allowed extra threads")
+    parser.add_argument("--no-tracemalloc", action="store_true",
+                        help="don't trace Python allocations (faster, but no heap numbers or top allocators)")
+    parser.add_argument("--paths", action="store_true", help="move the cursor along human-like paths")
+    parser.add_argument("--seed", type=int, help="seed for click jitter")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    configs = None
+    if args.config:
+        try:
+            store = open_store(args.config_file)
+            config = store.get(args.config)
+        except KeyError:
+            print(f"No config named '{args.config}'", file=sys.stderr)
+            return 2
+        except (OSError, ValueError) as e:
+            print(f"Could not load '{args.config}': {e}", file=sys.stderr)
+            return 2
+        configs = store.get
+    else:
+        config = builtin_config()
+    limits = GrowthLimits(args.max_rss_mb, args.max_python_mb, args.max_threads)
+    try:
+        report = soak(config, args.cycles, args.runs, args.sample_every, limits, configs, args.seed, args.paths,
+                      not args.no_tracemalloc, lambda sample, growth: print(format_sample(sample, growth), flush=True))
+    except ValueError as e:
+        print(f"Invalid config: {e}", file=sys.stderr)
+        return 2
+    print(f"{report.cycles} cycles of '{report.config}' over {report.runs} runs in {report.wall_seconds:.1f} s")
+    if report.top_growth:
+        print("Largest allocation growth since the baseline:")
+        for line in report.top_growth:
+            print(f"  {line}")
+    for failure in report.failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 0 if report.ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
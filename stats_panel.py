@@ -0,0 +1,118 @@
+from typing import Dict, Optional
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QTableView, QHeaderView
+from telemetry import PHASES, StepStats, Telemetry
+
+REFRESH_MS = 500
+
+
+class StepStatsModel(QAbstractTableModel):
+    """Per-step telemetry, fetched only for the rows a view asks for."""
+
+    COLUMNS = ("Step", "Runs", "p50", "p95", "Max") + tuple(phase.title() for phase in PHASES) + ("Error p95",)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.telemetry: Optional[Telemetry] = None
+        self._rows = 0
+        self._cache: Dict[int, StepStats] = {}
+
+    def set_telemetry(self, telemetry: Optional[Telemetry]):
+        self.beginResetModel()
+        self.telemetry = telemetry
+        self._rows = telemetry.step_count() if telemetry else 0
+        self._cache = {}
+        self.endResetModel()
+
+    def refresh(self):
+        if not self.telemetry:
+            return
+        self._cache = {}
+        rows = self.telemetry.step_count()
+        if rows > self._rows:
+            self.beginInsertRows(QModelIndex(), self._rows, rows - 1)
+            self._rows = rows
+            self.endInsertRows()
+        if rows:
+            self.dataChanged.emit(self.index(0, 1), self.index(rows - 1, len(self.COLUMNS) - 1))
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._rows
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.TextAlignmentRole):
+            return None
+        if role == Qt.TextAlignmentRole:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        row, column = index.row(), index.column()
+        if column == 0:
+            return str(row + 1)
+        stats = self._cache.get(row)
+        if stats is None:
+            stats = self._cache[row] = self.telemetry.step_stats(row)
+        if column == 1:
+            return str(stats.count)
+        if column == len(self.COLUMNS) - 1:
+            seconds = stats.error_p95
+        elif column < 5:
+            seconds = (stats.p50, stats.p95, stats.max)[column - 2]
+        else:
+            seconds = stats.phase_means[PHASES[column - 5]]
+        return f"{seconds * 1000:.1f} ms"
+
+
+class StatsPanel(QWidget):
+    """Cycle-time percentiles and per-step timings for the current run.
+
+    Polls its Telemetry every REFRESH_MS while `start()`ed; stopping keeps
+    the final numbers on screen.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.cycle_label = QLabel("No run yet")
+        layout.addWidget(self.cycle_label)
+
+        self.model = StepStatsModel(self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.verticalHeader().hide()
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        layout.addWidget(self.table)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(REFRESH_MS)
+        self.timer.timeout.connect(self.refresh)
+
+    def start(self, telemetry: Telemetry):
+        self.model.set_telemetry(telemetry)
+        self.cycle_label.setText("Waiting for first cycle...")
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+        self.refresh()
+
+    def refresh(self):
+        telemetry = self.model.telemetry
+        if not telemetry:
+            return
+        cycles = telemetry.cycle_stats()
+        if cycles.count:
+            self.cycle_label.setText(
+                f"Cycles: {cycles.count}   last {cycles.last:.3f}s   "
+                f"p50 {cycles.p50:.3f}s   p95 {cycles.p95:.3f}s   p99 {cycles.p99:.3f}s"
+            )
+        self.model.refresh()
@@ -0,0 +1,234 @@
+from typing import List, Optional
+
+from PyQt5.QtCore import (
+    Qt, QAbstractListModel, QModelIndex, QMimeData, QRect, QSize, QEvent, pyqtSignal
+)
+from PyQt5.QtWidgets import (
+    QAbstractItemView, QHeaderView, QStyledItemDelegate, QStyle, QStyleOptionViewItem, QTableView
+)
+from models import CONTROL_KINDS, Config, Step
+
+STEP_ROWS_MIME = "application/x-autoclicker-step-rows"
+
+
+def control_label(step: Step) -> str:
+    if step.kind == "loop":
+        return f"loop {step.count} times" if step.count else "loop forever"
+    if step.kind == "end_loop":
+        return "end loop"
+    if step.kind == "label":
+        return f"label '{step.target}'"
+    if step.kind == "goto":
+        return f"go to '{step.target}'"
+    if step.kind == "call":
+        return f"run config '{step.target}'"
+    if step.condition == "every":
+        condition = f"once every {step.count} times"
+    elif step.condition == "chance":
+        condition = f"{step.count}% of the time"
+    else:
+        condition = f"if {step.template} is on screen"
+    return f"go to '{step.target}' {condition}"
+
+
+def step_label(step: Step) -> str:
+    if step.kind in CONTROL_KINDS:
+        return f"{step.name}: {control_label(step)}"
+    label = (
+        f"{step.name}: x={step.x}, y={step.y}, r={step.radius}, "
+        f"delay=({step.delay_min}-{step.delay_max})"
+    )
+    if step.kind != "click":
+        label += f" [{step.kind}]"
+    return label
+
+
+class StepListModel(QAbstractListModel):
+    """List model over a config's steps.
+
+    Edits go through the model so views get row-level insert, move, remove
+    and dataChanged signals instead of being rebuilt.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.config: Optional[Config] = None
+
+    @property
+    def steps(self) -> List[Step]:
+        return self.config.steps if self.config else []
+
+    def set_config(self, config: Config):
+        self.beginResetModel()
+        self.config = config
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.steps)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return step_label(self.steps[index.row()])
+        if role == Qt.UserRole:
+            return self.steps[index.row()]
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemIsDropEnabled
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsDragEnabled
+
+    def append_step(self, step: Step):
+        row = len(self.steps)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.steps.append(step)
+        self.endInsertRows()
+
+    def replace_step(self, row: int, step: Step):
+        self.steps[row] = step
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+
+    def steps_changed(self, rows: List[int]):
+        """Tell views that steps in `rows` were edited in place"""
+        if rows:
+            self.dataChanged.emit(self.index(min(rows)), self.index(max(rows)))
+
+    def remove_rows(self, rows: List[int]):
+        # Walk contiguous runs from the bottom so earlier row numbers stay valid
+        rows = sorted(set(rows), reverse=True)
+        while rows:
+            last = first = rows.pop(0)
+            while rows and rows[0] == first - 1:
+                first = rows.pop(0)
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self.steps[first:last + 1]
+            self.endRemoveRows()
+
+    def move_rows(self, rows: List[int], target: int):
+        """Move `rows` so they sit together, in order, before original row `target`"""
+        rows = sorted(set(rows))
+        steps = self.steps
+        above = [row for row in rows if row < target]
+        below = [row for row in rows if row >= target]
+        # Rows above the target go in last-first, each landing just before the
+        # previous one; rows below go first-first. Neither pass shifts the rows
+        # still waiting to move, so their original numbers stay valid.
+        for i, row in enumerate(reversed(above)):
+            destination = target - i
+            if destination == row + 1:
+                continue
+            self.beginMoveRows(QModelIndex(), row, row, QModelIndex(), destination)
+            steps.insert(destination - 1, steps.pop(row))
+            self.endMoveRows()
+        for i, row in enumerate(below):
+            destination = target + i
+            if destination == row:
+                continue
+            self.beginMoveRows(QModelIndex(), row, row, QModelIndex(), destination)
+            steps.insert(destination, steps.pop(row))
+            self.endMoveRows()
+
+    def supportedDropActions(self):
+        return Qt.MoveAction
+
+    def mimeTypes(self):
+        return [STEP_ROWS_MIME]
+
+    def mimeData(self, indexes):
+        data = QMimeData()
+        data.setData(STEP_ROWS_MIME, ",".join(str(index.row()) for index in indexes).encode())
+        return data
+
+    def dropMimeData(self, data, action, row, column, parent):
+        if action != Qt.MoveAction or not data.hasFormat(STEP_ROWS_MIME):
+            return False
+        rows = [int(r) for r in bytes(data.data(STEP_ROWS_MIME)).decode().split(",") if r]
+        if row == -1:
+            row = parent.row() if parent.isValid() else len(self.steps)
+        self.move_rows(rows, row)
+        # Returning False stops the view from also removing the source rows
+        return False
+
+
+class StepItemDelegate(QStyledItemDelegate):
+    """Paints a step row; the action buttons appear on the hovered row only.
+
+    The step number comes from the row at paint time rather than from the
+    model, so moves and removals never have to touch the rows they shift.
+    """
+
+    actionTriggered = pyqtSignal(int, str)
+
+    ACTIONS = (
+        ("up", QStyle.SP_ArrowUp),
+        ("down", QStyle.SP_ArrowDown),
+        ("edit", QStyle.SP_FileDialogContentsView),
+        ("delete", QStyle.SP_TrashIcon),
+    )
+    ROW_HEIGHT = 32
+    BUTTON_SIZE = 24
+
+    def _button_rects(self, rect: QRect):
+        size = self.BUTTON_SIZE
+        top = rect.top() + (rect.height() - size) // 2
+        right = rect.right() - 4
+        rects = []
+        for i in range(len(self.ACTIONS)):
+            left = right - (len(self.ACTIONS) - i) * (size + 2)
+            rects.append(QRect(left, top, size, size))
+        return rects
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.ROW_HEIGHT)
+
+    def paint(self, painter, option, index):
+        hovered = bool(option.state & QStyle.State_MouseOver)
+        opt = QStyleOptionViewItem(option)
+        self.initStyleOption(opt, index)
+        opt.text = f"{index.row() + 1} {opt.text}"
+        if hovered:
+            opt.rect = opt.rect.adjusted(0, 0, -len(self.ACTIONS) * (self.BUTTON_SIZE + 2) - 4, 0)
+        style = opt.widget.style() if opt.widget else None
+        if style:
+            style.drawControl(QStyle.CE_ItemViewItem, opt, painter, opt.widget)
+        if hovered and style:
+            for (name, icon), rect in zip(self.ACTIONS, self._button_rects(option.rect)):
+                style.standardIcon(icon).paint(painter, rect)
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            for (name, _), rect in zip(self.ACTIONS, self._button_rects(option.rect)):
+                if rect.contains(event.pos()):
+                    self.actionTriggered.emit(index.row(), name)
+                    return True
+        return super().editorEvent(event, model, option, index)
+
+
+class StepListView(QTableView):
+    """Single-column table used as the step list.
+
+    A QListView re-lays out every row after a move or removal, asking the
+    model for each one; with fixed-height header sections a table view
+    only touches the visible rows, which keeps 100k-step configs responsive.
+    """
+
+    def __init__(self, model: StepListModel, delegate: StepItemDelegate, parent=None):
+        super().__init__(parent)
+        self.setModel(model)
+        self.setItemDelegate(delegate)
+        self.horizontalHeader().hide()
+        self.horizontalHeader().setStretchLastSection(True)
+        rows = self.verticalHeader()
+        rows.hide()
+        rows.setSectionResizeMode(QHeaderView.Fixed)
+        rows.setDefaultSectionSize(delegate.ROW_HEIGHT)
+        self.setShowGrid(False)
+        self.setMouseTracking(True)
+        self.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.setDragDropMode(QAbstractItemView.InternalMove)
+        self.setDefaultDropAction(Qt.MoveAction)
+        self.setDragDropOverwriteMode(False)
@@ -0,0 +1,334 @@
+import json
+from hashlib import blake2b
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from models import DISTRIBUTIONS, Config, Step
+
+HOLD_RANGE = (0.05, 0.1)
+
+STEP_DTYPE = np.dtype([
+    ("x", np.int32),
+    ("y", np.int32),
+    ("radius", np.float64),
+    ("delay_min", np.float64),
+    ("delay_max", np.float64),
+    ("distribution", np.uint8),
+])
+
+# Instructions of a compiled program. Every instruction is an (op, arg, target)
+# triple: OP_STEP runs click slot `arg`; OP_LOOP resets loop counter `arg` and
+# OP_NEXT counts it down, jumping back to `target` until it hits zero; OP_CALL
+# jumps to the callee entry in `arg`; OP_BRANCH tests branch `arg` and jumps to
+# `target` if it holds; OP_END finishes one pass over the top-level config.
+OP_STEP, OP_JUMP, OP_LOOP, OP_NEXT, OP_CALL, OP_RETURN, OP_BRANCH, OP_END = range(8)
+
+
+class ProgramError(ValueError):
+    """A config that can't be compiled: bad labels, unbalanced loops, call cycles..."""
+    pass
+
+
+class ClickBatch:
+    """Pre-drawn jitter for `rows` executions of every click slot in a program.
+
+    Each attribute is a list of rows (one value per slot) so the run loop
+    only indexes Python lists and never touches NumPy per click.
+    """
+
+    __slots__ = ("dx", "dy", "hold", "delay")
+
+    def __init__(self, dx: List[List[int]], dy: List[List[int]],
+                 hold: List[List[float]], delay: List[List[float]]):
+        self.dx = dx
+        self.dy = dy
+        self.hold = hold
+        self.delay = delay
+
+    def __len__(self):
+        return len(self.hold)
+
+
+class _Compiler:
+    """Flattens a config and everything it calls into one instruction list.
+
+    The top-level config comes first and ends in OP_END; each called config
+    is emitted once after it, ending in OP_RETURN, however many places call it.
+    """
+
+    def __init__(self, resolve: Optional[Callable[[str], Config]]):
+        self.resolve = resolve
+        self.ops: List[int] = []
+        self.args: List[int] = []
+        self.targets: List[int] = []
+        self.origins: List[int] = []
+        self.sources: List[Tuple[str, int]] = []  # (config name, step index), for error messages
+        self.slots: List[Step] = []
+        self.slot_relative: List[bool] = []
+        self.slot_sources: List[Tuple[str, int]] = []
+        self.loop_counts: List[int] = []
+        self.branches: List[Step] = []
+        self.branch_relative: List[bool] = []
+        self.callees: Dict[str, Config] = {}
+        self.depths: Dict[str, int] = {}
+        self._callee_timed: Dict[int, bool] = {}  # callee entry -> whether every way through it takes time
+
+    def compile(self, config: Config):
+        depth = self._visit(config, [config.name])
+        calls: List[Tuple[int, str]] = []
+        self._emit_body(config, True, calls)
+        self._emit(OP_END, 0, -1, (config.name, len(config.steps)))
+        entries = {}
+        for name, callee in self.callees.items():
+            entries[name] = len(self.ops)
+            self._emit_body(callee, False, calls)
+            self._emit(OP_RETURN, 0, -1, (name, len(callee.steps)))
+        for address, name in calls:
+            self.args[address] = entries[name]
+        self._check_cycles()
+        return depth
+
+    def _visit(self, config: Config, chain: List[str]) -> int:
+        """Load every config reachable through call steps; returns the call depth below `config`"""
+        depth = 0
+        for i, step in enumerate(config.steps):
+            if step.kind != "call":
+                continue
+            name = step.target
+            if name in chain:
+                raise ProgramError(f"'{config.name}' step {i + 1}: call cycle {' -> '.join(chain + [name])}")
+            if name not in self.callees:
+                if self.resolve is None:
+                    raise ProgramError(f"'{config.name}' step {i + 1}: no configs to call '{name}' from")
+                try:
+                    callee = self.resolve(name)
+                except KeyError:
+                    raise ProgramError(f"'{config.name}' step {i + 1}: no config named '{name}'") from None
+                self.callees[name] = callee.snapshot()
+            if name not in self.depths:
+                self.depths[name] = self._visit(self.callees[name], chain + [name])
+            depth = max(depth, self.depths[name] + 1)
+        return depth
+
+    def _emit(self, op: int, arg: int, origin: int, source: Tuple[str, int], target: int = -1) -> int:
+        self.ops.append(op)
+        self.args.append(arg)
+        self.targets.append(target)
+        self.origins.append(origin)
+        self.sources.append(source)
+        return len(self.ops) - 1
+
+    def _emit_body(self, config: Config, top: bool, calls: List[Tuple[int, str]]):
+        labels: Dict[str, int] = {}
+        jumps: List[Tuple[int, str, int]] = []
+        loops: List[Tuple[int, int, int]] = []
+        for i, step in enumerate(config.steps):
+            at = f"'{config.name}' step {i + 1}"
+            origin = i if top else -1
+            source = (config.name, i)
+            kind = step.kind
+            if kind == "label":
+                if step.target in labels:
+                    raise ProgramError(f"{at}: duplicate label '{step.target}'")
+                labels[step.target] = len(self.ops)
+            elif kind == "goto":
+                jumps.append((self._emit(OP_JUMP, 0, origin, source), step.target, i))
+            elif kind == "loop":
+                loop = len(self.loop_counts)
+                self.loop_counts.append(step.count)
+                self._emit(OP_LOOP, loop, origin, source)
+                loops.append((loop, len(self.ops), i))
+            elif kind == "end_loop":
+                if not loops:
+                    raise ProgramError(f"{at}: end_loop without a loop")
+                loop, start, _ = loops.pop()
+                self._emit(OP_NEXT, loop, origin, source, start)
+            elif kind == "call":
+                calls.append((self._emit(OP_CALL, 0, origin, source), step.target))
+            elif kind == "branch":
+                self.branches.append(step)
+                self.branch_relative.append(config.relative)
+                jumps.append((self._emit(OP_BRANCH, len(self.branches) - 1, origin, source), step.target, i))
+            else:
+                self.slots.append(step)
+                self.slot_relative.append(config.relative)
+                self.slot_sources.append(source)
+                self._emit(OP_STEP, len(self.slots) - 1, origin, source)
+        if loops:
+            raise ProgramError(f"'{config.name}' step {loops[-1][2] + 1}: loop is never closed by an end_loop")
+        for address, label, i in jumps:
+            if label not in labels:
+                raise ProgramError(f"'{config.name}' step {i + 1}: no label '{label}'")
+            self.targets[address] = labels[label]
+
+    def _timed(self, address: int) -> bool:
+        """Whether the instruction always takes time: a step, or a call whose callee can't return without one"""
+        op = self.ops[address]
+        if op == OP_STEP:
+            return True
+        if op != OP_CALL:
+            return False
+        entry = self.args[address]
+        timed = self._callee_timed.get(entry)
+        if timed is None:
+            # Look for a way through the callee's control flow back to its return that skips every
+            # timed instruction; nested calls are decided (and memoized) the same way
+            timed = True
+            seen = {entry}
+            pending = [entry]
+            while pending:
+                at = pending.pop()
+                if self._timed(at):
+                    continue
+                if self.ops[at] == OP_RETURN:
+                    timed = False
+                    break
+                for successor in self._successors(at):
+                    if successor not in seen:
+                        seen.add(successor)
+                        pending.append(successor)
+            self._callee_timed[entry] = timed
+        return timed
+
+    def _successors(self, address: int) -> Tuple[int, ...]:
+        op, target = self.ops[address], self.targets[address]
+        if op == OP_JUMP:
+            return (target,)
+        if op == OP_BRANCH:
+            return (address + 1, target)
+        if op == OP_NEXT and self.loop_counts[self.args[address]] == 0:
+            return (address + 1, target)
+        if op in (OP_END, OP_RETURN):
+            return ()
+        # Including OP_NEXT of a counted loop: it always runs out, so its back edge can't spin forever
+        return (address + 1,)
+
+    def _check_cycles(self):
+        """Reject control flow that could loop forever without ever reaching a click.
+
+        Depth-first search over the instructions that take no time; any
+        back edge among them is a cycle the run would spin on.
+        """
+        timed = [self._timed(address) for address in range(len(self.ops))]
+        state = [0] * len(self.ops)  # 0 unseen, 1 on the stack, 2 done
+        for root in range(len(self.ops)):
+            if timed[root] or state[root]:
+                continue
+            state[root] = 1
+            stack = [(root, iter(self._successors(root)))]
+            while stack:
+                address, successors = stack[-1]
+                for successor in successors:
+                    if timed[successor] or state[successor] == 2:
+                        continue
+                    if state[successor] == 1:
+                        name, index = self.sources[successor]
+                        raise ProgramError(f"'{name}' step {index + 1}: control flow can loop forever "
+                                           "without reaching a click or wait step")
+                    state[successor] = 1
+                    stack.append((successor, iter(self._successors(successor))))
+                    break
+                else:
+                    state[address] = 2
+                    stack.pop()
+
+
+class StepProgram:
+    """A config compiled to a flat instruction list plus a seedable RNG.
+
+    Loops, gotos, branches and calls into other configs (looked up through
+    `resolve`) are resolved to instruction indexes up front, so running the
+    program is index arithmetic over plain lists. Every click or vision step
+    reachable from the config gets a slot; jitter is drawn per slot in
+    NumPy batches. `origins` maps each instruction to the top-level step it
+    came from, or -1 inside a called config.
+    """
+
+    def __init__(self, config: Config, seed: Optional[int] = None,
+                 hold_range: Tuple[float, float] = HOLD_RANGE,
+                 resolve: Optional[Callable[[str], Config]] = None):
+        self.name = config.name
+        self.relative = config.relative
+        compiler = _Compiler(resolve)
+        self.call_depth = compiler.compile(config)
+        # Every config the program was built from, so a change to any of them can trigger a rebuild
+        self.config_names = frozenset([config.name, *compiler.callees])
+        self.ops = compiler.ops
+        self.args = compiler.args
+        self.targets = compiler.targets
+        self.origins = compiler.origins
+        self.slots = compiler.slots
+        self.slot_relative = compiler.slot_relative
+        self.slot_sources = compiler.slot_sources  # (config name, step index) each slot was compiled from
+        self.loop_counts = compiler.loop_counts
+        self.branches = compiler.branches
+        self.branch_relative = compiler.branch_relative
+        self.steps_per_pass = self._count_steps(config, compiler.callees)
+        self.names = [step.name for step in self.slots]
+        self.steps = np.array(
+            [(step.x, step.y, step.radius, step.delay_min, step.delay_max,
+              DISTRIBUTIONS.index(step.distribution)) for step in self.slots],
+            dtype=STEP_DTYPE,
+        )
+        self.hold_range = hold_range
+        self.rng = np.random.default_rng(seed)
+        self._sources = [config, *(compiler.callees[name] for name in sorted(compiler.callees))]
+        self._version: Optional[str] = None
+
+    def __len__(self):
+        return len(self.steps)
+
+    @property
+    def version(self) -> str:
+        """Digest of every config compiled in, so saved run state is only applied to the same program"""
+        if self._version is None:
+            configs = [config.to_dict() for config in self._sources]
+            for config in configs:
+                for step in config["steps"]:
+                    step.pop("ready", None)  # learned timing changes as the program runs
+            data = json.dumps(configs, sort_keys=True)
+            self._version = blake2b(data.encode(), digest_size=8).hexdigest()
+        return self._version
+
+    @staticmethod
+    def _count_steps(config: Config, callees: Dict[str, Config]) -> Optional[int]:
+        """Click and vision steps run per pass, or None if gotos, branches or endless loops make it unknowable"""
+        total = 0
+        multipliers = [1]
+        for step in config.steps:
+            kind = step.kind
+            if kind in ("goto", "branch") or (kind == "loop" and step.count == 0):
+                return None
+            if kind == "loop":
+                multipliers.append(multipliers[-1] * step.count)
+            elif kind == "end_loop":
+                multipliers.pop()
+            elif kind == "call":
+                called = StepProgram._count_steps(callees[step.target], callees)
+                if called is None:
+                    return None
+                total += multipliers[-1] * called
+            elif kind != "label":
+                total += multipliers[-1]
+        return total
+
+    def sample(self, rows: int) -> ClickBatch:
+        """Draw click offsets, hold times and delays for `rows` runs of every slot at once"""
+        shape = (rows, len(self.steps))
+        steps = self.steps
+        radius = steps["radius"]
+
+        theta = self.rng.uniform(0.0, 2 * np.pi, shape)
+        uniform_r = radius * np.sqrt(self.rng.random(shape))
+        # Gaussian clicks scatter in 2-D around the centre with sigma = radius / 2 on each axis, so
+        # their distance from it is Rayleigh distributed; clipped to the circle
+        gaussian_r = np.minimum(self.rng.rayleigh(1.0, shape) * radius / 2, radius)
+        gaussian = steps["distribution"] == DISTRIBUTIONS.index("gaussian")
+        r = np.where(gaussian, gaussian_r, uniform_r)
+
+        dx = (r * np.cos(theta)).astype(np.int32)
+        dy = (r * np.sin(theta)).astype(np.int32)
+        hold = self.rng.uniform(self.hold_range[0], self.hold_range[1], shape)
+        delay = self.rng.uniform(steps["delay_min"], steps["delay_max"], shape)
+        return ClickBatch(dx.tolist(), dy.tolist(), hold.tolist(), delay.tolist())
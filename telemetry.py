@@ -0,0 +1,192 @@
+import json
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+# Where the time between one click and the next goes. They add up to the step's total.
+PHASES = ("wait", "focus", "lock", "search", "move", "inject")
+
+# Log-spaced bucket upper bounds, 10 per decade from 0.1 ms to 100 s
+BUCKET_BOUNDS = [1e-4 * 10 ** (i / 10) for i in range(61)]
+
+
+class Histogram:
+    """Counts of non-negative values in fixed log-spaced buckets.
+
+    Memory is constant no matter how long a run goes; percentiles are
+    accurate to a bucket (about 26%).
+    """
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float):
+        self.counts[bisect_left(BUCKET_BOUNDS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, p: float) -> float:
+        """Upper bound of the bucket holding the p-th percentile (0-100)"""
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(BUCKET_BOUNDS[i], self.max) if i < len(BUCKET_BOUNDS) else self.max
+        return self.max
+
+
+class RingBuffer:
+    """The last `size` values in a preallocated array, for exact recent percentiles"""
+
+    def __init__(self, size: int = 1024):
+        self.values = np.zeros(size)
+        self.size = size
+        self.count = 0
+
+    def add(self, value: float):
+        self.values[self.count % self.size] = value
+        self.count += 1
+
+    def percentiles(self, ps: Sequence[float]) -> List[float]:
+        if not self.count:
+            return [0.0] * len(ps)
+        return np.percentile(self.values[:min(self.count, self.size)], ps).tolist()
+
+
+class StepStats(NamedTuple):
+    step_index: int
+    count: int
+    p50: float
+    p95: float
+    max: float
+    phase_means: Dict[str, float]
+    error_p95: float  # absolute deadline error
+
+
+class CycleStats(NamedTuple):
+    count: int
+    last: float
+    p50: float
+    p95: float
+    p99: float
+
+
+class TraceWriter:
+    """Streams telemetry events to a JSON Lines file.
+
+    Lines go through a buffered file and are flushed at most every
+    `flush_interval` seconds and on close, so tracing costs one small
+    json.dumps per event on the run thread.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0, clock=time.time):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self._file = open(path, "a", buffering=1 << 16)
+        self._last_flush = clock()
+
+    def write(self, event: dict):
+        self._file.write(json.dumps(event) + "\n")
+        now = self.clock()
+        if now - self._last_flush >= self.flush_interval:
+            self._file.flush()
+            self._last_flush = now
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+class Telemetry:
+    """Per-step phase timings and cycle times for one run.
+
+    The engine calls `record_step` once per step and `record_cycle` once per
+    repeat from its own thread; the stats accessors may be called from any
+    thread (e.g. a GUI timer). Step times go into bounded
+    histograms and cycle times into a ring buffer, so memory stays flat
+    however long the run.
+    """
+
+    def __init__(self, steps: int = 0, ring_size: int = 1024, trace: Optional[TraceWriter] = None):
+        self.trace = trace
+        self.cycles = RingBuffer(ring_size)
+        self._lock = threading.Lock()
+        self._steps: List[List[Histogram]] = []
+        self._phase_totals: List[List[float]] = []
+        self._ensure(steps)
+
+    def _ensure(self, steps: int):
+        while len(self._steps) < steps:
+            self._steps.append([Histogram(), Histogram()])  # total, |error|
+            self._phase_totals.append([0.0] * len(PHASES))
+
+    def record_step(self, repeat_index: int, step_index: int, phases: Sequence[float], error: float):
+        """`phases` holds one duration per entry in PHASES"""
+        with self._lock:
+            self._ensure(step_index + 1)
+            total, errors = self._steps[step_index]
+            total.add(sum(phases))
+            errors.add(abs(error))
+            totals = self._phase_totals[step_index]
+            for i, seconds in enumerate(phases):
+                totals[i] += seconds
+        if self.trace:
+            event = {"event": "step", "t": round(time.time(), 6), "repeat": repeat_index, "step": step_index,
+                     "error": round(error, 6)}
+            event.update(zip(PHASES, (round(seconds, 6) for seconds in phases)))
+            self.trace.write(event)
+
+    def record_cycle(self, repeat_index: int, seconds: float):
+        with self._lock:
+            self.cycles.add(seconds)
+        if self.trace:
+            self.trace.write({"event": "cycle", "t": round(time.time(), 6), "repeat": repeat_index,
+                              "seconds": round(seconds, 6)})
+
+    def step_count(self) -> int:
+        with self._lock:
+            return len(self._steps)
+
+    def step_stats(self, step_index: int) -> StepStats:
+        """Summary for one step; cheap enough to call per visible row"""
+        with self._lock:
+            total, errors = self._steps[step_index]
+            totals = self._phase_totals[step_index]
+            count = total.count
+            return StepStats(
+                step_index=step_index,
+                count=count,
+                p50=total.percentile(50),
+                p95=total.percentile(95),
+                max=total.max,
+                phase_means={phase: totals[i] / count if count else 0.0 for i, phase in enumerate(PHASES)},
+                error_p95=errors.percentile(95),
+            )
+
+    def cycle_stats(self) -> CycleStats:
+        with self._lock:
+            p50, p95, p99 = self.cycles.percentiles((50, 95, 99))
+            last = self.cycles.values[(self.cycles.count - 1) % self.cycles.size] if self.cycles.count else 0.0
+            return CycleStats(self.cycles.count, float(last), p50, p95, p99)
+
+    def close(self):
+        if self.trace:
+            self.trace.close()
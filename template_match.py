@@ -0,0 +1,158 @@
+import os
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# Pyramid levels stop once the template would shrink below this many pixels per side
+MIN_TEMPLATE_SIDE = 8
+# Pixels searched around the upscaled coarse hit when refining at the next level
+REFINE_MARGIN = 3
+
+
+class Match(NamedTuple):
+    x: int  # centre of the match, in the coordinates of the searched frame
+    y: int
+    score: float
+
+
+def to_gray(image: np.ndarray) -> np.ndarray:
+    image = np.asarray(image)
+    if image.ndim == 3:
+        image = image[..., :3] @ np.array([0.299, 0.587, 0.114])
+    return image.astype(np.float32)
+
+
+def downsample(image: np.ndarray) -> np.ndarray:
+    """Halve an image by averaging 2x2 blocks"""
+    h, w = image.shape[0] // 2 * 2, image.shape[1] // 2 * 2
+    image = image[:h, :w]
+    return (image[0::2, 0::2] + image[1::2, 0::2] + image[0::2, 1::2] + image[1::2, 1::2]) * 0.25
+
+
+def _window_sums(image: np.ndarray, h: int, w: int) -> np.ndarray:
+    """Sum of every h x w window, via an integral image"""
+    integral = np.zeros((image.shape[0] + 1, image.shape[1] + 1), dtype=np.float64)
+    np.cumsum(np.cumsum(image, axis=0), axis=1, out=integral[1:, 1:])
+    return integral[h:, w:] - integral[:-h, w:] - integral[h:, :-w] + integral[:-h, :-w]
+
+
+def ncc_map(image: np.ndarray, template: np.ndarray) -> np.ndarray:
+    """Normalized cross-correlation of `template` at every valid offset in `image`.
+
+    The numerator is an FFT correlation against the zero-mean template and
+    the per-window variance comes from integral images, so the cost does
+    not depend on template size. Flat windows score 0.
+    """
+    h, w = template.shape
+    H, W = image.shape
+    if H < h or W < w:
+        return np.zeros((0, 0), dtype=np.float32)
+    t = template - template.mean()
+    t_norm = np.sqrt((t * t).sum())
+
+    shape = (H + h - 1, W + w - 1)
+    spectrum = np.fft.rfft2(image, shape) * np.fft.rfft2(t[::-1, ::-1], shape)
+    numerator = np.fft.irfft2(spectrum, shape)[h - 1:H, w - 1:W]
+
+    n = h * w
+    sums = _window_sums(image.astype(np.float64), h, w)
+    sq_sums = _window_sums(image.astype(np.float64) ** 2, h, w)
+    variance = np.maximum(sq_sums - sums * sums / n, 0.0)
+    denominator = np.sqrt(variance) * t_norm
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = np.where(denominator > 1e-6, numerator / denominator, 0.0)
+    return scores.astype(np.float32)
+
+
+class Template:
+    """A grayscale template and its image pyramid, finest level first."""
+
+    def __init__(self, image: np.ndarray, max_levels: int = 4):
+        self.levels: List[np.ndarray] = [to_gray(image)]
+        while (len(self.levels) < max_levels
+               and min(self.levels[-1].shape) // 2 >= MIN_TEMPLATE_SIDE):
+            self.levels.append(downsample(self.levels[-1]))
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.levels[0].shape
+
+
+def match_template(frame: np.ndarray, template: Template, threshold: float = 0.8) -> Optional[Match]:
+    """Find `template` in `frame`, coarse to fine.
+
+    The full NCC map is only computed at the coarsest pyramid level; each
+    finer level re-scores a small window around the previous best hit.
+    Returns None if the final score is below `threshold`.
+    """
+    frame = to_gray(frame)
+    frames = [frame]
+    for _ in range(len(template.levels) - 1):
+        if min(frames[-1].shape) // 2 < MIN_TEMPLATE_SIDE:
+            break
+        frames.append(downsample(frames[-1]))
+    level = len(frames) - 1
+
+    scores = ncc_map(frames[level], template.levels[level])
+    if scores.size == 0:
+        return None
+    y, x = np.unravel_index(np.argmax(scores), scores.shape)
+    score = float(scores[y, x])
+
+    for level in range(level - 1, -1, -1):
+        image, tmpl = frames[level], template.levels[level]
+        h, w = tmpl.shape
+        top = max(2 * y - REFINE_MARGIN, 0)
+        left = max(2 * x - REFINE_MARGIN, 0)
+        bottom = min(2 * y + REFINE_MARGIN + h, image.shape[0])
+        right = min(2 * x + REFINE_MARGIN + w, image.shape[1])
+        scores = ncc_map(image[top:bottom, left:right], tmpl)
+        if scores.size == 0:
+            return None
+        dy, dx = np.unravel_index(np.argmax(scores), scores.shape)
+        y, x = top + dy, left + dx
+        score = float(scores[dy, dx])
+
+    if score < threshold:
+        return None
+    h, w = template.shape
+    return Match(int(x + w // 2), int(y + h // 2), score)
+
+
+def load_image(path: str) -> np.ndarray:
+    if path.endswith(".npy"):
+        return np.load(path)
+    from PIL import Image
+    with Image.open(path) as image:
+        return np.asarray(image.convert("L"))
+
+
+class TemplateCache:
+    """Preprocessed templates keyed by path, reloaded when the file changes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # path -> (mtime, template); mtime is None for templates registered with put()
+        self._templates: Dict[str, Tuple[Optional[float], Template]] = {}
+
+    def get(self, path: str) -> Template:
+        with self._lock:
+            cached = self._templates.get(path)
+        if cached and cached[0] is None:
+            return cached[1]
+        mtime = os.path.getmtime(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        template = Template(load_image(path))
+        with self._lock:
+            self._templates[path] = (mtime, template)
+        return template
+
+    def put(self, key: str, image: np.ndarray) -> Template:
+        """Register an in-memory template, e.g. one cut from a synthetic frame"""
+        template = Template(image)
+        with self._lock:
+            self._templates[key] = (None, template)
+        return template
+
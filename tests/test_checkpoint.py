@@ -0,0 +1,86 @@
+"""A run stopped and resumed from its checkpoint clicks exactly as an uninterrupted one."""
+import pytest
+
+from checkpoint import CheckpointError, CheckpointWriter, load_checkpoint
+from input_backend import RecordingInputBackend
+from models import Config, Step
+from run_engine import RunEngine, RunListener
+from scheduler import DeadlineScheduler
+from simulator import SimulatedWindow, VirtualClock, VirtualWaiter
+
+REPEAT = 30
+
+
+class StopAfter(RunListener):
+    def __init__(self, steps):
+        self.steps = steps
+        self.engine = None
+
+    def on_progress(self, done, total):
+        if done == self.steps:
+            self.engine.stop()
+
+
+def build_configs():
+    """A pass with a counted loop, a chance branch and a call, so every part of the state matters"""
+    helper = Config("helper")
+    helper.steps = [Step(300, 40, 6, 0.1, 0.3, name="Helper", distribution="gaussian")]
+    config = Config("main")
+    config.steps = [
+        Step(20, 20, 10, 0.1, 0.4, name="First"),
+        Step(0, 0, 0, 0, 0, kind="loop", count=3),
+        Step(60, 80, 15, 0.05, 0.2, name="Looped", distribution="gaussian"),
+        Step(0, 0, 0, 0, 0, kind="branch", target="skip", count=50, condition="chance"),
+        Step(0, 0, 0, 0, 0, kind="call", target="helper"),
+        Step(0, 0, 0, 0, 0, kind="label", target="skip"),
+        Step(0, 0, 0, 0, 0, kind="end_loop"),
+        Step(150, 150, 25, 0.2, 0.5, name="Last"),
+    ]
+    return config, {"helper": helper, "main": config}
+
+
+def run(config, configs, listener=None, checkpoint=None, resume=None):
+    clock = VirtualClock()
+    backend = RecordingInputBackend(sleep=clock.advance, clock=clock)
+    engine = RunEngine(config, SimulatedWindow(), resume.repeat if resume else REPEAT, backend, listener,
+                       waiter=VirtualWaiter(clock), scheduler=DeadlineScheduler(clock), seed=3,
+                       configs=configs.__getitem__, checkpoint=checkpoint, resume=resume)
+    if listener is not None:
+        listener.engine = engine
+    engine.run()
+    return [(event.x, event.y) for event in backend.clicks()], engine
+
+
+@pytest.mark.parametrize("stop_after", [1, 7, 64, 65, 100])
+def test_resumed_run_matches_an_uninterrupted_one(tmp_path, stop_after):
+    config, configs = build_configs()
+    expected, _ = run(config, configs)
+    path = str(tmp_path / "checkpoint.json")
+
+    before, engine = run(config, configs, StopAfter(stop_after), CheckpointWriter(path))
+    assert engine.stopped and len(before) == stop_after
+    checkpoint = load_checkpoint(path)
+    assert checkpoint.done == stop_after
+    after, engine = run(config, configs, checkpoint=CheckpointWriter(path), resume=checkpoint)
+
+    assert not engine.stopped
+    assert before + after == expected
+    assert load_checkpoint(path) is None  # a finished run leaves nothing to resume
+
+
+def test_checkpoint_of_an_edited_config_is_refused(tmp_path):
+    config, configs = build_configs()
+    path = str(tmp_path / "checkpoint.json")
+    run(config, configs, StopAfter(5), CheckpointWriter(path))
+    config.steps[0].radius += 1
+    with pytest.raises(CheckpointError):
+        run(config, configs, resume=load_checkpoint(path))
+
+
+def test_learned_readiness_does_not_invalidate_a_checkpoint(tmp_path):
+    config, configs = build_configs()
+    path = str(tmp_path / "checkpoint.json")
+    run(config, configs, StopAfter(5), CheckpointWriter(path))
+    config.steps[0].ready = {"samples": [0.3] * 10, "early": []}
+    after, engine = run(config, configs, resume=load_checkpoint(path))
+    assert after and not engine.stopped
@@ -0,0 +1,98 @@
+"""validate_config and what ConfigStore does with configs that fail it."""
+import copy
+import json
+
+import pytest
+
+from config_store import ConfigValidationError, JsonConfigStore, validate_config, validate_step
+from models import Config, Step
+
+VALID = {
+    "name": "Valid",
+    "relative": True,
+    "steps": [
+        {"name": "Click", "x": 10, "y": 20, "radius": 5, "delay_min": 0.5, "delay_max": 1.0},
+        {"name": "Find", "x": 0, "y": 0, "radius": 0, "delay_min": 0, "delay_max": 0,
+         "kind": "click_template", "template": "button.png", "region": [0, 0, 100, 50]},
+        {"name": "Loop", "x": 0, "y": 0, "radius": 0, "delay_min": 0, "delay_max": 0, "kind": "loop", "count": 0},
+        {"name": "End", "x": 0, "y": 0, "radius": 0, "delay_min": 0, "delay_max": 0, "kind": "end_loop"},
+        {"name": "Learned", "x": 1, "y": 1, "radius": 1, "delay_min": 1, "delay_max": 2,
+         "adapt_min": 0.2, "ready": {"samples": [0.4, 0.5], "early": []}},
+    ],
+}
+
+
+def with_step(**changes):
+    data = copy.deepcopy(VALID)
+    data["steps"][0].update(changes)
+    return data
+
+
+def test_valid_config_passes():
+    validate_config(copy.deepcopy(VALID))
+
+
+@pytest.mark.parametrize("changes, message", [
+    ({"delay_min": 2.0, "delay_max": 1.0}, "delay_min is greater than delay_max"),
+    ({"x": 1.5}, "x must be an integer"),
+    ({"y": True}, "y must be an integer"),
+    ({"radius": -1}, "radius must be a non-negative number"),
+    ({"delay_max": "1"}, "delay_max must be a non-negative number"),
+    ({"adapt_max": -0.5}, "adapt_max must be a non-negative number"),
+    ({"distribution": "triangular"}, "unknown distribution"),
+    ({"kind": "teleport"}, "unknown kind 'teleport'"),
+    ({"kind": "wait_template"}, "missing template"),
+    ({"kind": "click_template", "template": "a.png", "region": [1, 2, 3]}, "region must be"),
+    ({"kind": "goto"}, "goto needs a target"),
+    ({"kind": "branch", "target": "x", "condition": "sometimes"}, "unknown branch condition"),
+    ({"kind": "loop", "count": -1}, "count must be a non-negative integer"),
+    ({"ready": {"samples": ["slow"], "early": []}}, "ready must hold"),
+])
+def test_invalid_steps_name_the_step_and_the_problem(changes, message):
+    with pytest.raises(ConfigValidationError, match=f"config 'Valid' step 1: {message}"):
+        validate_config(with_step(**changes))
+
+
+@pytest.mark.parametrize("data", [[], {"steps": []}, {"name": "  "}, {"name": "x", "steps": {}}])
+def test_malformed_configs_are_rejected(data):
+    with pytest.raises(ConfigValidationError):
+        validate_config(data)
+
+
+def test_step_dicts_validate_on_their_own():
+    validate_step(Step(1, 2, 3, 0.5, 1.0).to_dict())
+    with pytest.raises(ConfigValidationError, match="^step: delay_min is greater than delay_max$"):
+        validate_step(Step(1, 2, 3, 2.0, 1.0).to_dict())
+
+
+def test_invalid_config_fails_when_opened(tmp_path):
+    path = tmp_path / "configs.json"
+    path.write_text(json.dumps([with_step(delay_min=3.0)]))
+    store = JsonConfigStore(str(path))
+    assert store.names() == ["Valid"]
+    with pytest.raises(ConfigValidationError):
+        store.get("Valid")
+
+
+def test_save_writes_nothing_while_a_config_is_invalid(tmp_path):
+    path = tmp_path / "configs.json"
+    store = JsonConfigStore(str(path))
+    good, bad = Config("Good"), Config("Bad")
+    good.steps = [Step(1, 2, 3, 0.5, 1.0)]
+    bad.steps = [Step(1, 2, 3, 0.5, 1.0)]
+    store.add(good)
+    store.add(bad)
+    store.save()
+    saved = path.read_text()
+
+    good.steps[0].radius = 9
+    bad.steps[0].delay_min = 5.0
+    with pytest.raises(ConfigValidationError, match="Bad"):
+        store.save()
+    assert path.read_text() == saved
+
+    bad.steps[0].delay_min, bad.steps[0].delay_max = 1.0, 5.0
+    assert store.save()
+    reopened = JsonConfigStore(str(path))
+    assert reopened.get("Good").steps[0].radius == 9
+    assert reopened.get("Bad").steps[0].delay_max == 5.0
@@ -0,0 +1,178 @@
+"""JobRunner's queue, especially when a job can't start or its run blows up."""
+import socket
+import time
+
+import pytest
+
+import control_server
+from config_store import JsonConfigStore
+from control_server import (
+    FAILED, FINAL_STATES, FINISHED, MAX_BODY, PAUSED, RUNNING, ControlClient, ControlServer, JobRunner, _host_name,
+    _JobListener,
+)
+from input_backend import RecordingInputBackend
+from models import Config, Step
+from simulator import SimulatedWindow, VirtualClock, VirtualWaiter
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = JsonConfigStore(str(tmp_path / "configs.json"))
+    config = Config("clicks")
+    config.steps = [Step(10, 10, 0, 0.1, 0.2)]
+    store.add(config)
+    return store
+
+
+def make_runner(store, find_window=lambda title: SimulatedWindow(), **options):
+    clock = VirtualClock()
+    return JobRunner(store, RecordingInputBackend(sleep=clock.advance, clock=clock), find_window,
+                     focus_settle=0.0, cycle_gap=0.0, waiter=VirtualWaiter(clock), **options)
+
+
+def wait_for(runner, jobs, timeout=10.0):
+    """Close the runner once every job reached a final state; fails rather than hanging"""
+    give_up = time.monotonic() + timeout
+    while not all(job.state in FINAL_STATES for job in jobs):
+        assert time.monotonic() < give_up, [job.state for job in jobs]
+        time.sleep(0.01)
+    runner.close()
+
+
+def test_jobs_run_in_priority_order(store):
+    runner = make_runner(store)
+    low = runner.submit("clicks", "game", repeat=2)
+    high = runner.submit("clicks", "game", repeat=2, priority=5)
+    runner.start()
+    wait_for(runner, [low, high])
+    assert low.state == high.state == FINISHED
+    assert high.started <= low.started
+    assert low.cycles == high.cycles == 2
+
+
+@pytest.mark.parametrize("error", [RuntimeError("window manager went away"), RuntimeError(), OSError()])
+def test_a_job_that_cannot_start_fails_alone(store, error):
+    def find_window(title):
+        if title == "broken":
+            raise error
+        return SimulatedWindow()
+
+    runner = make_runner(store, find_window)
+    broken = runner.submit("clicks", "broken")
+    after = runner.submit("clicks", "game")
+    runner.start()
+    wait_for(runner, [broken, after])
+    assert broken.state == FAILED
+    assert broken.error == (str(error) or type(error).__name__)
+    assert after.state == FINISHED
+
+
+def test_a_crashing_run_fails_its_job_and_the_queue_goes_on(store, monkeypatch):
+    class CrashingEngine(control_server.RunEngine):
+        def run(self):
+            if self.name == "job 1":
+                raise MemoryError()
+            super().run()
+
+    monkeypatch.setattr(control_server, "RunEngine", CrashingEngine)
+    runner = make_runner(store)
+    crashing = runner.submit("clicks", "game")
+    after = runner.submit("clicks", "game")
+    runner.start()
+    wait_for(runner, [crashing, after])
+    assert crashing.state == FAILED and crashing.error == "MemoryError"
+    assert after.state == FINISHED
+
+
+def test_a_missing_window_fails_the_job(store):
+    runner = make_runner(store, lambda title: None)
+    job = runner.submit("clicks", "nowhere")
+    runner.start()
+    wait_for(runner, [job])
+    assert job.state == FAILED and "nowhere" in job.error
+
+
+def test_only_the_newest_finished_jobs_are_kept(store):
+    runner = make_runner(store, keep_finished=3)
+    jobs = [runner.submit("clicks", "game") for _ in range(6)]
+    runner.start()
+    wait_for(runner, jobs)
+    assert sorted(runner.jobs) == [4, 5, 6]
+    with pytest.raises(KeyError):
+        runner.job(1)
+
+
+def test_submit_refuses_bad_jobs(store):
+    runner = make_runner(store)
+    with pytest.raises(KeyError):
+        runner.submit("missing", "game")
+    with pytest.raises(ValueError):
+        runner.submit("clicks", "game", repeat=-1)
+    with pytest.raises(ValueError):
+        runner.submit("clicks", "")
+
+
+@pytest.mark.parametrize("header, host", [
+    ("127.0.0.1:8765", "127.0.0.1"),
+    ("localhost", "localhost"),
+    ("[::1]", "[::1]"),
+    ("[::1]:8765", "[::1]"),
+    ("example.com:8765", "example.com"),
+])
+def test_host_header_parsing(header, host):
+    assert _host_name(header) == host
+
+
+def test_a_pause_that_lands_after_the_run_ended_is_ignored(store):
+    runner = make_runner(store)
+    job = runner.submit("clicks", "game")
+    runner.start()
+    wait_for(runner, [job])
+    listener = _JobListener(runner, job)
+    listener.on_paused(True)
+    assert job.state == FINISHED
+
+    job.state = RUNNING
+    listener.on_paused(True)
+    assert job.state == PAUSED
+    listener.on_paused(False)
+    assert job.state == RUNNING
+
+
+@pytest.fixture
+def server(store):
+    runner = make_runner(store)
+    runner.start()
+    server = ControlServer(runner, port=0)
+    server.start()
+    yield server
+    server.close()
+    runner.close()
+
+
+def raw_request(port, content_length, body=b""):
+    """Status line of the reply to a POST /jobs with the given Content-Length header"""
+    with socket.create_connection(("127.0.0.1", port), timeout=5.0) as connection:
+        connection.sendall(b"POST /jobs HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n"
+                           + f"Content-Length: {content_length}\r\n\r\n".encode() + body)
+        reply = connection.makefile("rb").read()  # the server closes the connection after a bad length
+    return reply.split(b"\r\n", 1)[0].decode()
+
+
+@pytest.mark.parametrize("content_length, status", [
+    ("many", "400"),
+    ("-5", "400"),
+    (str(MAX_BODY + 1), "413"),
+    ("99999999999999999999", "413"),
+])
+def test_bad_content_lengths_are_refused_without_reading(server, content_length, status):
+    assert raw_request(server.port, content_length).split()[1] == status
+
+
+def test_jobs_are_submitted_over_http(server):
+    client = ControlClient(server.port, timeout=5.0)
+    job = client.submit("clicks", "game", repeat=2)
+    assert job["config"] == "clicks"
+    assert client.job(job["id"])["id"] == job["id"]
+    with pytest.raises(RuntimeError, match="404"):
+        client.submit("missing", "game")
@@ -0,0 +1,41 @@
+import sys
+
+import pytest
+
+import input_backend
+from input_backend import RecordingInputBackend, create_backend
+
+
+def test_recording_backend_timestamps_every_event():
+    now = [0.0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    backend = RecordingInputBackend(sleep=sleep, clock=lambda: now[0])
+    backend.click(10, 20, hold_time=0.08)
+    backend.click(30, 40)
+    assert [(event.kind, event.x, event.y) for event in backend.events] == [
+        ("move", 10, 20), ("press", 10, 20), ("release", 10, 20),
+        ("move", 30, 40), ("press", 30, 40), ("release", 30, 40),
+    ]
+    assert backend.events[2].time - backend.events[1].time == pytest.approx(0.08)
+    assert [(event.x, event.y) for event in backend.clicks()] == [(10, 20), (30, 40)]
+
+
+def test_unsupported_platform_has_no_default_backend(monkeypatch):
+    monkeypatch.setattr(input_backend.sys, "platform", "darwin")
+    with pytest.raises(ValueError, match="darwin"):
+        create_backend()
+
+
+def test_x11_backend_names_the_package_it_is_missing(monkeypatch):
+    monkeypatch.setitem(sys.modules, "Xlib", None)
+    with pytest.raises(ImportError, match="pip install python-xlib"):
+        create_backend("x11")
+
+
+def test_recording_backend_is_only_used_when_asked_for():
+    assert isinstance(create_backend("recording"), RecordingInputBackend)
+    with pytest.raises(ValueError, match="Unknown input backend"):
+        create_backend("telepathy")
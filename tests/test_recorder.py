@@ -0,0 +1,184 @@
+"""Recorded demonstrations replayed from event files into steps."""
+import json
+
+import pytest
+
+from config_store import JsonConfigStore
+from input_backend import InputEvent
+from recorder import (
+    EventRing, MacroRecorder, build_config, build_steps, extract_clicks, find_period, load_events, main, replay,
+    save_events,
+)
+
+SPOTS = [(100, 100), (400, 200), (250, 500)]
+# Release-to-next-press gaps after each spot, one per pass
+GAPS = [[1.0, 1.2, 1.4, 1.1], [0.5, 0.6, 0.4, 0.5], [2.0, 2.5, 2.2, 2.1]]
+WIGGLE = [(0, 0), (3, -2), (-2, 3), (3, 3)]  # averages to (1, 1)
+HOLD = 0.08
+RECORDER_WINDOW = (0, 0, 60, 40)
+
+
+def demonstration():
+    """Four passes over SPOTS, with every kind of noise extract_clicks should drop mixed into the gaps"""
+    events = [InputEvent(0.0, "release", 5, 5)]  # the button that started the recording
+
+    def click(t, x, y, hold=HOLD, slip=(0, 0)):
+        events.append(InputEvent(t, "press", x, y))
+        events.append(InputEvent(t + hold, "release", x + slip[0], y + slip[1]))
+        return t + hold
+
+    t = 1.0
+    for n in range(4):
+        for spot, ((x, y), gaps) in enumerate(zip(SPOTS, GAPS)):
+            released = click(t, x + WIGGLE[n][0], y + WIGGLE[n][1])
+            if (n, spot) == (1, 0):
+                click(released + 0.02, x, y)  # switch bounce
+            if (n, spot) == (2, 2):
+                click(released + 0.1, 700, 700, hold=0.3, slip=(40, 0))  # drag
+                click(released + 0.5, 700, 700, hold=1.5)  # long press
+                click(released + 2.05, 20, 20)  # on the recorder's own window
+            t = released + gaps[n]
+    click(t, 30, 10)  # the stop button
+    return events
+
+
+def clicked_at(xs, y=100):
+    """Press and release at each x, a second apart"""
+    events = []
+    for n, x in enumerate(xs):
+        events += [InputEvent(float(n), "press", x, y), InputEvent(n + HOLD, "release", x, y)]
+    return events
+
+
+@pytest.fixture
+def recorded(tmp_path):
+    """A demonstration saved to JSONL, loaded back and replayed through a recorder's ring"""
+    path = str(tmp_path / "events.jsonl")
+    save_events(path, demonstration())
+    recorder = MacroRecorder()
+    replay(load_events(path), recorder)
+    return recorder.drain()
+
+
+def test_saved_events_load_back_unchanged(tmp_path):
+    path = str(tmp_path / "events.jsonl")
+    events = demonstration()
+    save_events(path, events)
+    assert load_events(path) == events
+    with open(path) as f:
+        assert json.loads(f.readline()) == {"time": 0.0, "kind": "release", "x": 5, "y": 5}
+
+
+def test_replay_goes_through_the_ring(recorded):
+    assert recorded == [event for event in demonstration() if event.kind in ("press", "release")]
+
+
+def test_noise_is_dropped(recorded):
+    clicks = extract_clicks(recorded, exclude=[RECORDER_WINDOW])
+    assert [(click.x, click.y) for click in clicks] == [
+        (x + dx, y + dy) for dx, dy in WIGGLE for x, y in SPOTS
+    ]
+    assert all(click.hold == pytest.approx(HOLD) for click in clicks)
+
+
+def test_without_exclusions_the_recorder_window_clicks_stay(recorded):
+    clicks = extract_clicks(recorded)
+    assert [(click.x, click.y) for click in clicks][-1] == (30, 10)
+    assert (20, 20) in [(click.x, click.y) for click in clicks]
+
+
+def test_looser_limits_keep_drags_and_bounces(recorded):
+    clicks = extract_clicks(recorded, max_hold=2.0, max_slip=50, debounce=0.0, exclude=[RECORDER_WINDOW])
+    assert len(clicks) == 4 * len(SPOTS) + 3
+
+
+@pytest.mark.parametrize("labels, period", [
+    ([0, 1, 2, 0, 1, 2, 0, 1], 3),
+    ([0, 0, 0], 1),
+    ([0, 1, 0, 2], 4),
+    ([0, 1, 2, 0, 1, 3], 6),
+    ([], 0),
+])
+def test_find_period(labels, period):
+    assert find_period(labels) == period
+
+
+def test_steps_cover_one_pass_with_the_observed_delays(recorded):
+    steps = build_steps(extract_clicks(recorded, exclude=[RECORDER_WINDOW]))
+    assert [(step.x, step.y) for step in steps] == [(x + 1, y + 1) for x, y in SPOTS]
+    assert [step.name for step in steps] == ["Step 1", "Step 2", "Step 3"]
+    assert all(step.radius == 5 for step in steps)  # the wiggle is within the minimum radius
+    # The last pass has no gap after its final click, so the last step saw only three
+    assert [(step.delay_min, step.delay_max) for step in steps] == [(1.0, 1.4), (0.4, 0.6), (2.0, 2.5)]
+
+
+def test_radius_covers_the_spread_up_to_the_cluster_radius():
+    clicks = extract_clicks(clicked_at([100, 120, 90], y=50))
+    assert [(step.x, step.radius) for step in build_steps(clicks)] == [(103, 17)]
+    assert build_steps(clicks, cluster_radius=12) != build_steps(clicks)
+
+
+def test_a_single_click_gets_the_default_delay():
+    steps = build_steps(extract_clicks([InputEvent(0.0, "press", 9, 9), InputEvent(0.1, "release", 9, 9)]))
+    assert [(step.delay_min, step.delay_max) for step in steps] == [(2.0, 3.0)]
+    assert build_steps([]) == []
+
+
+def test_relative_config_is_offset_by_the_window_origin(recorded):
+    config = build_config("Farm", recorded, origin=(50, 80), exclude=[RECORDER_WINDOW])
+    assert config.relative
+    assert [(step.x, step.y) for step in config.steps] == [(x + 1 - 50, y + 1 - 80) for x, y in SPOTS]
+
+
+def test_ring_counts_what_the_reader_fell_behind_on():
+    ring = EventRing(size=4)
+    for n in range(6):
+        ring.push(float(n), n, n, n % 2 == 0)
+    events = ring.drain()
+    assert [event.time for event in events] == [2.0, 3.0, 4.0, 5.0]
+    assert ring.dropped == 2
+    assert ring.drain() == []
+
+
+def test_recorder_keeps_only_left_button_events():
+    class Mouse:
+        class Button:
+            left, right = "left", "right"
+
+        class Listener:
+            def __init__(self, on_click):
+                self.on_click = on_click
+                self.running = False
+
+            def start(self):
+                self.running = True
+
+            def stop(self):
+                self.running = False
+
+            def join(self):
+                pass
+
+    recorder = MacroRecorder(clock=iter([1.0, 1.1, 2.0, 2.1]).__next__, mouse_module=Mouse)
+    recorder.start()
+    assert recorder.recording
+    on_click = recorder._listener.on_click
+    on_click(10.6, 20.2, "left", True)
+    on_click(10, 20, "right", True)
+    on_click(10, 20, "left", False)
+    events = recorder.stop()
+    assert not recorder.recording
+    assert events == [InputEvent(1.0, "press", 10, 20), InputEvent(1.1, "release", 10, 20)]
+    recorder.clear()
+    assert recorder.drain() == []
+
+
+def test_cli_saves_the_recording_as_a_config(tmp_path, capsys):
+    events = str(tmp_path / "events.jsonl")
+    store = str(tmp_path / "configs.json")
+    save_events(events, clicked_at([100, 400, 100, 400]))
+    assert main([events, "--name", "Farm Loop", "--config-file", store]) == 0
+    assert "Saved 2 steps as 'Farm Loop'" in capsys.readouterr().out
+    assert [step.x for step in JsonConfigStore(store).get("Farm Loop").steps] == [100, 400]
+    assert main([events, "--name", "Farm Loop", "--config-file", store]) == 2
+
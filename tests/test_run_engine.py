@@ -0,0 +1,124 @@
+"""RunEngine end to end, headless: recorded clicks, synthetic screens and a virtual clock."""
+import numpy as np
+import pytest
+
+from input_backend import RecordingInputBackend
+from models import Config, Step
+from run_engine import RunEngine, RunListener
+from scheduler import DeadlineScheduler
+from screen_capture import CapturePipeline, SyntheticSource
+from simulator import SimulatedWindow, VirtualClock, VirtualWaiter
+from template_match import TemplateCache
+
+SCREEN = np.random.default_rng(7).integers(0, 255, (200, 300), dtype=np.uint8)
+BLANK = np.zeros_like(SCREEN)
+
+
+class Listener(RunListener):
+    def __init__(self):
+        self.errors = []
+        self.cycles = 0
+
+    def on_error(self, message):
+        self.errors.append(message)
+
+    def on_cycle(self, repeat_index, seconds):
+        self.cycles += 1
+
+
+def make_engine(config, repeat, frames=lambda: BLANK, seed=1, templates=None, **options):
+    clock = VirtualClock()
+    backend = RecordingInputBackend(sleep=clock.advance, clock=clock)
+    listener = Listener()
+    capture = CapturePipeline(SyntheticSource(frames))
+    engine = RunEngine(config, SimulatedWindow(0, 0, 300, 200), repeat, backend, listener,
+                       waiter=VirtualWaiter(clock), scheduler=DeadlineScheduler(clock), seed=seed,
+                       capture=capture, owns_capture=True, templates=templates, **options)
+    return engine, backend, listener
+
+
+def clicks(backend):
+    return [(event.x, event.y) for event in backend.clicks()]
+
+
+def template_config(timeout=1.0):
+    templates = TemplateCache()
+    templates.put("button", SCREEN[60:80, 110:140])
+    config = Config("vision")
+    config.steps = [Step(0, 0, 0, 0.5, 1.0, name="button", kind="click_template", template="button",
+                         timeout=timeout, poll_interval=0.05)]
+    return config, templates
+
+
+def test_clicks_land_inside_each_circle():
+    config = Config("clicks")
+    config.steps = [Step(50, 60, 5, 0.1, 0.2), Step(200, 120, 0, 0.1, 0.2)]
+    engine, backend, listener = make_engine(config, 20)
+    engine.run()
+    points = clicks(backend)
+    assert listener.errors == [] and listener.cycles == 20
+    assert len(points) == 40
+    assert all(np.hypot(x - 50, y - 60) <= 5 for x, y in points[::2])
+    assert set(points[1::2]) == {(200, 120)}
+
+
+def test_same_seed_replays_the_same_clicks():
+    config = Config("seeded")
+    config.steps = [Step(100, 100, 20, 0.1, 0.3, distribution="gaussian")]
+    runs = []
+    for _ in range(2):
+        engine, backend, _ = make_engine(config, 50, seed=42)
+        engine.run()
+        runs.append(clicks(backend))
+    assert runs[0] == runs[1]
+
+
+def test_template_still_on_screen_is_found_every_pass():
+    config, templates = template_config()
+    engine, backend, listener = make_engine(config, 3, frames=lambda: SCREEN, templates=templates)
+    engine.run()
+    assert listener.errors == []
+    assert clicks(backend) == [(125, 70)] * 3
+
+
+def test_template_that_never_shows_times_out():
+    config, templates = template_config(timeout=0.5)
+    engine, backend, listener = make_engine(config, 1, templates=templates)
+    engine.run()
+    assert clicks(backend) == []
+    assert listener.errors == ["button: button not found within 0.5s"]
+
+
+def test_template_found_once_it_appears():
+    config, templates = template_config()
+    frames = [BLANK] * 3 + [SCREEN]
+    engine, backend, listener = make_engine(config, 1, frames=frames, templates=templates)
+    engine.run()
+    assert listener.errors == []
+    assert clicks(backend) == [(125, 70)]
+
+
+def test_stop_from_a_listener_ends_the_run():
+    config = Config("stop")
+    config.steps = [Step(10, 10, 0, 0.1, 0.2)]
+    engine, backend, listener = make_engine(config, 0)
+
+    def on_progress(done, total):
+        if done == 5:
+            engine.stop()
+
+    listener.on_progress = on_progress
+    engine.run()
+    assert engine.stopped
+    assert len(clicks(backend)) == 5
+
+
+@pytest.mark.parametrize("steps", [
+    [Step(0, 0, 0, 0, 0, kind="loop", count=0), Step(0, 0, 0, 0, 0, kind="end_loop")],
+    [Step(0, 0, 0, 0, 0, kind="label", target="top"), Step(0, 0, 0, 0, 0, kind="goto", target="top")],
+])
+def test_loops_without_a_click_are_refused(steps):
+    config = Config("spin")
+    config.steps = steps
+    with pytest.raises(ValueError, match="loop forever"):
+        make_engine(config, 1)
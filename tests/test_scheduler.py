@@ -0,0 +1,99 @@
+"""DeadlineScheduler and PrecisionWaiter on an injected clock."""
+import pytest
+
+import scheduler
+from scheduler import DeadlineScheduler, PrecisionWaiter
+
+
+class FakeTime:
+    """A clock that moves a little on every read and an OS sleep that oversleeps by `overshoot`"""
+
+    def __init__(self, overshoot=0.0, tick=1e-5):
+        self.now = 100.0
+        self.overshoot = overshoot
+        self.tick = tick
+        self.sleeps = []
+
+    def clock(self):
+        self.now += self.tick
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        if seconds > 0:
+            self.now += seconds + self.overshoot
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(scheduler.time, "sleep", fake.sleep)
+    return fake
+
+
+def test_wait_sleeps_until_the_spin_window_then_spins(fake):
+    waiter = PrecisionWaiter(spin_threshold=0.002, clock=fake.clock)
+    deadline = fake.now + 0.5
+    assert waiter.wait_until(deadline)
+    assert fake.now >= deadline
+    assert fake.sleeps[0] == pytest.approx(0.498, abs=1e-4)
+    assert all(seconds == 0 for seconds in fake.sleeps[1:])  # the rest is spun
+
+
+def test_cancelled_wait_returns_false_before_the_deadline(fake):
+    waiter = PrecisionWaiter(spin_threshold=0.002, clock=fake.clock)
+    deadline = fake.now + 0.5
+    assert not waiter.wait_until(deadline, cancelled=lambda: True)
+    assert fake.now < deadline
+    assert not waiter.spin_until(deadline, cancelled=lambda: True)
+    assert waiter.spin_until(fake.now - 1.0, cancelled=lambda: True)  # a deadline already passed isn't cancelled
+
+
+@pytest.mark.parametrize("overshoot, threshold", [(0.003, 0.004), (0.0, 0.002), (0.2, 0.025)])
+def test_calibrate_sizes_the_spin_window_from_sleep_overshoot(fake, overshoot, threshold):
+    fake.overshoot = overshoot
+    waiter = PrecisionWaiter(clock=fake.clock)
+    accuracy = waiter.calibrate(target=0.002, samples=10)
+    assert waiter.spin_threshold == pytest.approx(threshold, abs=1e-4)
+    # Calibrated on the sleep wait_until uses, so later waits are spun out to the deadline
+    assert 0.001 in fake.sleeps
+    assert accuracy == waiter.accuracy < 1e-4 + max(overshoot - threshold, 0.0)
+
+
+def test_deadlines_accumulate_from_the_plan_not_the_clicks():
+    now = [10.0]
+    plan = DeadlineScheduler(lambda: now[0], focus_settle=0.5, max_lag=0.05)
+    plan.start()
+    assert plan.next_deadline == 10.5 and plan.activation_deadline() == 10.0
+    deadlines = []
+    for step in range(5):
+        deadlines.append(plan.next_deadline)
+        actual = plan.next_deadline + 0.04  # always a little late, never late enough to re-base
+        timing = plan.complete(step, actual, hold=0.1, delay=1.9)
+        assert timing.planned == pytest.approx(deadlines[-1] - 10.0)
+        assert timing.error == pytest.approx(0.04)
+    assert deadlines == pytest.approx([10.5 + 2.0 * n for n in range(5)])
+
+
+def test_a_click_later_than_max_lag_rebases_the_plan():
+    plan = DeadlineScheduler(lambda: 0.0, focus_settle=0.0, max_lag=0.05)
+    plan.start()
+    timing = plan.complete(0, 0.3, hold=0.1, delay=1.0)
+    assert timing.error == pytest.approx(0.3)
+    # The next delay is measured from the late click, so it isn't shortened by the stall
+    assert plan.next_deadline == pytest.approx(0.3 + 1.1)
+    plan.complete(1, 1.4 + 0.04, hold=0.1, delay=1.0)
+    assert plan.next_deadline == pytest.approx(1.4 + 1.1)
+
+
+def test_pauses_and_cycle_gaps_push_the_plan_back():
+    now = [5.0]
+    plan = DeadlineScheduler(lambda: now[0], focus_settle=1.0, cycle_gap=2.0, lead_in=0.25)
+    plan.start()
+    assert plan.next_deadline == 5.25
+    plan.shift(3.0)
+    assert (plan.origin, plan.next_deadline) == (8.0, 8.25)
+    plan.end_cycle()
+    assert plan.next_deadline == 10.25
+    timing = plan.complete(0, 10.25, hold=0.0, delay=0.0)
+    assert timing.planned == pytest.approx(2.25) and timing.error == pytest.approx(0.0)
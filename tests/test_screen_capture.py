@@ -0,0 +1,47 @@
+"""CapturePipeline change detection and MatcherPool's shared-memory workers."""
+import numpy as np
+
+import screen_capture
+from input_backend import RecordingInputBackend
+from models import Config, Step
+from run_engine import RunEngine
+from scheduler import DeadlineScheduler
+from screen_capture import CapturePipeline, MatcherPool, SyntheticSource
+from simulator import SimulatedWindow, VirtualClock, VirtualWaiter
+
+SCREEN = np.random.default_rng(11).integers(0, 255, (120, 160), dtype=np.uint8)
+
+
+def test_unchanged_pixels_are_reported_unchanged():
+    screens = [SCREEN, SCREEN, SCREEN[::-1]]
+    capture = CapturePipeline(SyntheticSource(screens))
+    try:
+        changed = [capture.capture(0, (10, 10, 40, 30)).changed for _ in range(3)]
+        assert changed == [True, False, True]
+        capture.invalidate()
+        assert capture.capture(0, (10, 10, 40, 30)).changed
+    finally:
+        capture.close()
+
+
+def test_pool_workers_keep_a_bounded_number_of_segments(tmp_path):
+    template = str(tmp_path / "button.npy")
+    np.save(template, SCREEN[40:60, 50:90])
+    config = Config("vision")
+    config.steps = [Step(0, 0, 0, 0.1, 0.2, kind="click_template", template=template, timeout=1.0)]
+    matchers = MatcherPool(processes=1)
+    try:
+        for run in range(screen_capture.WORKER_SEGMENTS + 8):
+            clock = VirtualClock()
+            backend = RecordingInputBackend(sleep=clock.advance, clock=clock)
+            # Each run gets its own rings, so its own segments, like a new job or window size does
+            capture = CapturePipeline(SyntheticSource(lambda: SCREEN))
+            engine = RunEngine(config, SimulatedWindow(0, 0, 160, 120), 2, backend, waiter=VirtualWaiter(clock),
+                               scheduler=DeadlineScheduler(clock), capture=capture, owns_capture=True,
+                               matchers=matchers)
+            engine.run()
+            assert [(event.x, event.y) for event in backend.clicks()] == [(70, 50)] * 2
+            segments = matchers._executor.submit(screen_capture._worker_segment_count).result()
+            assert segments == min(run + 1, screen_capture.WORKER_SEGMENTS)
+    finally:
+        matchers.close()
@@ -0,0 +1,60 @@
+"""Configs dry-run on the virtual clock, including on monitors left of and above the primary."""
+import pytest
+
+from models import Config, Step
+from simulator import SimulatedWindow, simulate
+
+LEFT_MONITOR = SimulatedWindow(-2000, -300, 1920, 1080)
+
+
+def vision_config():
+    config = Config("vision", relative=True)
+    config.steps = [
+        Step(100, 100, 5, 0.5, 1.0, name="Click"),
+        Step(0, 0, 0, 0.5, 1.0, name="Find", kind="click_template", template="button.png", region=[10, 10, 50, 40]),
+        Step(0, 0, 0, 0, 0, kind="branch", target="end", condition="template", template="popup.png"),
+        Step(300, 200, 5, 0.5, 1.0, name="Skipped"),
+        Step(0, 0, 0, 0, 0, kind="label", target="end"),
+    ]
+    return config
+
+
+@pytest.mark.parametrize("window", [SimulatedWindow(), LEFT_MONITOR, SimulatedWindow(-100, 50, 640, 480)])
+def test_vision_steps_simulate_wherever_the_window_is(window):
+    report = simulate(vision_config(), repeat=20, window=window, seed=1)
+    assert report.error is None and report.repeats == 20
+    click, found = report.spreads
+    assert (round(click.mean_x), round(click.mean_y)) == (window.left + 100, window.top + 100)
+    # Found templates are clicked in the middle of their region, relative to the window
+    assert (found.mean_x, found.mean_y) == (window.left + 35, window.top + 30)
+    assert found.std_x == found.std_y == 0
+    assert click.outside == found.outside == 0
+
+
+def test_steps_past_the_window_edge_are_reported():
+    config = Config("edges", relative=True)
+    config.steps = [Step(5, 500, 20, 0.1, 0.2, name="Edge"), Step(900, 500, 20, 0.1, 0.2, name="Middle")]
+    report = simulate(config, repeat=200, window=LEFT_MONITOR, seed=2)
+    assert report.outside == [0]
+    assert report.spreads[0].outside > 0 and report.spreads[1].outside == 0
+    assert not report.ok
+
+
+def test_cycle_times_follow_the_delays():
+    config = Config("timed")
+    config.steps = [Step(10, 10, 0, 1.0, 1.0), Step(20, 20, 0, 2.0, 2.0)]
+    report = simulate(config, repeat=50, seed=3)
+    assert report.steps == 100
+    # Two fixed delays, the holds and the gap between passes
+    assert 3.0 < report.cycle_mean < 4.5
+    assert report.simulated_seconds > 50 * 3.0
+
+
+def test_cancelled_and_endless_simulations_stop_early():
+    config = Config("endless")
+    config.steps = [Step(0, 0, 0, 0, 0, kind="loop", count=0), Step(10, 10, 0, 0.1, 0.2),
+                    Step(0, 0, 0, 0, 0, kind="end_loop")]
+    report = simulate(config, repeat=1, max_steps=500)
+    assert report.truncated and report.steps == 500 and report.repeats == 0
+    report = simulate(config, repeat=1, cancelled=lambda: True)
+    assert report.steps == 1 and not report.truncated
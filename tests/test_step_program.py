@@ -0,0 +1,223 @@
+"""What StepProgram compiles configs to, what it refuses, and how the engine runs the result."""
+import numpy as np
+import pytest
+
+from models import Config, Step
+from step_program import (
+    OP_BRANCH, OP_CALL, OP_END, OP_JUMP, OP_LOOP, OP_NEXT, OP_RETURN, OP_STEP, ProgramError, StepProgram, _Compiler,
+)
+from template_match import TemplateCache
+from test_run_engine import BLANK, SCREEN, clicks, make_engine
+
+
+def click(x):
+    return Step(x, 10, 0, 0.1, 0.2, name=f"click {x}")
+
+
+def control(kind, target="", count=1, **options):
+    return Step(0, 0, 0, 0, 0, kind=kind, target=target, count=count, **options)
+
+
+def config(name, *steps):
+    built = Config(name)
+    built.steps = list(steps)
+    return built
+
+
+def resolver(*configs):
+    by_name = {each.name: each for each in configs}
+    return by_name.__getitem__
+
+
+def ran(program_config, repeat=1, configs=None, **options):
+    """The x of every click a headless run of the config made"""
+    engine, backend, listener = make_engine(program_config, repeat, configs=configs, **options)
+    engine.run()
+    assert listener.errors == []
+    return [x for x, _ in clicks(backend)]
+
+
+def test_flat_config_is_one_step_per_click():
+    program = StepProgram(config("flat", click(10), click(20)))
+    assert program.ops == [OP_STEP, OP_STEP, OP_END]
+    assert program.args == [0, 1, 0]
+    assert program.origins == [0, 1, -1]
+    assert program.steps_per_pass == 2 and program.call_depth == 0
+    assert program.steps["x"].tolist() == [10, 20]
+
+
+def test_nested_loops_jump_back_to_their_own_start():
+    nested = config("nested", control("loop", count=2), click(10), control("loop", count=3), click(20),
+                    control("end_loop"), control("end_loop"), click(30))
+    program = StepProgram(nested)
+    assert program.ops == [OP_LOOP, OP_STEP, OP_LOOP, OP_STEP, OP_NEXT, OP_NEXT, OP_STEP, OP_END]
+    assert program.loop_counts == [2, 3]
+    assert program.targets[4] == 3 and program.targets[5] == 1
+    assert program.steps_per_pass == 2 * (1 + 3) + 1
+    assert ran(nested) == [10, 20, 20, 20] * 2 + [30]
+
+
+def test_goto_jumps_to_its_label():
+    skipping = config("skip", click(10), control("goto", "end"), click(20), control("label", "end"), click(30))
+    program = StepProgram(skipping)
+    assert program.ops == [OP_STEP, OP_JUMP, OP_STEP, OP_STEP, OP_END]
+    assert program.targets[1] == 3
+    assert program.steps_per_pass is None  # a goto makes the count unknowable
+    assert ran(skipping, repeat=2) == [10, 30] * 2
+
+
+def test_called_configs_are_emitted_once_after_the_caller():
+    leaf = config("leaf", click(3))
+    helper = config("helper", click(2), control("call", "leaf"))
+    main = config("main", click(1), control("call", "helper"), control("call", "helper"))
+    program = StepProgram(main, resolve=resolver(leaf, helper))
+    assert program.ops == [OP_STEP, OP_CALL, OP_CALL, OP_END, OP_STEP, OP_CALL, OP_RETURN, OP_STEP, OP_RETURN]
+    assert program.args[1] == program.args[2] == 4 and program.args[5] == 7
+    assert program.origins[4:] == [-1] * 5
+    assert program.slot_sources == [("main", 0), ("helper", 0), ("leaf", 0)]
+    assert program.config_names == {"main", "helper", "leaf"}
+    assert program.call_depth == 2
+    assert program.steps_per_pass == 1 + 2 * 2
+    assert ran(main, repeat=2, configs=resolver(leaf, helper)) == [1, 2, 3, 2, 3] * 2
+
+
+def test_call_depth_sizes_the_call_stack():
+    chain = [config("level 0", click(0))]
+    for level in range(1, 6):
+        chain.append(config(f"level {level}", control("call", f"level {level - 1}"), click(level)))
+    program = StepProgram(chain[-1], resolve=resolver(*chain))
+    assert program.call_depth == 5
+    assert ran(chain[-1], configs=resolver(*chain)) == [0, 1, 2, 3, 4, 5]
+
+
+@pytest.mark.parametrize("steps, configs, message", [
+    ([control("label", "a"), click(1), control("label", "a")], (), "'bad' step 3: duplicate label 'a'"),
+    ([click(1), control("end_loop")], (), "'bad' step 2: end_loop without a loop"),
+    ([control("loop", count=2), click(1)], (), "'bad' step 1: loop is never closed"),
+    ([click(1), control("goto", "nowhere")], (), "'bad' step 2: no label 'nowhere'"),
+    ([click(1), control("branch", "nowhere", count=2)], (), "'bad' step 2: no label 'nowhere'"),
+    ([control("call", "bad")], (), "'bad' step 1: call cycle bad -> bad"),
+    ([control("call", "other")], (config("other", control("call", "bad")),), "call cycle bad -> other -> bad"),
+    ([control("call", "missing")], (config("other"),), "'bad' step 1: no config named 'missing'"),
+    ([control("call", "other")], None, "'bad' step 1: no configs to call 'other' from"),
+])
+def test_malformed_programs_are_refused(steps, configs, message):
+    resolve = None if configs is None else resolver(*configs)
+    with pytest.raises(ProgramError, match=message):
+        StepProgram(config("bad", *steps), resolve=resolve)
+
+
+def test_a_program_error_is_a_value_error():
+    with pytest.raises(ValueError):
+        StepProgram(config("bad", control("end_loop")))
+
+
+# Callees used inside an endless loop: the loop is only allowed when every way through them clicks
+ALWAYS = config("always", click(1))
+SKIPPABLE = config("skippable", control("branch", "end", count=2), click(1), control("label", "end"))
+JUMPED_OVER = config("jumped over", control("goto", "end"), click(1), control("label", "end"))
+EMPTY = config("empty", control("label", "nothing"))
+NESTED_ALWAYS = config("nested always", control("call", "always"))
+NESTED_EMPTY = config("nested empty", control("call", "empty"))
+EITHER_WAY = config("either way", control("branch", "second", count=2), click(1), control("goto", "end"),
+                    control("label", "second"), click(2), control("label", "end"))
+CALLEES = resolver(ALWAYS, SKIPPABLE, JUMPED_OVER, EMPTY, NESTED_ALWAYS, NESTED_EMPTY, EITHER_WAY)
+
+
+def forever(callee):
+    return config("forever", control("loop", count=0), control("call", callee), control("end_loop"))
+
+
+@pytest.mark.parametrize("callee", ["always", "nested always", "either way"])
+def test_endless_loop_over_a_callee_that_always_clicks_compiles(callee):
+    program = StepProgram(forever(callee), resolve=CALLEES)
+    assert program.steps_per_pass is None
+
+
+@pytest.mark.parametrize("callee", ["skippable", "jumped over", "empty", "nested empty"])
+def test_endless_loop_over_a_callee_that_can_skip_its_click_is_refused(callee):
+    with pytest.raises(ProgramError, match="'forever' step 2: control flow can loop forever"):
+        StepProgram(forever(callee), resolve=CALLEES)
+
+
+def test_callee_timing_is_decided_once_per_callee(monkeypatch):
+    looked_through = []
+    successors = _Compiler._successors
+
+    def counting(self, address):
+        looked_through.append(address)
+        return successors(self, address)
+
+    monkeypatch.setattr(_Compiler, "_successors", counting)
+    twice = config("twice", control("loop", count=0), control("call", "nested skippable"), control("end_loop"),
+                   control("call", "nested skippable"), click(1))
+    callees = resolver(SKIPPABLE, config("nested skippable", control("call", "skippable"), click(2)))
+    compiler = _Compiler(callees)
+    compiler.compile(twice)
+    nested, skippable = compiler.args[1], compiler.args[compiler.args[1]]
+    assert compiler._callee_timed == {nested: True, skippable: False}
+    # The cycle check walks each instruction once; each callee body is only walked once more, when first called
+    assert looked_through.count(nested) == 2 and looked_through.count(skippable) == 2
+
+
+@pytest.mark.parametrize("steps", [
+    [control("label", "top"), control("branch", "top", count=1)],
+    [control("label", "top"), click(1), control("label", "spin"), control("goto", "spin")],
+    [control("loop", count=0), control("loop", count=3), control("end_loop"), control("end_loop")],
+])
+def test_loops_without_a_click_are_refused(steps):
+    with pytest.raises(ProgramError, match="loop forever"):
+        StepProgram(config("spin", *steps))
+
+
+def test_counted_loop_without_a_click_runs_out():
+    program = StepProgram(config("counted", control("loop", count=3), control("end_loop"), click(1)))
+    assert program.ops == [OP_LOOP, OP_NEXT, OP_STEP, OP_END]
+
+
+def test_every_branch_is_taken_on_its_count():
+    every = config("every", control("loop", count=6), control("branch", "skip", count=3), click(1),
+                   control("label", "skip"), click(2), control("end_loop"))
+    program = StepProgram(every)
+    assert program.ops == [OP_LOOP, OP_BRANCH, OP_STEP, OP_STEP, OP_NEXT, OP_END]
+    assert program.targets[1] == 3
+    assert ran(every) == [1, 2, 1, 2, 2] * 2
+
+
+@pytest.mark.parametrize("percent, expected", [(100, [2]), (0, [1, 2])])
+def test_chance_branch_at_its_extremes(percent, expected):
+    chance = config("chance", control("branch", "skip", count=percent, condition="chance"), click(1),
+                    control("label", "skip"), click(2))
+    assert ran(chance, repeat=20) == expected * 20
+
+
+@pytest.mark.parametrize("frames, expected", [(lambda: SCREEN, [2]), (lambda: BLANK, [1, 2])])
+def test_template_branch_is_taken_while_its_template_shows(frames, expected):
+    templates = TemplateCache()
+    templates.put("button", SCREEN[60:80, 110:140])
+    seen = config("seen", control("branch", "skip", condition="template", template="button"), click(1),
+                  control("label", "skip"), click(2))
+    assert ran(seen, repeat=3, frames=frames, templates=templates) == expected * 3
+
+
+def test_version_depends_on_the_configs_not_the_program_instance():
+    helper = config("helper", click(2))
+    main = config("main", click(1), control("call", "helper"))
+    version = StepProgram(main, seed=1, resolve=resolver(helper)).version
+    assert StepProgram(main, seed=2, resolve=resolver(helper)).version == version
+    assert StepProgram(main.snapshot(), resolve=resolver(helper.snapshot())).version == version
+
+    helper.steps[0].ready = {"samples": [0.3], "early": []}
+    assert StepProgram(main, resolve=resolver(helper)).version == version
+    helper.steps[0].radius = 4
+    assert StepProgram(main, resolve=resolver(helper)).version != version
+
+
+def test_gaussian_clicks_scatter_evenly_around_the_centre():
+    program = StepProgram(config("gaussian", Step(0, 0, 40, 0.1, 0.2, distribution="gaussian")), seed=5)
+    batch = program.sample(20000)
+    dx, dy = np.array(batch.dx)[:, 0], np.array(batch.dy)[:, 0]
+    assert np.hypot(dx, dy).max() <= 40
+    assert abs(dx.mean()) < 0.5 and abs(dy.mean()) < 0.5
+    assert dx.std() == pytest.approx(dy.std(), rel=0.05)
+    assert abs(np.corrcoef(dx, dy)[0, 1]) < 0.05
@@ -0,0 +1,108 @@
+"""Template matching on synthetic frames: random backgrounds with a template pasted in."""
+import os
+
+import numpy as np
+import pytest
+
+from template_match import Template, TemplateCache, match_template, ncc_map
+
+RNG = np.random.default_rng(5)
+BACKGROUND = RNG.integers(0, 255, (240, 320)).astype(np.float32)
+PATCH = RNG.integers(0, 255, (36, 48)).astype(np.float32)
+
+
+def pasted(x, y, background=BACKGROUND, patch=PATCH, noise=0.0):
+    frame = background.copy()
+    h, w = patch.shape
+    frame[y:y + h, x:x + w] = patch
+    if noise:
+        frame += np.random.default_rng(1).normal(0.0, noise, frame.shape)
+    return frame
+
+
+def brute_ncc(image, template):
+    h, w = template.shape
+    t = template - template.mean()
+    scores = np.zeros((image.shape[0] - h + 1, image.shape[1] - w + 1))
+    for y in range(scores.shape[0]):
+        for x in range(scores.shape[1]):
+            window = image[y:y + h, x:x + w]
+            window = window - window.mean()
+            scores[y, x] = (window * t).sum() / np.sqrt((window * window).sum() * (t * t).sum())
+    return scores
+
+
+def test_ncc_peak_is_at_the_paste_offset():
+    scores = ncc_map(pasted(97, 41), PATCH)
+    assert scores.shape == (240 - 36 + 1, 320 - 48 + 1)
+    y, x = np.unravel_index(np.argmax(scores), scores.shape)
+    assert (x, y) == (97, 41)
+    assert scores[y, x] == pytest.approx(1.0, abs=1e-4)
+
+
+def test_ncc_matches_the_direct_formula():
+    image = RNG.integers(0, 255, (30, 40)).astype(np.float32)
+    template = image[8:18, 12:27]
+    np.testing.assert_allclose(ncc_map(image, template), brute_ncc(image, template), atol=1e-4)
+
+
+def test_flat_windows_score_zero():
+    image = np.full((40, 40), 128.0)
+    image[20:, 20:] = RNG.integers(0, 255, (20, 20))
+    scores = ncc_map(image, PATCH[:10, :10])
+    assert not np.isnan(scores).any()
+    assert (scores[:10, :10] == 0).all()
+
+
+@pytest.mark.parametrize("x, y", [(0, 0), (97, 41), (272, 204), (151, 100)])
+def test_pyramid_search_agrees_with_full_resolution(x, y):
+    frame = pasted(x, y, noise=20.0)
+    coarse = match_template(frame, Template(PATCH))
+    full = match_template(frame, Template(PATCH, max_levels=1))
+    assert len(Template(PATCH).levels) > 1
+    assert coarse is not None and full is not None
+    assert (coarse.x, coarse.y) == (full.x, full.y) == (x + 48 // 2, y + 36 // 2)
+    assert coarse.score == pytest.approx(full.score, abs=1e-4)
+
+
+def test_colour_frames_are_matched_in_grayscale():
+    frame = np.repeat(pasted(60, 30)[..., None], 3, axis=2)
+    match = match_template(frame, Template(PATCH))
+    assert (match.x, match.y) == (60 + 24, 30 + 18)
+
+
+def test_scores_below_the_threshold_are_no_match():
+    absent = RNG.integers(0, 255, PATCH.shape).astype(np.float32)
+    assert match_template(BACKGROUND, Template(absent), threshold=0.8) is None
+    faint = pasted(97, 41, noise=200.0)
+    found = match_template(faint, Template(PATCH), threshold=0.0)
+    assert found is not None and found.score < 0.8
+    assert match_template(faint, Template(PATCH), threshold=0.8) is None
+
+
+def test_template_larger_than_the_region_is_no_match():
+    region = BACKGROUND[:30, :60]
+    assert ncc_map(region, PATCH).size == 0
+    assert match_template(region, Template(PATCH), threshold=0.0) is None
+
+
+def test_cache_reloads_a_template_once_its_file_changes(tmp_path):
+    path = str(tmp_path / "button.npy")
+    np.save(path, PATCH)
+    cache = TemplateCache()
+    first = cache.get(path)
+    assert cache.get(path) is first
+
+    np.save(path, PATCH[:20, :20])
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 5))
+    reloaded = cache.get(path)
+    assert reloaded is not first and reloaded.shape == (20, 20)
+
+
+def test_put_registers_an_in_memory_template():
+    cache = TemplateCache()
+    template = cache.put("synthetic", PATCH)
+    assert cache.get("synthetic") is template
+    match = match_template(pasted(10, 20), template)
+    assert (match.x, match.y) == (10 + 24, 20 + 18)
@@ -0,0 +1,64 @@
+"""WindowRegistry polling against fake window enumerations."""
+import logging
+import threading
+
+from window_registry import WindowInfo, WindowRegistry
+
+
+class Window:
+    def __init__(self, handle, title, pid=1, left=0, top=0, width=800, height=600, active=False):
+        self.info = WindowInfo(handle, title, pid, left, top, width, height, active)
+
+
+def registry_of(windows, **options):
+    return WindowRegistry(enumerate_windows=lambda: windows, describe=lambda window: window.info, **options)
+
+
+def test_lookups_come_from_the_last_poll():
+    game, editor = Window(1, "Game", pid=7), Window(2, "Editor", pid=8)
+    registry = registry_of([game, editor, Window(3, "  ")])
+    registry.poll()
+    assert sorted(registry.titles()) == ["Editor", "Game"]
+    assert registry.find("Game") is game
+    assert registry.find(pid=8) is editor
+    assert registry.find("Game", pid=8) is None
+    assert registry.info(game).pid == 7
+
+
+def test_listeners_hear_only_about_changes():
+    windows = [Window(1, "Game")]
+    registry = registry_of(windows)
+    heard = []
+    registry.add_listener(lambda changed, titles_changed: heard.append(([i.handle for i in changed], titles_changed)))
+    registry.poll()
+    registry.poll()
+    windows[0] = Window(1, "Game", left=50)
+    registry.poll()
+    assert heard == [([1], True), ([1], False)]
+
+
+def test_a_failing_poll_is_logged_once_until_it_recovers(caplog):
+    polls = []
+    seen = threading.Event()
+
+    def enumerate_windows():
+        polls.append(None)
+        if len(polls) == 8:
+            seen.set()
+        if len(polls) < 5:
+            raise OSError("window manager went away")
+        if len(polls) < 7:
+            return []
+        raise OSError("window manager went away")
+
+    registry = WindowRegistry(interval=0.001, enumerate_windows=enumerate_windows)
+    with caplog.at_level(logging.INFO, logger="window_registry"):
+        registry.start()
+        assert seen.wait(5.0)
+        registry.stop()
+    assert [record.getMessage() for record in caplog.records] == [
+        "Window enumeration failed: window manager went away",
+        "Window enumeration recovered",
+        "Window enumeration failed: window manager went away",
+    ]
+    assert registry.error == "window manager went away"
@@ -0,0 +1,172 @@
+"""Curved, eased cursor paths streamed at a fixed event rate.
+
+Paths are generated in a canonical frame, from 0 to 1 on the complex
+plane, so one cached path serves any direction: mapping it onto a real move
+is a single complex multiply by the displacement. Each distance bucket has
+its own batch because the move's duration, and so its point count, grows
+with distance.
+"""
+import math
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from input_backend import InputBackend
+from telemetry import RingBuffer
+
+MOVE_RATE = 125  # cursor events per second
+PATH_BATCH = 32  # paths generated per bucket per vectorized call
+# Distance bucket upper bounds in pixels, 8 per doubling from 4 px to 8192 px
+DISTANCE_BUCKETS = [4 * 2 ** (i / 8) for i in range(89)]
+MIN_DISTANCE = 3  # shorter moves just jump
+
+
+def move_duration(distance: float) -> float:
+    """Seconds a hand takes to cover `distance` pixels, after Fitts' law for a ~20 px target"""
+    return 0.08 + 0.1 * math.log2(1 + distance / 20)
+
+
+def minimum_jerk(t: np.ndarray) -> np.ndarray:
+    """Position along a minimum-jerk move at normalized time t: slow start, fast middle, slow end"""
+    return t ** 3 * (10 - 15 * t + 6 * t ** 2)
+
+
+class _PathBatch:
+    __slots__ = ("paths", "row")
+
+    def __init__(self, paths: np.ndarray):
+        self.paths = paths
+        self.row = 0
+
+
+class TrajectoryCache:
+    """Batches of canonical paths per distance bucket, refilled when used up.
+
+    A path is a quadratic Bezier from 0 to 1 whose control point is pulled
+    off the straight line by a random amount up to about `curvature` of the
+    distance, walked with minimum-jerk timing and roughened by `noise`
+    pixels of jitter that fades out at both ends.
+    """
+
+    def __init__(self, rate: int = MOVE_RATE, batch: int = PATH_BATCH, seed: Optional[int] = None,
+                 curvature: float = 0.15, noise: float = 0.6):
+        self.rate = rate
+        self.batch = batch
+        self.curvature = curvature
+        self.noise = noise
+        self.rng = np.random.default_rng(seed)
+        self._batches: Dict[int, _PathBatch] = {}
+        self.generated = 0
+
+    def _generate(self, bucket: int) -> _PathBatch:
+        distance = DISTANCE_BUCKETS[bucket]
+        n = max(2, round(move_duration(distance) * self.rate))
+        rng = self.rng
+        t = np.linspace(0.0, 1.0, n + 1)[1:]  # the start point is where the cursor already is
+        s = minimum_jerk(t)
+        control = rng.uniform(0.3, 0.7, (self.batch, 1)) + 1j * rng.normal(0.0, self.curvature, (self.batch, 1))
+        paths = 2 * (1 - s) * s * control + s ** 2
+        shake = rng.standard_normal((self.batch, n)) + 1j * rng.standard_normal((self.batch, n))
+        paths += shake * (self.noise / distance) * np.sin(np.pi * t)
+        self.generated += self.batch
+        return _PathBatch(paths)
+
+    def path(self, x0: int, y0: int, x1: int, y1: int) -> Tuple[List[int], List[int]]:
+        """Screen points from just after (x0, y0) to exactly (x1, y1)"""
+        dx, dy = x1 - x0, y1 - y0
+        distance = math.hypot(dx, dy)
+        if distance < MIN_DISTANCE:
+            return [x1], [y1]
+        bucket = min(bisect_left(DISTANCE_BUCKETS, distance), len(DISTANCE_BUCKETS) - 1)
+        batch = self._batches.get(bucket)
+        if batch is None or batch.row == len(batch.paths):
+            batch = self._batches[bucket] = self._generate(bucket)
+        canonical = batch.paths[batch.row]
+        batch.row += 1
+        points = canonical * complex(dx, dy) + complex(x0, y0)
+        xs = np.rint(points.real).astype(np.int64).tolist()
+        ys = np.rint(points.imag).astype(np.int64).tolist()
+        xs[-1], ys[-1] = x1, y1
+        return xs, ys
+
+
+class TrajectoryStats(NamedTuple):
+    moves: int
+    events: int
+    cpu_per_event: float  # seconds of thread CPU per streamed event, waits included
+    jitter_p50: float  # seconds an event went out after its deadline
+    jitter_p99: float
+    jitter_max: float
+
+
+class TrajectoryMover:
+    """Moves the cursor along cached paths, one event every 1 / rate seconds.
+
+    Event k of a path goes out at `start + k / rate` and the click that ends
+    it belongs at `start + len(path) / rate`, so a caller that wants the click
+    on a deadline starts `duration(path)` before it. The cursor position is
+    tracked from the points sent; until the first click it is unknown and
+    that move is a jump.
+    """
+
+    def __init__(self, cache: Optional[TrajectoryCache] = None, rate: int = MOVE_RATE):
+        self.cache = cache or TrajectoryCache(rate)
+        self.period = 1.0 / self.cache.rate
+        self.position: Optional[Tuple[int, int]] = None
+        self.jitter = RingBuffer(4096)  # lateness of recent events
+        self.jitter_max = 0.0
+        self.moves = 0
+        self._cpu = 0.0
+
+    def plan(self, x: int, y: int) -> Optional[Tuple[List[int], List[int]]]:
+        if self.position is None:
+            return None
+        return self.cache.path(self.position[0], self.position[1], x, y)
+
+    @property
+    def max_duration(self) -> float:
+        """Duration of the longest path the cache can produce"""
+        return (round(move_duration(DISTANCE_BUCKETS[-1]) * self.cache.rate) + 1) * self.period
+
+    def duration(self, path: Tuple[List[int], List[int]]) -> float:
+        return len(path[0]) * self.period
+
+    def fit(self, path: Tuple[List[int], List[int]], seconds: float) -> Tuple[List[int], List[int]]:
+        """Drop evenly spaced points so the path takes at most `seconds`, i.e. move faster"""
+        xs, ys = path
+        n = len(xs)
+        m = max(1, int(seconds / self.period))
+        if m >= n:
+            return path
+        picks = [(i + 1) * n // m - 1 for i in range(m)]
+        return [xs[i] for i in picks], [ys[i] for i in picks]
+
+    def stream(self, backend: InputBackend, path: Tuple[List[int], List[int]], start: float,
+               wait_until: Callable[[float], bool], clock: Callable[[], float]) -> bool:
+        """Send the path and wait out its last period. Returns False if a wait was cancelled."""
+        xs, ys = path
+        period = self.period
+        jitter = self.jitter
+        cpu_started = time.thread_time()
+        try:
+            for k in range(len(xs)):
+                deadline = start + k * period
+                if not wait_until(deadline):
+                    return False
+                late = clock() - deadline
+                jitter.add(late)
+                if late > self.jitter_max:
+                    self.jitter_max = late
+                backend.move(xs[k], ys[k])
+                self.position = (xs[k], ys[k])
+            return wait_until(start + len(xs) * period)
+        finally:
+            self._cpu += time.thread_time() - cpu_started
+            self.moves += 1
+
+    def stats(self) -> TrajectoryStats:
+        events = self.jitter.count
+        p50, p99 = self.jitter.percentiles((50, 99))
+        return TrajectoryStats(self.moves, events, self._cpu / events if events else 0.0, p50, p99, self.jitter_max)
@@ -0,0 +1,188 @@
+import logging
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+
+class WindowInfo(NamedTuple):
+    handle: object
+    title: str
+    pid: int
+    left: int
+    top: int
+    width: int
+    height: int
+    active: bool
+
+
+def _pywinctl_windows():
+    import pywinctl
+    return pywinctl.getAllWindows()
+
+
+def _describe(window) -> WindowInfo:
+    return WindowInfo(
+        handle=window.getHandle(),
+        title=window.title,
+        pid=window.getPID(),
+        left=window.left,
+        top=window.top,
+        width=window.width,
+        height=window.height,
+        active=window.isActive,
+    )
+
+
+class WindowRegistry:
+    """Enumerates top-level windows on a background thread.
+
+    Window objects are cached by native handle and indexed by title and PID,
+    so lookups from the UI never touch the window manager. Each poll compares
+    geometry and focus against the previous snapshot and reports changes to
+    listeners as `listener(changed_infos, titles_changed)`; listeners are
+    called on the registry thread. A failing poll is logged once, not on
+    every tick it keeps failing, and `error` holds its message until a poll
+    succeeds again.
+    """
+
+    def __init__(self, interval: float = 1.0, enumerate_windows: Callable[[], list] = None,
+                 describe: Callable[[object], WindowInfo] = _describe):
+        self.interval = interval
+        self._enumerate = enumerate_windows or _pywinctl_windows
+        self._describe = describe
+        self._lock = threading.Lock()
+        self._windows: Dict[object, object] = {}
+        self._info: Dict[object, WindowInfo] = {}
+        self._by_title: Dict[str, List[object]] = {}
+        self._by_pid: Dict[int, List[object]] = {}
+        self._listeners: List[Callable[[List[WindowInfo], bool], None]] = []
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.error: Optional[str] = None
+
+    def add_listener(self, listener: Callable[[List[WindowInfo], bool], None]):
+        self._listeners.append(listener)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._poll_loop, name="window-registry", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def refresh(self):
+        """Ask the background thread to re-enumerate now"""
+        self._wake.set()
+
+    def _poll_loop(self):
+        while not self._stopping.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                message = str(e) or type(e).__name__
+                if message != self.error:
+                    log.warning("Window enumeration failed: %s", message)
+                self.error = message
+            else:
+                if self.error is not None:
+                    log.info("Window enumeration recovered")
+                self.error = None
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def poll(self):
+        """Enumerate once on the calling thread and notify listeners of changes"""
+        windows = {}
+        infos = {}
+        for window in self._enumerate():
+            try:
+                info = self._describe(window)
+            except Exception:
+                continue  # window closed while we were looking at it
+            if not info.title.strip():
+                continue
+            windows[info.handle] = self._windows.get(info.handle, window)
+            infos[info.handle] = info
+
+        with self._lock:
+            old_info = self._info
+            changed = [info for handle, info in infos.items() if old_info.get(handle) != info]
+            titles_changed = (
+                set(infos) != set(old_info)
+                or any(old_info[h].title != infos[h].title for h in infos if h in old_info)
+            )
+            self._windows = windows
+            self._info = infos
+            if titles_changed:
+                self._by_title = {}
+                self._by_pid = {}
+                for handle, info in infos.items():
+                    self._by_title.setdefault(info.title, []).append(handle)
+                    self._by_pid.setdefault(info.pid, []).append(handle)
+
+        if changed or titles_changed:
+            for listener in self._listeners:
+                listener(changed, titles_changed)
+
+    def titles(self) -> List[str]:
+        with self._lock:
+            return list(self._by_title)
+
+    def find(self, title: str = None, pid: int = None):
+        """Cached window for a title and/or PID, or None"""
+        with self._lock:
+            if title is not None:
+                handles = self._by_title.get(title, [])
+            else:
+                handles = self._by_pid.get(pid, [])
+            for handle in handles:
+                if pid is None or self._info[handle].pid == pid:
+                    return self._windows[handle]
+        return None
+
+    def find_all(self, title: str) -> list:
+        with self._lock:
+            return [self._windows[handle] for handle in self._by_title.get(title, [])]
+
+    def info(self, window) -> Optional[WindowInfo]:
+        with self._lock:
+            for handle, cached in self._windows.items():
+                if cached is window:
+                    return self._info[handle]
+        return None
+
+
+class WindowTarget:
+    """The window a run clicks into.
+
+    Activation is skipped while the window still has focus, which is what
+    lets the engine drop the post-activate settle wait in the common case.
+    """
+
+    def __init__(self, window):
+        self.window = window
+
+    def has_focus(self) -> bool:
+        return bool(getattr(self.window, "isActive", False))
+
+    def ensure_focused(self) -> bool:
+        """Activate the window if needed. Returns True if it had lost focus."""
+        if self.has_focus():
+            return False
+        self.window.activate()
+        return True
+
+    def origin(self) -> Tuple[int, int]:
+        return self.window.left, self.window.top
+
+    def rect(self) -> Tuple[int, int, int, int]:
+        return self.window.left, self.window.top, self.window.width, self.window.height